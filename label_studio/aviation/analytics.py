@@ -22,14 +22,24 @@ Usage:
         'date_start': date(2023, 1, 1),
         'aircraft': ['A320'],
     })
+
+    # Get aggregated threat -> error -> UAS -> training topic flow (Sankey)
+    from aviation.analytics import get_aviation_event_flow
+    flow = get_aviation_event_flow(aviation_project_id=1, level=3)
 """
+import hashlib
+import json
 import logging
-from typing import Any, Dict, Optional, TypedDict
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, TypedDict
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, QuerySet, When
 
 from aviation.models import AviationProject, AviationEvent, LabelingItem
 from aviation.filters import apply_all_filters
+from aviation.hierarchy_cache import get_type_hierarchy_tree
 from projects.models import Project
 from tasks.models import Task, Annotation
 
@@ -69,6 +79,33 @@ class AviationAnalytics(TypedDict):
     labeling_items: LabelingItemsAnalytics
 
 
+class FlowNode(TypedDict):
+    """Type definition for a node of the event flow (Sankey) graph."""
+
+    id: str
+    stage: str
+    code: Optional[str]
+    name: str
+
+
+class FlowLink(TypedDict):
+    """Type definition for a weighted link of the event flow (Sankey) graph."""
+
+    source: str
+    target: str
+    value: int
+
+
+class EventFlow(TypedDict):
+    """Type definition for aviation event flow response."""
+
+    project_id: int
+    level: int
+    total_items: int
+    nodes: List[FlowNode]
+    links: List[FlowLink]
+
+
 class CoreAnalytics(TypedDict):
     """Type definition for core project analytics response."""
 
@@ -310,3 +347,153 @@ def get_filtered_analytics_queryset(
         queryset = apply_all_filters(queryset, filters)
 
     return queryset
+
+
+# Stages of the event flow, in Sankey column order
+FLOW_HIERARCHY_STAGES = ('threat', 'error', 'uas')
+FLOW_TRAINING_TOPIC_STAGE = 'training_topic'
+FLOW_LEVELS = (1, 2, 3)
+
+
+def get_flow_cache_key(aviation_project_id: int, level: int, filters: Optional[Dict[str, Any]]) -> str:
+    """
+    Build the cache key for an event flow computation.
+
+    The key is derived from the project, hierarchy level and a stable hash of
+    the filter dictionary, so equal filter sets share one cache entry
+    regardless of parameter order.
+    """
+    signature = json.dumps(filters or {}, sort_keys=True, default=str)
+    digest = hashlib.md5(signature.encode('utf-8')).hexdigest()
+    return f'aviation:event-flow:{aviation_project_id}:{level}:{digest}'
+
+
+def _flow_node_id(stage: str, key: Any) -> str:
+    return f'{stage}:{key}'
+
+
+def get_aviation_event_flow(
+    aviation_project_id: int,
+    filters: Optional[Dict[str, Any]] = None,
+    level: int = 3,
+    use_cache: bool = True,
+) -> Optional[EventFlow]:
+    """
+    Aggregate threat -> error -> UAS -> training topic transitions for Sankey charts.
+
+    Labeling items of the filtered events are grouped in the database by their
+    threat/error/UAS type at the requested hierarchy level and by the training
+    topics of their linked result performance, so only one row per distinct path
+    leaves the database. Paths are then folded into weighted links using the same
+    rules as the analytics dashboard:
+    - threat -> error, error -> UAS, UAS -> training topic
+    - threat -> UAS when the item has no error
+    - threat -> training topic when the item has neither error nor UAS
+    - error -> training topic when the item has no UAS
+
+    Args:
+        aviation_project_id: The AviationProject.id (not Project.id).
+        filters: Dictionary of filter parameters, same format as apply_all_filters.
+        level: Hierarchy level (1, 2 or 3) used for threat/error/UAS nodes.
+        use_cache: Read and store the result in the Django cache keyed by the
+            filter signature (see AVIATION_EVENT_FLOW_CACHE_TIMEOUT).
+
+    Returns:
+        EventFlow dictionary containing:
+            - project_id: Aviation project ID
+            - level: Hierarchy level used
+            - total_items: Number of labeling items aggregated
+            - nodes: [{id, stage, code, name}]
+            - links: [{source, target, value}]
+
+        Returns None if project not found.
+
+    Raises:
+        ValueError: If level is not 1, 2 or 3.
+    """
+    if level not in FLOW_LEVELS:
+        raise ValueError(f'Unsupported hierarchy level: {level}')
+
+    cache_key = get_flow_cache_key(aviation_project_id, level, filters)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        aviation_project = AviationProject.objects.get(pk=aviation_project_id)
+    except AviationProject.DoesNotExist:
+        logger.debug(f'Aviation project not found: {aviation_project_id}')
+        return None
+
+    events = AviationEvent.objects.filter(task__project_id=aviation_project.project_id)
+    if filters:
+        events = apply_all_filters(events, filters)
+
+    type_fields = [f'{stage}_type_l{level}_id' for stage in FLOW_HIERARCHY_STAGES]
+    topics_field = 'linked_result__training_topics'
+
+    # One row per distinct (threat, error, uas, topics) path with its item count
+    paths = (
+        LabelingItem.objects.filter(event_id__in=events.values('id'))
+        .values(*type_fields, topics_field)
+        .annotate(weight=Count('id'))
+        .order_by()
+    )
+
+    links: Dict[tuple, int] = defaultdict(int)
+    total_items = 0
+
+    def add_link(source: Optional[str], target: Optional[str], weight: int) -> None:
+        if source and target:
+            links[(source, target)] += weight
+
+    for path in paths:
+        weight = path['weight']
+        total_items += weight
+
+        threat, error, uas = (
+            _flow_node_id(stage, path[field]) if path[field] else None
+            for stage, field in zip(FLOW_HIERARCHY_STAGES, type_fields)
+        )
+        topics = [
+            _flow_node_id(FLOW_TRAINING_TOPIC_STAGE, topic)
+            for topic in (path[topics_field] or [])
+            if topic
+        ]
+
+        add_link(threat, error, weight)
+        add_link(error, uas, weight)
+        if threat and not error:
+            add_link(threat, uas, weight)
+        for topic in topics:
+            add_link(uas or error or threat, topic, weight)
+
+    # Only nodes taking part in a link are drawn, matching the dashboard behaviour
+    node_ids = sorted({node_id for link in links for node_id in link})
+    tree = get_type_hierarchy_tree()
+
+    nodes = []
+    for node_id in node_ids:
+        stage, _, key = node_id.partition(':')
+        if stage == FLOW_TRAINING_TOPIC_STAGE:
+            code, name = None, key
+        else:
+            type_node = tree.get(int(key))
+            code, name = type_node['code'], type_node['label_zh'] or type_node['label']
+        nodes.append({'id': node_id, 'stage': stage, 'code': code, 'name': name})
+
+    result = {
+        'project_id': aviation_project.id,
+        'level': level,
+        'total_items': total_items,
+        'nodes': nodes,
+        'links': [
+            {'source': source, 'target': target, 'value': value}
+            for (source, target), value in sorted(links.items(), key=lambda item: -item[1])
+        ],
+    }
+
+    if use_cache:
+        cache.set(cache_key, result, settings.AVIATION_EVENT_FLOW_CACHE_TIMEOUT)
+    return result
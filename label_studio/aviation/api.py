@@ -3,7 +3,7 @@ from datetime import date, datetime
 from io import BytesIO
 
 from django.db import transaction
-from django.db.models import Prefetch, Q
+from django.db.models import Prefetch
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -46,14 +46,20 @@ from .models import (
     ReviewDecision,
     TypeHierarchy,
 )
-from .analytics import get_aviation_project_analytics
+from .hierarchy_cache import get_type_hierarchy_tree
+from .analytics import FLOW_LEVELS, get_aviation_event_flow, get_aviation_project_analytics
 from .filters import apply_all_filters
 from .serializers import (
     AnalyticsEventSerializer,
     ApproveRequestSerializer,
+    AviationEventFlowSerializer,
     AviationEventSerializer,
     AviationProjectAnalyticsSerializer,
     AviationProjectSerializer,
+    BulkApproveRequestSerializer,
+    BulkRejectRequestSerializer,
+    BulkReviewResponseSerializer,
+    BulkRevisionRequestSerializer,
     CreateAviationProjectSerializer,
     FilterOptionsSerializer,
     LabelingItemPerformanceSerializer,
@@ -222,31 +228,23 @@ class AviationEventViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-def _get_type_hierarchy_prefetch():
-    return Prefetch(
-        'children',
-        queryset=TypeHierarchy.objects.filter(is_active=True).order_by('display_order').prefetch_related(
-            Prefetch(
-                'children',
-                queryset=TypeHierarchy.objects.filter(is_active=True).order_by('display_order')
-            )
-        )
-    )
-
-
 class TypeHierarchyViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TypeHierarchySerializer
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        queryset = TypeHierarchy.objects.filter(is_active=True).prefetch_related(
-            _get_type_hierarchy_prefetch()
-        )
+        # Nested children are served from the in-memory tree (see TypeHierarchySerializer)
+        queryset = TypeHierarchy.objects.filter(is_active=True)
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category=category)
         return queryset.order_by('category', 'level', 'display_order')
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['tree'] = get_type_hierarchy_tree()
+        return context
+
     @action(detail=False, methods=['get'])
     def hierarchy(self, request):
         category = request.query_params.get('category')
@@ -256,40 +254,14 @@ class TypeHierarchyViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        root_items = TypeHierarchy.objects.filter(
-            category=category,
-            level=1,
-            parent__isnull=True,
-            is_active=True
-        ).prefetch_related(
-            _get_type_hierarchy_prefetch()
-        ).order_by('display_order')
-
-        serializer = TypeHierarchySerializer(root_items, many=True)
-        return Response(serializer.data)
+        return Response(get_type_hierarchy_tree().get_hierarchy(category))
 
     @action(detail=False, methods=['get'])
     def search(self, request):
         query = request.query_params.get('q', '')
         category = request.query_params.get('category')
 
-        queryset = TypeHierarchy.objects.filter(is_active=True)
-
-        if category:
-            queryset = queryset.filter(category=category)
-
-        if query:
-            queryset = queryset.filter(
-                Q(code__icontains=query) |
-                Q(label__icontains=query) |
-                Q(label_zh__icontains=query)
-            )
-
-        queryset = queryset.prefetch_related(
-            _get_type_hierarchy_prefetch()
-        ).order_by('category', 'level', 'display_order')[:50]
-        serializer = TypeHierarchySerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(get_type_hierarchy_tree().search(query, category=category))
 
 
 class LabelingItemViewSet(viewsets.ModelViewSet):
@@ -769,7 +741,7 @@ class ReviewApproveAPI(generics.GenericAPIView):
         """Get labeling item with organization check."""
         return get_object_or_404(
             LabelingItem.objects.select_related(
-                'event__task__project'
+                'created_by', 'event__task__project__aviation_project'
             ),
             pk=pk,
             event__task__project__organization=self.request.user.active_organization
@@ -805,8 +777,8 @@ class ReviewApproveAPI(generics.GenericAPIView):
             labeling_item.reviewed_at = timezone.now()
             labeling_item.save(update_fields=['status', 'reviewed_by', 'reviewed_at'])
 
-        # Send notification to annotator
-        send_review_notification(decision)
+            # Queue notification to annotator (delivered after commit)
+            send_review_notification(decision)
 
         return Response(
             ReviewDecisionSerializer(decision).data,
@@ -831,7 +803,7 @@ class ReviewRejectAPI(generics.GenericAPIView):
         """Get labeling item with organization check."""
         return get_object_or_404(
             LabelingItem.objects.select_related(
-                'event__task__project'
+                'created_by', 'event__task__project__aviation_project'
             ),
             pk=pk,
             event__task__project__organization=self.request.user.active_organization
@@ -878,8 +850,8 @@ class ReviewRejectAPI(generics.GenericAPIView):
             labeling_item.reviewed_at = timezone.now()
             labeling_item.save(update_fields=['status', 'reviewed_by', 'reviewed_at'])
 
-        # Send notification to annotator
-        send_review_notification(decision)
+            # Queue notification to annotator (delivered after commit)
+            send_review_notification(decision)
 
         return Response(
             ReviewDecisionSerializer(decision).data,
@@ -904,7 +876,7 @@ class ReviewRevisionAPI(generics.GenericAPIView):
         """Get labeling item with organization check."""
         return get_object_or_404(
             LabelingItem.objects.select_related(
-                'event__task__project'
+                'created_by', 'event__task__project__aviation_project'
             ),
             pk=pk,
             event__task__project__organization=self.request.user.active_organization
@@ -951,8 +923,8 @@ class ReviewRevisionAPI(generics.GenericAPIView):
             labeling_item.reviewed_at = timezone.now()
             labeling_item.save(update_fields=['status', 'reviewed_by', 'reviewed_at'])
 
-        # Send notification to annotator
-        send_review_notification(decision)
+            # Queue notification to annotator (delivered after commit)
+            send_review_notification(decision)
 
         return Response(
             ReviewDecisionSerializer(decision).data,
@@ -960,6 +932,167 @@ class ReviewRevisionAPI(generics.GenericAPIView):
         )
 
 
+class BulkReviewAPI(generics.GenericAPIView):
+    """
+    Base class for bulk review endpoints.
+
+    Validates all requested items with a single organization-scoped query,
+    then creates ReviewDecision and FieldFeedback rows with bulk_create and
+    updates item statuses with one UPDATE inside a single transaction.
+    Notifications are coalesced per annotator.
+
+    Subclasses define item_status and get_decision_status().
+    """
+    permission_classes = (IsAuthenticated,)
+    item_status = None
+
+    def get_decision_status(self, validated_data):
+        raise NotImplementedError
+
+    def get_labeling_items(self, item_ids):
+        """Get all labeling items with organization check, failing if any is missing."""
+        items = {
+            item.id: item
+            for item in LabelingItem.objects.select_related(
+                'created_by', 'event__task__project__aviation_project'
+            ).filter(
+                pk__in=item_ids,
+                event__task__project__organization=self.request.user.active_organization
+            )
+        }
+        missing_ids = [pk for pk in item_ids if pk not in items]
+        if missing_ids:
+            raise ValidationError({'item_ids': [f'Labeling items not found: {missing_ids}']})
+        return [items[pk] for pk in item_ids]
+
+    def post(self, request):
+        from .services import send_bulk_review_notifications
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        labeling_items = self.get_labeling_items(validated_data['item_ids'])
+        decision_status = self.get_decision_status(validated_data)
+        comment = validated_data.get('comment', '')
+        field_feedbacks = validated_data.get('field_feedbacks', [])
+        reviewed_at = timezone.now()
+
+        with transaction.atomic():
+            decisions = ReviewDecision.objects.bulk_create([
+                ReviewDecision(
+                    labeling_item=labeling_item,
+                    status=decision_status,
+                    reviewer=request.user,
+                    reviewer_comment=comment
+                )
+                for labeling_item in labeling_items
+            ])
+
+            if field_feedbacks:
+                FieldFeedback.objects.bulk_create([
+                    FieldFeedback(
+                        review_decision=decision,
+                        labeling_item=decision.labeling_item,
+                        field_name=feedback_data['field_name'],
+                        feedback_type=feedback_data['feedback_type'],
+                        feedback_comment=feedback_data.get('feedback_comment', ''),
+                        reviewed_by=request.user
+                    )
+                    for decision in decisions
+                    for feedback_data in field_feedbacks
+                ])
+
+            LabelingItem.objects.filter(pk__in=[item.id for item in labeling_items]).update(
+                status=self.item_status,
+                reviewed_by=request.user,
+                reviewed_at=reviewed_at
+            )
+
+            # Queue one notification per annotator (delivered after commit)
+            send_bulk_review_notifications(decisions, request.user, decision_status)
+
+        response_data = {
+            'status': decision_status,
+            'count': len(decisions),
+            'item_ids': [item.id for item in labeling_items],
+            'decision_ids': [decision.id for decision in decisions],
+        }
+        return Response(
+            BulkReviewResponseSerializer(response_data).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class BulkReviewApproveAPI(BulkReviewAPI):
+    """
+    POST /api/aviation/items/bulk/approve/
+
+    Approve many labeling items in one transaction.
+    """
+    serializer_class = BulkApproveRequestSerializer
+    item_status = 'approved'
+
+    def get_decision_status(self, validated_data):
+        return 'approved'
+
+    @swagger_auto_schema(
+        tags=['Aviation Review'],
+        operation_summary='Approve labeling items in bulk',
+        operation_description='Approve several labeling items at once. Creates one ReviewDecision per item.',
+        request_body=BulkApproveRequestSerializer,
+        responses={200: BulkReviewResponseSerializer}
+    )
+    def post(self, request):
+        return super().post(request)
+
+
+class BulkReviewRejectAPI(BulkReviewAPI):
+    """
+    POST /api/aviation/items/bulk/reject/
+
+    Reject many labeling items in one transaction with shared field-level feedback.
+    """
+    serializer_class = BulkRejectRequestSerializer
+    item_status = 'reviewed'
+
+    def get_decision_status(self, validated_data):
+        return validated_data['status']
+
+    @swagger_auto_schema(
+        tags=['Aviation Review'],
+        operation_summary='Reject labeling items in bulk',
+        operation_description='Reject several labeling items at once. Field feedbacks are applied to every item.',
+        request_body=BulkRejectRequestSerializer,
+        responses={200: BulkReviewResponseSerializer}
+    )
+    def post(self, request):
+        return super().post(request)
+
+
+class BulkReviewRevisionAPI(BulkReviewAPI):
+    """
+    POST /api/aviation/items/bulk/revision/
+
+    Request revision of many labeling items in one transaction with shared field-level feedback.
+    """
+    serializer_class = BulkRevisionRequestSerializer
+    item_status = 'reviewed'
+
+    def get_decision_status(self, validated_data):
+        return 'revision_requested'
+
+    @swagger_auto_schema(
+        tags=['Aviation Review'],
+        operation_summary='Request revision of labeling items in bulk',
+        operation_description='Request revision on several labeling items at once. Field feedbacks are applied to every item.',
+        request_body=BulkRevisionRequestSerializer,
+        responses={200: BulkReviewResponseSerializer}
+    )
+    def post(self, request):
+        return super().post(request)
+
+
 class ReviewResubmitAPI(generics.GenericAPIView):
     """
     POST /api/aviation/items/<pk>/resubmit/
@@ -975,7 +1108,7 @@ class ReviewResubmitAPI(generics.GenericAPIView):
         """Get labeling item with organization check."""
         return get_object_or_404(
             LabelingItem.objects.select_related(
-                'event__task__project'
+                'created_by', 'event__task__project__aviation_project'
             ),
             pk=pk,
             event__task__project__organization=self.request.user.active_organization
@@ -1001,8 +1134,8 @@ class ReviewResubmitAPI(generics.GenericAPIView):
             labeling_item.status = 'submitted'
             labeling_item.save(update_fields=['status'])
 
-        # Send notification to last reviewer
-        send_resubmit_notification(labeling_item, request.user)
+            # Queue notification to last reviewer (delivered after commit)
+            send_resubmit_notification(labeling_item, request.user)
 
         return Response(
             LabelingItemSerializer(labeling_item).data,
@@ -1572,6 +1705,86 @@ class AviationProjectEventsAnalyticsAPI(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
+class AviationProjectEventsFlowAPI(AviationProjectEventsAnalyticsAPI):
+    """
+    GET /api/aviation/projects/<pk>/events/flow/
+
+    Retrieve aggregated threat -> error -> UAS -> training topic transitions
+    for Sankey visualization.
+
+    Transition counts are computed in the database over all events matching
+    the filters, so the dashboard does not need to download every page of
+    events/analytics. Results are cached per filter signature.
+
+    Query Parameters:
+        - level: Hierarchy level for threat/error/UAS nodes (1, 2 or 3; default: 3)
+        - Same filter parameters as events/analytics
+
+    Authentication:
+        Requires authenticated user with access to the project's organization.
+
+    Response:
+        - project_id: Aviation project ID
+        - level: Hierarchy level used
+        - total_items: Number of labeling items aggregated
+        - nodes: Array of {id, stage, code, name}
+        - links: Array of {source, target, value}
+    """
+    serializer_class = AviationEventFlowSerializer
+    pagination_class = None
+
+    def _parse_level(self):
+        """Parse and validate the hierarchy level query parameter."""
+        level = self.request.query_params.get('level', FLOW_LEVELS[-1])
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            level = None
+        if level not in FLOW_LEVELS:
+            raise ValidationError({'level': f'Must be one of: {list(FLOW_LEVELS)}'})
+        return level
+
+    @swagger_auto_schema(
+        tags=['Aviation Analytics'],
+        operation_summary='Get aggregated event flow',
+        operation_description="""
+        Retrieve node/link weights of the threat -> error -> UAS -> training topic
+        flow for all events matching the filters.
+
+        Accepts the same filter query parameters as the events analytics endpoint.
+
+        Requires authentication and organization membership.
+        """,
+        manual_parameters=[
+            openapi.Parameter(
+                'level', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                description='Hierarchy level for threat/error/UAS nodes (1-3, default: 3)'
+            ),
+        ],
+        responses={
+            200: AviationEventFlowSerializer,
+            400: 'Invalid level parameter',
+            401: 'Unauthorized - Authentication required',
+            404: 'Aviation project not found or not accessible'
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        """Return aggregated flow for the filtered events."""
+        aviation_project = self.get_aviation_project()
+        level = self._parse_level()
+
+        flow = get_aviation_event_flow(
+            aviation_project.id,
+            filters=self._parse_filter_params(),
+            level=level,
+        )
+        if flow is None:
+            raise Http404("Aviation project not found")
+
+        serializer = self.get_serializer(flow)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 # =============================================================================
 # Filter Options API View (Phase 1 - Filter Integration)
 # =============================================================================
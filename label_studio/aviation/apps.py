@@ -5,3 +5,6 @@ class AviationConfig(AppConfig):
     default_auto_field = 'django.db.models.AutoField'
     name = 'aviation'
     verbose_name = 'Aviation'
+
+    def ready(self):
+        from aviation import signals  # noqa: F401
@@ -0,0 +1,217 @@
+"""
+In-memory, version-stamped TypeHierarchy tree cache.
+
+The threat/error/UAS taxonomy changes only when seed_aviation_types runs or an
+admin edits it, yet it is read on every labeling form load. This module keeps a
+process-local snapshot of the whole taxonomy and serves hierarchy, search and
+code -> node lookups from memory.
+
+Each snapshot is stamped with a version. TypeHierarchy writes bump a Redis
+counter (see aviation.signals); processes compare the stamp of their snapshot
+with the current counter and rebuild on mismatch. Without Redis the version is
+a fingerprint of the table (row count, max id, max updated_at), which costs a
+single aggregate query instead of rebuilding the tree.
+
+Usage:
+    from aviation.hierarchy_cache import get_type_hierarchy_tree
+
+    tree = get_type_hierarchy_tree()
+    roots = tree.get_hierarchy('threat')
+    matches = tree.search('TH', category='threat')
+    node = tree.get_by_code('threat', 'TH01')
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from aviation.models import TypeHierarchy
+from core.redis import redis_connected, redis_get, redis_incr
+from django.db import transaction
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+TYPE_HIERARCHY_VERSION_KEY = 'aviation:type-hierarchy:version'
+
+# Substrings up to this length are indexed; longer queries are verified on the candidates
+MAX_INDEXED_QUERY_LENGTH = 16
+
+SEARCH_RESULTS_LIMIT = 50
+
+NODE_FIELDS = (
+    'id',
+    'category',
+    'level',
+    'parent_id',
+    'code',
+    'label',
+    'label_zh',
+    'training_topics',
+    'display_order',
+    'is_active',
+)
+
+
+class TypeHierarchyTree:
+    """
+    Immutable snapshot of the TypeHierarchy table.
+
+    Nodes are kept as plain dicts; serialize() returns the same structure as
+    TypeHierarchySerializer (with active children nested recursively).
+    """
+
+    def __init__(self, version: str, rows: List[Dict[str, Any]]):
+        self.version = version
+        self.nodes: Dict[int, Dict[str, Any]] = {row['id']: row for row in rows}
+
+        def sort_key(node_id):
+            node = self.nodes[node_id]
+            return node['display_order'], node_id
+
+        children = defaultdict(list)
+        roots = defaultdict(list)
+        by_code = defaultdict(list)
+        for row in rows:
+            by_code[(row['category'], row['code'])].append(row['id'])
+            if not row['is_active']:
+                continue
+            if row['parent_id'] is not None:
+                children[row['parent_id']].append(row['id'])
+            elif row['level'] == 1:
+                roots[row['category']].append(row['id'])
+
+        self.children: Dict[int, List[int]] = {key: sorted(ids, key=sort_key) for key, ids in children.items()}
+        self.roots: Dict[str, List[int]] = {key: sorted(ids, key=sort_key) for key, ids in roots.items()}
+        self.by_code: Dict[tuple, List[int]] = {
+            key: sorted(ids, key=lambda node_id: self.nodes[node_id]['level']) for key, ids in by_code.items()
+        }
+        self.ordered_ids: List[int] = sorted(
+            (row['id'] for row in rows if row['is_active']),
+            key=lambda node_id: (
+                self.nodes[node_id]['category'],
+                self.nodes[node_id]['level'],
+                self.nodes[node_id]['display_order'],
+                node_id,
+            ),
+        )
+        self.rank = {node_id: rank for rank, node_id in enumerate(self.ordered_ids)}
+        self.search_index = self._build_search_index()
+        self._serialized: Dict[int, Dict[str, Any]] = {}
+
+    def _build_search_index(self) -> Dict[str, set]:
+        """Map every lowercased prefix of every suffix of code/label/label_zh to node ids."""
+        index = defaultdict(set)
+        for node_id in self.ordered_ids:
+            node = self.nodes[node_id]
+            for value in {node['code'].lower(), node['label'].lower(), node['label_zh'].lower()}:
+                for start in range(len(value)):
+                    suffix = value[start : start + MAX_INDEXED_QUERY_LENGTH]
+                    for end in range(1, len(suffix) + 1):
+                        index[suffix[:end]].add(node_id)
+        return dict(index)
+
+    def get(self, node_id: int) -> Optional[Dict[str, Any]]:
+        return self.nodes.get(node_id)
+
+    def get_by_code(self, category: str, code: str, level: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return the node with the given category/code (and level, if provided)."""
+        for node_id in self.by_code.get((category, code), []):
+            node = self.nodes[node_id]
+            if level is None or node['level'] == level:
+                return node
+        return None
+
+    def serialize(self, node_id: int) -> Dict[str, Any]:
+        """Serialize a node with its active descendants, memoized per snapshot."""
+        data = self._serialized.get(node_id)
+        if data is None:
+            node = self.nodes[node_id]
+            data = {
+                'id': node['id'],
+                'category': node['category'],
+                'level': node['level'],
+                'parent_id': node['parent_id'],
+                'code': node['code'],
+                'label': node['label'],
+                'label_zh': node['label_zh'],
+                'training_topics': node['training_topics'],
+                'is_active': node['is_active'],
+                'children': self.serialize_children(node_id),
+            }
+            self._serialized[node_id] = data
+        return data
+
+    def serialize_children(self, node_id: int) -> List[Dict[str, Any]]:
+        return [self.serialize(child_id) for child_id in self.children.get(node_id, [])]
+
+    def get_hierarchy(self, category: str) -> List[Dict[str, Any]]:
+        """Return active root nodes of a category with nested active children."""
+        return [self.serialize(node_id) for node_id in self.roots.get(category, [])]
+
+    def search(self, query: str = '', category: Optional[str] = None, limit: int = SEARCH_RESULTS_LIMIT):
+        """
+        Case-insensitive substring search over code, label and label_zh.
+
+        Matches the semantics of the former icontains query: active nodes only,
+        ordered by category, level and display_order.
+        """
+        query = query.lower()
+        if query:
+            candidates = self.search_index.get(query[:MAX_INDEXED_QUERY_LENGTH], set())
+            if len(query) > MAX_INDEXED_QUERY_LENGTH:
+                candidates = {
+                    node_id
+                    for node_id in candidates
+                    if any(query in self.nodes[node_id][field].lower() for field in ('code', 'label', 'label_zh'))
+                }
+            node_ids = sorted(candidates, key=self.rank.__getitem__)
+        else:
+            node_ids = self.ordered_ids
+
+        if category:
+            node_ids = [node_id for node_id in node_ids if self.nodes[node_id]['category'] == category]
+        return [self.serialize(node_id) for node_id in node_ids[:limit]]
+
+
+_tree: Optional[TypeHierarchyTree] = None
+_lock = threading.Lock()
+
+
+def get_type_hierarchy_version() -> str:
+    """Return the current taxonomy version stamp."""
+    if redis_connected():
+        version = redis_get(TYPE_HIERARCHY_VERSION_KEY)
+        return f'redis:{int(version or 0)}'
+
+    fingerprint = TypeHierarchy.objects.aggregate(count=Count('id'), max_id=Max('id'), updated_at=Max('updated_at'))
+    return 'db:{count}:{max_id}:{updated_at}'.format(**fingerprint)
+
+
+def bump_type_hierarchy_version() -> None:
+    """Invalidate every process-local tree once the current transaction commits."""
+
+    def _bump():
+        global _tree
+        _tree = None
+        redis_incr(TYPE_HIERARCHY_VERSION_KEY)
+
+    transaction.on_commit(_bump)
+
+
+def get_type_hierarchy_tree() -> TypeHierarchyTree:
+    """Return the cached taxonomy snapshot, rebuilding it if the version changed."""
+    global _tree
+    version = get_type_hierarchy_version()
+    tree = _tree
+    if tree is not None and tree.version == version:
+        return tree
+
+    with _lock:
+        tree = _tree
+        if tree is None or tree.version != version:
+            rows = list(TypeHierarchy.objects.order_by().values(*NODE_FIELDS))
+            tree = TypeHierarchyTree(version, rows)
+            _tree = tree
+            logger.debug(f'Rebuilt type hierarchy tree cache: version={version}, nodes={len(rows)}')
+    return tree
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from .hierarchy_cache import get_type_hierarchy_tree
 from .models import (
     AviationEvent,
     AviationProject,
@@ -38,8 +39,9 @@ class TypeHierarchySerializer(serializers.ModelSerializer):
         ]
 
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True).order_by('display_order')
-        return TypeHierarchySerializer(children, many=True).data
+        # views resolve the tree once per request, see TypeHierarchyViewSet.get_serializer_context
+        tree = self.context.get('tree') or get_type_hierarchy_tree()
+        return tree.serialize_children(obj.id)
 
 
 class ProjectNestedSerializer(serializers.Serializer):
@@ -441,6 +443,43 @@ class ResubmitRequestSerializer(serializers.Serializer):
     )
 
 
+BULK_REVIEW_MAX_ITEMS = 1000
+
+
+class BulkReviewItemsSerializer(serializers.Serializer):
+    """Request serializer mixin with the labeling items targeted by a bulk review."""
+    item_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=BULK_REVIEW_MAX_ITEMS,
+        help_text=f'IDs of labeling items to review (max {BULK_REVIEW_MAX_ITEMS})'
+    )
+
+    def validate_item_ids(self, value):
+        # Preserve request order while dropping duplicates
+        return list(dict.fromkeys(value))
+
+
+class BulkApproveRequestSerializer(BulkReviewItemsSerializer, ApproveRequestSerializer):
+    """Request serializer for approving several labeling items at once."""
+
+
+class BulkRejectRequestSerializer(BulkReviewItemsSerializer, RejectRequestSerializer):
+    """Request serializer for rejecting several labeling items with shared field feedback."""
+
+
+class BulkRevisionRequestSerializer(BulkReviewItemsSerializer, RevisionRequestSerializer):
+    """Request serializer for requesting revision of several labeling items with shared field feedback."""
+
+
+class BulkReviewResponseSerializer(serializers.Serializer):
+    """Response serializer for bulk review endpoints."""
+    status = serializers.CharField(help_text='ReviewDecision status applied to all items')
+    count = serializers.IntegerField(help_text='Number of reviewed items')
+    item_ids = serializers.ListField(child=serializers.IntegerField(), help_text='Reviewed labeling item IDs')
+    decision_ids = serializers.ListField(child=serializers.IntegerField(), help_text='Created ReviewDecision IDs')
+
+
 class ReviewHistoryResponseSerializer(serializers.Serializer):
     """Response serializer for review history endpoint."""
     current_status = serializers.CharField(
@@ -733,6 +772,46 @@ class AnalyticsEventSerializer(serializers.Serializer):
         ).data
 
 
+# =============================================================================
+# Event Flow (Sankey) Serializers
+# =============================================================================
+
+
+class EventFlowNodeSerializer(serializers.Serializer):
+    """Serializer for a node of the event flow graph."""
+    id = serializers.CharField(read_only=True, help_text='Node ID, formatted as "<stage>:<key>"')
+    stage = serializers.CharField(read_only=True, help_text='threat, error, uas or training_topic')
+    code = serializers.CharField(read_only=True, allow_null=True, help_text='TypeHierarchy code (null for training topics)')
+    name = serializers.CharField(read_only=True, help_text='Display label (label_zh when available)')
+
+
+class EventFlowLinkSerializer(serializers.Serializer):
+    """Serializer for a weighted link of the event flow graph."""
+    source = serializers.CharField(read_only=True)
+    target = serializers.CharField(read_only=True)
+    value = serializers.IntegerField(read_only=True, help_text='Number of labeling items following this link')
+
+
+class AviationEventFlowSerializer(serializers.Serializer):
+    """
+    Serializer for the aggregated threat -> error -> UAS -> training topic flow.
+
+    Response structure:
+    {
+        "project_id": 1,
+        "level": 3,
+        "total_items": 25,
+        "nodes": [{"id": "threat:12", "stage": "threat", "code": "TH01", "name": "..."}],
+        "links": [{"source": "threat:12", "target": "error:40", "value": 7}]
+    }
+    """
+    project_id = serializers.IntegerField(read_only=True, help_text='Aviation project ID')
+    level = serializers.IntegerField(read_only=True, help_text='Hierarchy level used for nodes')
+    total_items = serializers.IntegerField(read_only=True, help_text='Number of labeling items aggregated')
+    nodes = EventFlowNodeSerializer(many=True, read_only=True)
+    links = EventFlowLinkSerializer(many=True, read_only=True)
+
+
 # =============================================================================
 # Filter Options Serializers (Phase 1 - Filter Integration)
 # =============================================================================
@@ -277,29 +277,19 @@ class AviationExportService:
 # Review Notification Service
 # =============================================================================
 
-def send_review_notification(review_decision):
-    """
-    Send notification to annotator when their work is reviewed.
+def _get_aviation_project_id(event):
+    """Return the AviationProject.id of an event, or 0 if the project is not an aviation project."""
+    try:
+        return event.task.project.aviation_project.id
+    except AttributeError:
+        logger.warning(f'Could not find aviation project for event {event.id}')
+        return 0
 
-    Args:
-        review_decision: ReviewDecision instance with status and related labeling_item
 
-    Notification is sent to labeling_item.created_by (the annotator).
-    Skips silently if no recipient (created_by is null).
-    """
-    from django.utils import timezone
-    from notifications.models import NotificationChannel, NotificationEventType
-    from notifications.services import NotificationService
-
-    labeling_item = review_decision.labeling_item
-    recipient = labeling_item.created_by
+def _get_review_status_info(review_status):
+    """Map a ReviewDecision status to its notification event type and action wording."""
+    from notifications.models import NotificationEventType
 
-    # Skip if no recipient
-    if not recipient:
-        logger.debug(f'No recipient for review notification on item {labeling_item.id}')
-        return
-
-    # Determine event type and message based on status
     status_map = {
         'approved': {
             'event_type': NotificationEventType.REVIEW_APPROVED,
@@ -318,8 +308,32 @@ def send_review_notification(review_decision):
             'action': 'requested revision on',
         },
     }
+    return status_map.get(review_status)
+
+
+def send_review_notification(review_decision):
+    """
+    Send notification to annotator when their work is reviewed.
+
+    Args:
+        review_decision: ReviewDecision instance with status and related labeling_item
+
+    Notification is sent to labeling_item.created_by (the annotator).
+    Skips silently if no recipient (created_by is null).
+    """
+    from django.utils import timezone
+    from notifications.models import NotificationChannel
+    from notifications.services import NotificationService
 
-    status_info = status_map.get(review_decision.status)
+    labeling_item = review_decision.labeling_item
+    recipient = labeling_item.created_by
+
+    # Skip if no recipient
+    if not recipient:
+        logger.debug(f'No recipient for review notification on item {labeling_item.id}')
+        return
+
+    status_info = _get_review_status_info(review_decision.status)
     if not status_info:
         logger.warning(f'Unknown review status: {review_decision.status}')
         return
@@ -329,12 +343,7 @@ def send_review_notification(review_decision):
     event_number = event.event_number
 
     # Get aviation project ID for path
-    try:
-        aviation_project = event.task.project.aviation_project
-        aviation_project_id = aviation_project.id
-    except AttributeError:
-        logger.warning(f'Could not find aviation project for event {event.id}')
-        aviation_project_id = 0
+    aviation_project_id = _get_aviation_project_id(event)
 
     # Build reviewer name
     reviewer = review_decision.reviewer
@@ -345,7 +354,7 @@ def send_review_notification(review_decision):
     message = f'{reviewer_name} has {status_info["action"]} your annotation'
     path = f'/aviation/projects/{aviation_project_id}/events/{event.id}?item={labeling_item.id}'
 
-    # Send the notification synchronously
+    # Queue the notification (written to the outbox within the current transaction)
     notification_service = NotificationService()
 
     try:
@@ -364,6 +373,67 @@ def send_review_notification(review_decision):
         logger.error(f'Failed to send review notification: {e}')
 
 
+def send_bulk_review_notifications(review_decisions, reviewer, review_status):
+    """
+    Send one coalesced notification per annotator for a bulk review.
+
+    Args:
+        review_decisions: ReviewDecision instances created by a bulk review, with
+            labeling_item, its created_by and event__task__project__aviation_project
+            loaded (select_related) to avoid per-item queries.
+        reviewer: User who made the decisions
+        review_status: Shared ReviewDecision status of all decisions
+
+    Annotators with a single reviewed item receive the regular per-item
+    notification; annotators with several items receive one summary message.
+    Items without created_by are skipped.
+    """
+    from django.utils import timezone
+    from notifications.models import NotificationChannel
+    from notifications.services import NotificationService
+
+    status_info = _get_review_status_info(review_status)
+    if not status_info:
+        logger.warning(f'Unknown review status: {review_status}')
+        return
+
+    decisions_by_recipient = {}
+    for decision in review_decisions:
+        recipient = decision.labeling_item.created_by
+        if recipient:
+            decisions_by_recipient.setdefault(recipient.id, (recipient, []))[1].append(decision)
+
+    reviewer_name = reviewer.email if reviewer else 'A reviewer'
+    notification_service = NotificationService()
+
+    for recipient, decisions in decisions_by_recipient.values():
+        if len(decisions) == 1:
+            send_review_notification(decisions[0])
+            continue
+
+        items = [decision.labeling_item for decision in decisions]
+        project_ids = {_get_aviation_project_id(item.event) for item in items}
+        path = f'/aviation/projects/{project_ids.pop()}' if len(project_ids) == 1 else None
+
+        subject = f'Review Decisions: {len(items)} items'
+        message = f'{reviewer_name} has {status_info["action"]} {len(items)} of your annotations'
+
+        try:
+            notification_service.send_notification_sync(
+                channel_name=NotificationChannel.NOTIFICATION,
+                event_type=status_info['event_type'],
+                subject=subject,
+                message=message,
+                ts=timezone.now(),
+                receive_user=recipient,
+                path=path,
+                action_type=review_status,
+                source='aviation_review'
+            )
+        except Exception as e:
+            logger.error(f'Failed to send bulk review notification: {e}')
+
+
 def send_resubmit_notification(labeling_item, resubmitter):
     """
     Send notification to reviewer when item is resubmitted.
@@ -383,7 +453,7 @@ def send_resubmit_notification(labeling_item, resubmitter):
     # Find the last reviewer
     last_decision = ReviewDecision.objects.filter(
         labeling_item=labeling_item
-    ).order_by('-created_at').first()
+    ).select_related('reviewer').order_by('-created_at').first()
 
     if not last_decision or not last_decision.reviewer:
         logger.debug(f'No reviewer to notify for resubmit on item {labeling_item.id}')
@@ -396,12 +466,7 @@ def send_resubmit_notification(labeling_item, resubmitter):
     event_number = event.event_number
 
     # Get aviation project ID for path
-    try:
-        aviation_project = event.task.project.aviation_project
-        aviation_project_id = aviation_project.id
-    except AttributeError:
-        logger.warning(f'Could not find aviation project for event {event.id}')
-        aviation_project_id = 0
+    aviation_project_id = _get_aviation_project_id(event)
 
     # Build resubmitter name
     resubmitter_name = resubmitter.email if resubmitter else 'An annotator'
@@ -411,7 +476,7 @@ def send_resubmit_notification(labeling_item, resubmitter):
     message = f'{resubmitter_name} has resubmitted annotation for review'
     path = f'/aviation/projects/{aviation_project_id}/events/{event.id}?item={labeling_item.id}'
 
-    # Send the notification synchronously
+    # Queue the notification (written to the outbox within the current transaction)
     notification_service = NotificationService()
 
     try:
@@ -1,7 +1,11 @@
-# Aviation signals
-# This file is intentionally empty after cleanup.
-# The previous signal handlers referenced removed models (AviationAnnotation)
-# and services (TrainingCalculationService) that no longer exist.
-#
-# New signal handlers for current models (AviationEvent, LabelingItem, etc.)
-# should be added here as needed.
+from aviation.hierarchy_cache import bump_type_hierarchy_version
+from aviation.models import TypeHierarchy
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=TypeHierarchy)
+@receiver(post_delete, sender=TypeHierarchy)
+def invalidate_type_hierarchy_tree(sender, instance, **kwargs):
+    """Bump the taxonomy version so every process rebuilds its cached tree."""
+    bump_type_hierarchy_version()
@@ -0,0 +1,190 @@
+"""
+Tests for bulk review API endpoints.
+
+- BulkReviewApproveAPI: POST /api/aviation/items/bulk/approve/
+- BulkReviewRejectAPI: POST /api/aviation/items/bulk/reject/
+- BulkReviewRevisionAPI: POST /api/aviation/items/bulk/revision/
+"""
+from unittest.mock import patch
+
+from aviation.models import AviationProject, FieldFeedback, LabelingItem, ReviewDecision
+from aviation.tests.factories import AviationEventFactory, LabelingItemFactory
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from organizations.tests.factories import OrganizationFactory
+from projects.tests.factories import ProjectFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class BulkReviewTestCase(TestCase):
+    """Shared fixtures for bulk review tests."""
+
+    def setUp(self):
+        self.organization = OrganizationFactory()
+        self.project = ProjectFactory(organization=self.organization)
+        self.aviation_project = AviationProject.objects.create(project=self.project)
+
+        self.reviewer = User.objects.create_user(email='reviewer@test.com', password='testpass123')
+        self.reviewer.active_organization = self.organization
+        self.reviewer.save()
+
+        self.annotators = []
+        for index in range(2):
+            annotator = User.objects.create_user(email=f'annotator{index}@test.com', password='testpass123')
+            annotator.active_organization = self.organization
+            annotator.save()
+            self.annotators.append(annotator)
+
+        # Annotator 0 owns three items, annotator 1 owns one
+        self.items = [
+            LabelingItemFactory(
+                event=AviationEventFactory(task__project=self.project),
+                status='submitted',
+                created_by=self.annotators[0 if index < 3 else 1],
+            )
+            for index in range(4)
+        ]
+        self.item_ids = [item.id for item in self.items]
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reviewer)
+
+
+class TestBulkReviewApproveAPI(BulkReviewTestCase):
+    url = reverse('aviation:items-bulk-approve')
+
+    def test_requires_authentication(self):
+        response = APIClient().post(self.url, {'item_ids': self.item_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_approves_all_items(self, mock_send):
+        response = self.client.post(self.url, {'item_ids': self.item_ids, 'comment': 'LGTM'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['status'], 'approved')
+        self.assertEqual(response.data['item_ids'], self.item_ids)
+
+        items = LabelingItem.objects.filter(pk__in=self.item_ids)
+        self.assertTrue(all(item.status == 'approved' for item in items))
+        self.assertTrue(all(item.reviewed_by_id == self.reviewer.id for item in items))
+        self.assertTrue(all(item.reviewed_at for item in items))
+
+        decisions = ReviewDecision.objects.filter(labeling_item_id__in=self.item_ids)
+        self.assertEqual(decisions.count(), 4)
+        self.assertTrue(all(d.reviewer_comment == 'LGTM' for d in decisions))
+        self.assertEqual(sorted(response.data['decision_ids']), sorted(d.id for d in decisions))
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_coalesces_notifications_per_annotator(self, mock_send):
+        self.client.post(self.url, {'item_ids': self.item_ids}, format='json')
+
+        self.assertEqual(mock_send.call_count, 2)
+        calls = {call.kwargs['receive_user'].id: call.kwargs for call in mock_send.call_args_list}
+        self.assertEqual(calls[self.annotators[0].id]['subject'], 'Review Decisions: 3 items')
+        self.assertIn('approved 3 of your annotations', calls[self.annotators[0].id]['message'])
+        self.assertEqual(calls[self.annotators[0].id]['path'], f'/aviation/projects/{self.aviation_project.id}')
+        # A single item keeps the per-item notification
+        self.assertTrue(calls[self.annotators[1].id]['subject'].startswith('Review Decision: '))
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_query_count_does_not_grow_with_items(self, mock_send):
+        with self.assertNumQueries(6):
+            self.client.post(self.url, {'item_ids': self.item_ids[:3]}, format='json')
+
+        more_items = [
+            LabelingItemFactory(
+                event=AviationEventFactory(task__project=self.project),
+                status='submitted',
+                created_by=self.annotators[0],
+            )
+            for _ in range(10)
+        ]
+        with self.assertNumQueries(6):
+            self.client.post(self.url, {'item_ids': [item.id for item in more_items]}, format='json')
+
+    def test_missing_items_reject_whole_request(self):
+        other_item = LabelingItemFactory(
+            event=AviationEventFactory(task__project=ProjectFactory()),
+            status='submitted',
+        )
+
+        response = self.client.post(self.url, {'item_ids': self.item_ids + [other_item.id, 999999]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other_item.id), str(response.data['validation_errors']['item_ids']))
+        self.assertFalse(ReviewDecision.objects.exists())
+        self.assertFalse(LabelingItem.objects.filter(status='approved').exists())
+
+    def test_requires_item_ids(self):
+        response = self.client.post(self.url, {'item_ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_duplicate_ids_are_reviewed_once(self, mock_send):
+        response = self.client.post(self.url, {'item_ids': [self.item_ids[0]] * 3}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+
+class TestBulkReviewRejectAPI(BulkReviewTestCase):
+    url = reverse('aviation:items-bulk-reject')
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_rejects_with_feedback_for_each_item(self, mock_send):
+        response = self.client.post(
+            self.url,
+            {
+                'item_ids': self.item_ids,
+                'status': 'rejected_full',
+                'field_feedbacks': [
+                    {'field_name': 'threat_type_l1', 'feedback_type': 'full', 'feedback_comment': 'Wrong'},
+                    {'field_name': 'error_management', 'feedback_type': 'partial'},
+                ],
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'rejected_full')
+        self.assertEqual(LabelingItem.objects.filter(pk__in=self.item_ids, status='reviewed').count(), 4)
+        self.assertEqual(FieldFeedback.objects.filter(labeling_item_id__in=self.item_ids).count(), 8)
+        for decision in ReviewDecision.objects.all():
+            self.assertEqual(
+                sorted(decision.field_feedbacks.values_list('field_name', flat=True)),
+                ['error_management', 'threat_type_l1'],
+            )
+
+    def test_requires_field_feedbacks(self):
+        response = self.client.post(
+            self.url, {'item_ids': self.item_ids, 'status': 'rejected_full', 'field_feedbacks': []}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBulkReviewRevisionAPI(BulkReviewTestCase):
+    url = reverse('aviation:items-bulk-revision')
+
+    @patch('notifications.services.NotificationService.send_notification_sync')
+    def test_requests_revision(self, mock_send):
+        response = self.client.post(
+            self.url,
+            {
+                'item_ids': self.item_ids,
+                'field_feedbacks': [{'field_name': 'notes', 'feedback_type': 'revision'}],
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ReviewDecision.objects.filter(status='revision_requested', labeling_item_id__in=self.item_ids).count(), 4
+        )
+        self.assertEqual(LabelingItem.objects.filter(pk__in=self.item_ids, status='reviewed').count(), 4)
+        self.assertEqual(mock_send.call_count, 2)
@@ -0,0 +1,195 @@
+"""
+Tests for aviation event flow (Sankey) aggregation endpoint.
+
+This module tests get_aviation_event_flow and AviationProjectEventsFlowAPI,
+which aggregate threat -> error -> UAS -> training topic transitions in the
+database instead of shipping fully nested events to the frontend.
+"""
+from datetime import date
+
+import pytest
+from aviation.analytics import get_aviation_event_flow
+from aviation.tests.factories import (
+    AviationEventFactory,
+    AviationProjectFactory,
+    LabelingItemFactory,
+    ResultPerformanceFactory,
+    TypeHierarchyFactory,
+)
+from django.core.cache import cache
+from django.urls import reverse
+from organizations.tests.factories import OrganizationFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.tests.factories import UserFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def organization(db):
+    return OrganizationFactory()
+
+
+@pytest.fixture
+def authenticated_client(organization):
+    client = APIClient()
+    client.force_authenticate(user=UserFactory(active_organization=organization))
+    return client
+
+
+@pytest.fixture
+def aviation_project(organization):
+    return AviationProjectFactory(project__organization=organization)
+
+
+@pytest.fixture
+def hierarchy(db):
+    """Create threat/error/UAS types with two levels each."""
+    types = {}
+    for category in ['threat', 'error', 'uas']:
+        l1 = TypeHierarchyFactory(category=category, level=1, code=f'{category.upper()}1', label=f'{category} l1')
+        l3 = TypeHierarchyFactory(
+            category=category,
+            level=3,
+            parent=l1,
+            code=f'{category.upper()}3',
+            label=f'{category} l3',
+            label_zh=f'{category}-zh',
+        )
+        types[category] = (l1, l3)
+    return types
+
+
+def _create_item(aviation_project, hierarchy, event=None, error=True, uas=True, topics=None):
+    event = event or AviationEventFactory(task__project=aviation_project.project)
+    kwargs = {'threat_type_l1': hierarchy['threat'][0], 'threat_type_l3': hierarchy['threat'][1]}
+    if error:
+        kwargs.update(error_type_l1=hierarchy['error'][0], error_type_l3=hierarchy['error'][1])
+    if uas:
+        kwargs.update(uas_type_l1=hierarchy['uas'][0], uas_type_l3=hierarchy['uas'][1])
+    if topics is not None:
+        kwargs['linked_result'] = ResultPerformanceFactory(
+            aviation_project=aviation_project, event=event, training_topics=topics
+        )
+    return LabelingItemFactory(event=event, **kwargs)
+
+
+def _links(flow):
+    return {(link['source'], link['target']): link['value'] for link in flow['links']}
+
+
+def get_flow_url(pk):
+    return reverse('aviation:project-events-flow', kwargs={'pk': pk})
+
+
+@pytest.mark.django_db
+class TestGetAviationEventFlow:
+    def test_returns_none_for_missing_project(self):
+        assert get_aviation_event_flow(999999) is None
+
+    def test_rejects_invalid_level(self, aviation_project):
+        with pytest.raises(ValueError):
+            get_aviation_event_flow(aviation_project.id, level=4)
+
+    def test_counts_full_paths(self, aviation_project, hierarchy):
+        for _ in range(3):
+            _create_item(aviation_project, hierarchy, topics=['CRM', 'SOP'])
+
+        flow = get_aviation_event_flow(aviation_project.id)
+        threat, error, uas = (f'{c}:{hierarchy[c][1].id}' for c in ['threat', 'error', 'uas'])
+
+        assert flow['total_items'] == 3
+        assert _links(flow) == {
+            (threat, error): 3,
+            (error, uas): 3,
+            (uas, 'training_topic:CRM'): 3,
+            (uas, 'training_topic:SOP'): 3,
+        }
+        names = {node['id']: node['name'] for node in flow['nodes']}
+        assert names[threat] == 'threat-zh'
+        assert names['training_topic:CRM'] == 'CRM'
+
+    def test_skips_missing_stages(self, aviation_project, hierarchy):
+        _create_item(aviation_project, hierarchy, error=False, topics=['CRM'])
+        _create_item(aviation_project, hierarchy, error=False, uas=False, topics=['SOP'])
+
+        flow = get_aviation_event_flow(aviation_project.id)
+        threat, uas = f'threat:{hierarchy["threat"][1].id}', f'uas:{hierarchy["uas"][1].id}'
+
+        assert _links(flow) == {
+            (threat, uas): 1,
+            (uas, 'training_topic:CRM'): 1,
+            (threat, 'training_topic:SOP'): 1,
+        }
+
+    def test_uses_requested_level(self, aviation_project, hierarchy):
+        _create_item(aviation_project, hierarchy, uas=False)
+
+        flow = get_aviation_event_flow(aviation_project.id, level=1)
+
+        assert _links(flow) == {(f'threat:{hierarchy["threat"][0].id}', f'error:{hierarchy["error"][0].id}'): 1}
+
+    def test_applies_filters(self, aviation_project, hierarchy):
+        _create_item(
+            aviation_project,
+            hierarchy,
+            uas=False,
+            event=AviationEventFactory(task__project=aviation_project.project, date=date(2023, 1, 1)),
+        )
+        _create_item(
+            aviation_project,
+            hierarchy,
+            uas=False,
+            event=AviationEventFactory(task__project=aviation_project.project, date=date(2024, 6, 1)),
+        )
+
+        flow = get_aviation_event_flow(aviation_project.id, filters={'date_start': date(2024, 1, 1)})
+
+        assert flow['total_items'] == 1
+
+    def test_cached_per_filter_signature(self, aviation_project, hierarchy, django_assert_num_queries):
+        _create_item(aviation_project, hierarchy)
+        get_aviation_event_flow(aviation_project.id, filters={'aircraft': ['A320']})
+
+        with django_assert_num_queries(0):
+            get_aviation_event_flow(aviation_project.id, filters={'aircraft': ['A320']})
+
+        # A different signature is computed separately
+        assert get_aviation_event_flow(aviation_project.id)['total_items'] == 1
+
+
+@pytest.mark.django_db
+class TestAviationProjectEventsFlowAPI:
+    def test_requires_authentication(self, aviation_project):
+        response = APIClient().get(get_flow_url(aviation_project.id))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_other_organization_returns_404(self, authenticated_client):
+        other = AviationProjectFactory(project__organization=OrganizationFactory())
+        response = authenticated_client.get(get_flow_url(other.id))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_invalid_level_returns_400(self, authenticated_client, aviation_project):
+        response = authenticated_client.get(get_flow_url(aviation_project.id), {'level': 'x'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_returns_flow(self, authenticated_client, aviation_project, hierarchy):
+        _create_item(aviation_project, hierarchy, topics=['CRM'])
+
+        response = authenticated_client.get(get_flow_url(aviation_project.id), {'level': 3, 'aircraft': 'A320,B737'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['level'] == 3
+        # Factory events have no aircraft type, so the aircraft filter excludes them
+        assert response.data['total_items'] == 0
+
+        response = authenticated_client.get(get_flow_url(aviation_project.id))
+        assert response.data['total_items'] == 1
+        assert len(response.data['links']) == 3
+        assert {node['stage'] for node in response.data['nodes']} == {'threat', 'error', 'uas', 'training_topic'}
@@ -0,0 +1,138 @@
+"""
+Tests for the in-memory TypeHierarchy tree cache and the type endpoints served from it.
+"""
+from unittest import mock
+
+import pytest
+from aviation import hierarchy_cache
+from aviation.hierarchy_cache import get_type_hierarchy_tree
+from aviation.tests.factories import TypeHierarchyFactory
+from django.urls import reverse
+from organizations.tests.factories import OrganizationFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.tests.factories import UserFactory
+
+
+@pytest.fixture(autouse=True)
+def reset_tree():
+    hierarchy_cache._tree = None
+    yield
+    hierarchy_cache._tree = None
+
+
+@pytest.fixture
+def authenticated_client(db):
+    client = APIClient()
+    client.force_authenticate(user=UserFactory(active_organization=OrganizationFactory()))
+    return client
+
+
+@pytest.fixture
+def taxonomy(db):
+    root = TypeHierarchyFactory(
+        category='threat', level=1, code='TH', label='Environment', label_zh='环境', display_order=1
+    )
+    second_root = TypeHierarchyFactory(category='threat', level=1, code='TA', label='Airline', display_order=0)
+    child = TypeHierarchyFactory(
+        category='threat', level=2, parent=root, code='TH01', label='Weather', label_zh='天气', display_order=0
+    )
+    grandchild = TypeHierarchyFactory(
+        category='threat', level=3, parent=child, code='TH0101', label='Thunderstorm', display_order=0
+    )
+    TypeHierarchyFactory(category='threat', level=2, parent=root, code='TH02', label='Hidden', is_active=False)
+    error = TypeHierarchyFactory(category='error', level=1, code='ER', label='Weather briefing', display_order=0)
+    return {'root': root, 'second_root': second_root, 'child': child, 'grandchild': grandchild, 'error': error}
+
+
+@pytest.mark.django_db
+class TestTypeHierarchyTree:
+    def test_hierarchy_nests_active_children_in_display_order(self, taxonomy):
+        roots = get_type_hierarchy_tree().get_hierarchy('threat')
+
+        assert [node['code'] for node in roots] == ['TA', 'TH']
+        assert [node['code'] for node in roots[1]['children']] == ['TH01']
+        assert roots[1]['children'][0]['children'][0]['code'] == 'TH0101'
+        assert roots[1]['children'][0]['parent_id'] == taxonomy['root'].id
+
+    def test_search_matches_substrings_case_insensitively(self, taxonomy):
+        tree = get_type_hierarchy_tree()
+
+        assert [node['code'] for node in tree.search('weather')] == ['ER', 'TH01']
+        assert [node['code'] for node in tree.search('ATHER', category='threat')] == ['TH01']
+        assert [node['code'] for node in tree.search('天气')] == ['TH01']
+        assert [node['code'] for node in tree.search('thunderstorm')] == ['TH0101']
+        assert tree.search('hidden') == []
+
+    def test_search_long_query(self, db):
+        TypeHierarchyFactory(category='uas', level=1, code='U1', label='Unstable approach below minimums')
+        tree = get_type_hierarchy_tree()
+
+        assert len(tree.search('unstable approach below')) == 1
+        assert tree.search('unstable approach above') == []
+
+    def test_get_by_code(self, taxonomy):
+        tree = get_type_hierarchy_tree()
+
+        assert tree.get_by_code('threat', 'TH01')['id'] == taxonomy['child'].id
+        assert tree.get_by_code('threat', 'TH01', level=3) is None
+        assert tree.get_by_code('error', 'TH01') is None
+
+    def test_rebuilds_after_write(self, taxonomy, django_capture_on_commit_callbacks):
+        tree = get_type_hierarchy_tree()
+        assert get_type_hierarchy_tree() is tree
+
+        with django_capture_on_commit_callbacks(execute=True):
+            taxonomy['child'].label = 'Weather phenomena'
+            taxonomy['child'].save()
+
+        assert get_type_hierarchy_tree() is not tree
+        assert get_type_hierarchy_tree().get(taxonomy['child'].id)['label'] == 'Weather phenomena'
+
+    def test_redis_version_serves_without_queries(self, taxonomy, django_assert_num_queries):
+        with mock.patch.object(hierarchy_cache, 'redis_connected', return_value=True), mock.patch.object(
+            hierarchy_cache, 'redis_get', return_value=b'3'
+        ):
+            get_type_hierarchy_tree()
+            with django_assert_num_queries(0):
+                tree = get_type_hierarchy_tree()
+                tree.get_hierarchy('threat')
+                tree.search('TH')
+
+        assert tree.version == 'redis:3'
+
+
+@pytest.mark.django_db
+class TestTypeHierarchyEndpoints:
+    def test_hierarchy_requires_category(self, authenticated_client):
+        response = authenticated_client.get(reverse('aviation:aviation-type-hierarchy'))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_hierarchy(self, authenticated_client, taxonomy):
+        response = authenticated_client.get(reverse('aviation:aviation-type-hierarchy'), {'category': 'threat'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [node['code'] for node in response.data] == ['TA', 'TH']
+
+    def test_search(self, authenticated_client, taxonomy):
+        response = authenticated_client.get(reverse('aviation:aviation-type-search'), {'q': 'th0'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [node['code'] for node in response.data] == ['TH01', 'TH0101']
+
+    def test_list_nests_children(self, authenticated_client, taxonomy):
+        response = authenticated_client.get(reverse('aviation:aviation-type-list'), {'category': 'threat'})
+
+        assert response.status_code == status.HTTP_200_OK
+        root = next(node for node in response.data if node['code'] == 'TH')
+        assert [node['code'] for node in root['children']] == ['TH01']
+
+    def test_list_resolves_tree_once(self, authenticated_client, taxonomy):
+        with mock.patch.object(
+            hierarchy_cache, 'get_type_hierarchy_version', wraps=hierarchy_cache.get_type_hierarchy_version
+        ) as get_version:
+            response = authenticated_client.get(reverse('aviation:aviation-type-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 5
+        assert get_version.call_count == 1
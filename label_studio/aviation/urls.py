@@ -19,6 +19,11 @@ urlpatterns = [
     path('api/aviation/events/analytics/', api.AllEventsAnalyticsAPI.as_view(), name='all-events-analytics'),
     path('api/aviation/filter-options/', api.AllFilterOptionsAPI.as_view(), name='all-filter-options'),
 
+    # Bulk Review Endpoints (before router.urls so 'bulk' is not captured as <pk>)
+    path('api/aviation/items/bulk/approve/', api.BulkReviewApproveAPI.as_view(), name='items-bulk-approve'),
+    path('api/aviation/items/bulk/reject/', api.BulkReviewRejectAPI.as_view(), name='items-bulk-reject'),
+    path('api/aviation/items/bulk/revision/', api.BulkReviewRevisionAPI.as_view(), name='items-bulk-revision'),
+
     # Router URLs (ViewSets)
     path('api/aviation/', include(router.urls)),
 
@@ -30,6 +35,7 @@ urlpatterns = [
     # Analytics Endpoints (per-project)
     path('api/aviation/projects/<int:pk>/analytics/', api.AviationProjectAnalyticsAPI.as_view(), name='project-analytics'),
     path('api/aviation/projects/<int:pk>/events/analytics/', api.AviationProjectEventsAnalyticsAPI.as_view(), name='project-events-analytics'),
+    path('api/aviation/projects/<int:pk>/events/flow/', api.AviationProjectEventsFlowAPI.as_view(), name='project-events-flow'),
     path('api/aviation/projects/<int:pk>/filter-options/', api.FilterOptionsAPI.as_view(), name='project-filter-options'),
 
     # Review System Endpoints
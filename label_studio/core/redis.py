@@ -71,6 +71,25 @@ def redis_hset(key1, key2, value):
     return _redis.hset(key1, key2, value)
 
 
+def redis_incr(key, amount=1):
+    if not redis_healthcheck():
+        return
+    return _redis.incr(key, amount)
+
+
+def redis_hgetall(key):
+    if not redis_healthcheck():
+        return
+    return _redis.hgetall(key)
+
+
+def redis_pipeline(transaction=False):
+    """Pipeline to batch several commands into one round trip (wrapped in MULTI/EXEC if transaction)"""
+    if not redis_healthcheck():
+        return
+    return _redis.pipeline(transaction=transaction)
+
+
 def redis_delete(key):
     if not redis_healthcheck():
         return
@@ -523,6 +523,11 @@ os.makedirs(TEST_DATA_ROOT, exist_ok=True)
 EXPORT_DIR = os.path.join(BASE_DATA_DIR, "export")
 EXPORT_URL_ROOT = "/export/"
 EXPORT_MIXIN = "data_export.mixins.ExportMixin"
+# Export snapshots are serialized by this many forked processes (PostgreSQL only), 0 or 1 disables it
+EXPORT_PARALLEL_WORKERS = int(get_env("EXPORT_PARALLEL_WORKERS", 0))
+EXPORT_PARALLEL_BATCH_SIZE = int(get_env("EXPORT_PARALLEL_BATCH_SIZE", 1000))
+# Rows per row group of Parquet exports, bounds the memory used to write them
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(get_env("EXPORT_PARQUET_ROW_GROUP_SIZE", 10000))
 # old export dir
 os.makedirs(EXPORT_DIR, exist_ok=True)
 # dir for delayed export
@@ -542,6 +547,11 @@ LABEL_STREAM_HISTORY_LIMIT = int(get_env("LABEL_STREAM_HISTORY_LIMIT", default=1
 RANDOM_NEXT_TASK_SAMPLE_SIZE = int(get_env("RANDOM_NEXT_TASK_SAMPLE_SIZE", 50))
 
 TASK_API_PAGE_SIZE_MAX = int(get_env("TASK_API_PAGE_SIZE_MAX", 0)) or None
+# Seconds to cache totals of filtered Data Manager task lists in Redis (0 disables caching)
+TASK_API_TOTALS_CACHE_TTL = int(get_env("TASK_API_TOTALS_CACHE_TTL", 10))
+# Report planner estimates instead of exact counts for large filtered task lists (PostgreSQL only)
+TASK_API_ESTIMATED_COUNT = get_bool_env("TASK_API_ESTIMATED_COUNT", False)
+TASK_API_ESTIMATED_COUNT_THRESHOLD = int(get_env("TASK_API_ESTIMATED_COUNT_THRESHOLD", 100000))
 
 # Email backend
 FROM_EMAIL = get_env("FROM_EMAIL", "Label Studio <hello@labelstud.io>")
@@ -603,6 +613,12 @@ DATA_MANAGER_ANNOTATIONS_MAP = {}
 DATA_MANAGER_ACTIONS = {}
 DATA_MANAGER_CUSTOM_FILTER_EXPRESSIONS = "data_manager.functions.custom_filter_expressions"
 DATA_MANAGER_PREPROCESS_FILTER = "data_manager.functions.preprocess_filter"
+# Serve annotators, results, model versions and lead time columns from tasks.TaskAggregate instead of GROUP BY
+DATA_MANAGER_PRECOMPUTED_AGGREGATES = get_bool_env("DATA_MANAGER_PRECOMPUTED_AGGREGATES", True)
+# Serve project list counters (task_number, total_annotations_number, etc.) from projects.ProjectCounters
+PROJECT_COUNTERS_MATERIALIZED = get_bool_env("PROJECT_COUNTERS_MATERIALIZED", True)
+# Seconds between runs of the job recalculating all project counters (projects.functions.counters), 0 to disable
+PROJECT_COUNTERS_RECONCILE_INTERVAL = int(get_env("PROJECT_COUNTERS_RECONCILE_INTERVAL", 24 * 60 * 60))
 USER_LOGIN_FORM = "users.forms.LoginForm"
 PROJECT_MIXIN = "projects.mixins.ProjectMixin"
 TASK_MIXIN = "tasks.mixins.TaskMixin"
@@ -649,6 +665,15 @@ COLLECT_VERSIONS = collect_versions_dummy
 
 WEBHOOK_TIMEOUT = float(get_env("WEBHOOK_TIMEOUT", 1.0))
 WEBHOOK_BATCH_SIZE = int(get_env("WEBHOOK_BATCH_SIZE", 100))
+# Webhook dispatcher: concurrent deliveries per event, pooled connections per target host
+WEBHOOK_MAX_WORKERS = int(get_env("WEBHOOK_MAX_WORKERS", 8))
+WEBHOOK_POOL_MAXSIZE = int(get_env("WEBHOOK_POOL_MAXSIZE", 10))
+# Failed deliveries are retried with exponential backoff: WEBHOOK_RETRY_BACKOFF * 2 ** (attempts - 1) seconds
+WEBHOOK_RETRY_MAX_ATTEMPTS = int(get_env("WEBHOOK_RETRY_MAX_ATTEMPTS", 5))
+WEBHOOK_RETRY_BACKOFF = int(get_env("WEBHOOK_RETRY_BACKOFF", 30))
+WEBHOOK_RETRY_BATCH_SIZE = int(get_env("WEBHOOK_RETRY_BATCH_SIZE", 100))
+# Without Redis, cached active webhooks of other processes' writes are picked up after this many seconds
+WEBHOOK_CACHE_TTL = int(get_env("WEBHOOK_CACHE_TTL", 60))
 WEBHOOK_SERIALIZERS = {
     "project": "webhooks.serializers_for_hooks.ProjectWebhookSerializer",
     "task": "webhooks.serializers_for_hooks.TaskWebhookSerializer",
@@ -688,6 +713,9 @@ COLLECT_ANALYTICS = get_bool_env("COLLECT_ANALYTICS", get_bool_env("collect_anal
 SVG_SECURITY_CLEANUP = get_bool_env("SVG_SECURITY_CLEANUP", False)
 
 ML_BLOCK_LOCAL_IP = get_bool_env("ML_BLOCK_LOCAL_IP", False)
+# Tasks are sent to ML backends for predictions in chunks, several chunks at a time
+ML_PREDICTION_CHUNK_SIZE = int(get_env("ML_PREDICTION_CHUNK_SIZE", 100))
+ML_PREDICTION_MAX_WORKERS = int(get_env("ML_PREDICTION_MAX_WORKERS", 4))
 
 RQ_LONG_JOB_TIMEOUT = int(get_env("RQ_LONG_JOB_TIMEOUT", 36000))
 
@@ -699,6 +727,19 @@ FUTURE_SAVE_TASK_TO_STORAGE = get_bool_env("FUTURE_SAVE_TASK_TO_STORAGE", defaul
 FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = get_bool_env("FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT", default=True)
 STORAGE_IN_PROGRESS_TIMER = float(get_env("STORAGE_IN_PROGRESS_TIMER", 5.0))
 STORAGE_EXPORT_CHUNK_SIZE = int(get_env("STORAGE_EXPORT_CHUNK_SIZE", 100))
+# Storage objects listed, checked for existing links and turned into tasks per page of import storage sync
+STORAGE_SYNC_PAGE_SIZE = int(get_env("STORAGE_SYNC_PAGE_SIZE", 500))
+# Objects exported to S3 above this size (bytes) are uploaded in parts
+STORAGE_EXPORT_MULTIPART_THRESHOLD = int(get_env("STORAGE_EXPORT_MULTIPART_THRESHOLD", 8 * 1024 * 1024))
+# Saved annotations are exported to target storages in batches every N seconds (0 exports each save right away),
+# needs Redis and RQ workers running with the scheduler
+STORAGE_EXPORT_COALESCE_WINDOW = int(get_env("STORAGE_EXPORT_COALESCE_WINDOW", 0))
+# Export the pending annotations of a storage right away once there are this many
+STORAGE_EXPORT_COALESCE_MAX_ANNOTATIONS = int(get_env("STORAGE_EXPORT_COALESCE_MAX_ANNOTATIONS", 1000))
+# Presigned storage URLs are cached in Redis for N seconds (at most half of the storage presign TTL, 0 turns it off)
+STORAGE_RESOLVED_URI_CACHE_TTL = int(get_env("STORAGE_RESOLVED_URI_CACHE_TTL", 300))
+# Storage URL routers of this many projects are kept per process (needs Redis to invalidate them, 0 turns it off)
+STORAGE_URL_ROUTER_CACHE_SIZE = int(get_env("STORAGE_URL_ROUTER_CACHE_SIZE", 1000))
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env("USE_NGINX_FOR_EXPORT_DOWNLOADS", False)
 USE_NGINX_FOR_UPLOADS = get_bool_env("USE_NGINX_FOR_UPLOADS", True)
@@ -866,6 +907,27 @@ RESOLVER_PROXY_GCS_DOWNLOAD_URL = get_env(
 RESOLVER_PROXY_GCS_HTTP_TIMEOUT = int(get_env("RESOLVER_PROXY_GCS_HTTP_TIMEOUT", 5))
 RESOLVER_PROXY_ENABLE_ETAG_CACHE = get_bool_env("RESOLVER_PROXY_ENABLE_ETAG_CACHE", True)
 RESOLVER_PROXY_CACHE_TIMEOUT = int(get_env("RESOLVER_PROXY_CACHE_TIMEOUT", 3600))
+# On-disk cache of media proxied from storages with presign off: size budget in bytes (0 turns it off),
+# largest object to cache, directory (BASE_DATA_DIR/media-cache by default) and seconds before an entry is revalidated
+STORAGE_MEDIA_CACHE_SIZE = int(get_env("STORAGE_MEDIA_CACHE_SIZE", 0))
+STORAGE_MEDIA_CACHE_MAX_OBJECT_SIZE = int(get_env("STORAGE_MEDIA_CACHE_MAX_OBJECT_SIZE", 64 * 1024 * 1024))
+STORAGE_MEDIA_CACHE_DIR = get_env("STORAGE_MEDIA_CACHE_DIR", None)
+STORAGE_MEDIA_CACHE_REVALIDATE = int(get_env("STORAGE_MEDIA_CACHE_REVALIDATE", 300))
 
 # Advanced validator for ImportStorageSerializer in enterprise
 IMPORT_STORAGE_SERIALIZER_VALIDATE = None
+
+# Aviation analytics: seconds to cache aggregated event flow (Sankey) results per filter signature
+AVIATION_EVENT_FLOW_CACHE_TIMEOUT = int(get_env("AVIATION_EVENT_FLOW_CACHE_TIMEOUT", 300))
+
+# Notifications outbox: rows delivered per dispatcher batch and publish attempts before marking as failed
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(get_env("NOTIFICATION_OUTBOX_BATCH_SIZE", 500))
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(get_env("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", 10))
+# Seconds before rows left pending by a failed publish are dispatched again
+NOTIFICATION_OUTBOX_RETRY_DELAY = int(get_env("NOTIFICATION_OUTBOX_RETRY_DELAY", 30))
+
+# Notifications SSE hub: one Redis pattern subscription per process fanned out to client queues
+NOTIFICATION_SSE_CHANNEL_PATTERN = get_env("NOTIFICATION_SSE_CHANNEL_PATTERN", "*_notifications")
+NOTIFICATION_SSE_HEARTBEAT_INTERVAL = int(get_env("NOTIFICATION_SSE_HEARTBEAT_INTERVAL", 15))
+NOTIFICATION_SSE_QUEUE_SIZE = int(get_env("NOTIFICATION_SSE_QUEUE_SIZE", 100))
+NOTIFICATION_SSE_REPLAY_LIMIT = int(get_env("NOTIFICATION_SSE_REPLAY_LIMIT", 100))
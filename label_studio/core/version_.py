@@ -0,0 +1,4 @@
+info = {"message": "[user-045] fix: validate storage sync predictions and annotations per task", "commit": "b3aec8e59f6891756cf985b24b38bfcf2c287061", "date": "2026/10/19 04:56:25", "branch": "", "version": "b3aec8e"}
+
+# This file is automatically generated by version.py
+# Do not include it to git!
@@ -17,7 +17,7 @@ from django.db import transaction
 from django.http import FileResponse, HttpResponse
 from django.utils.decorators import method_decorator
 from drf_yasg import openapi as openapi
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import no_body, swagger_auto_schema
 from projects.models import Project
 from ranged_fileresponse import RangedFileResponse
 from rest_framework import generics, status
@@ -168,6 +168,17 @@ class ExportAPI(generics.RetrieveAPIView):
     def get_task_queryset(self, queryset):
         return queryset.select_related('project').prefetch_related('annotations', 'predictions')
 
+    def iter_serialized_tasks(self, query, interpolate_key_frames):
+        """Serialize tasks batch by batch, so only one batch is kept in memory"""
+        task_ids = list(query.values_list('id', flat=True))
+        for _task_ids in batch(task_ids, 1000):
+            yield from ExportDataSerializer(
+                self.get_task_queryset(query.filter(id__in=_task_ids)),
+                many=True,
+                expand=['drafts'],
+                context={'interpolate_key_frames': interpolate_key_frames},
+            ).data
+
     def get(self, request, *args, **kwargs):
         project = self.get_object()
         query_serializer = ExportParamSerializer(data=request.GET)
@@ -190,21 +201,14 @@ class ExportAPI(generics.RetrieveAPIView):
         if only_finished:
             query = query.filter(annotations__isnull=False).distinct()
 
-        task_ids = query.values_list('id', flat=True)
-
-        logger.debug('Serialize tasks for export')
-        tasks = []
-        for _task_ids in batch(task_ids, 1000):
-            tasks += ExportDataSerializer(
-                self.get_task_queryset(query.filter(id__in=_task_ids)),
-                many=True,
-                expand=['drafts'],
-                context={'interpolate_key_frames': interpolate_key_frames},
-            ).data
-        logger.debug('Prepare export files')
-
+        logger.debug('Serialize tasks for export and prepare export files')
         export_file, content_type, filename = DataExport.generate_export_file(
-            project, tasks, export_type, download_resources, request.GET, hostname=request.build_absolute_uri('/')
+            project,
+            self.iter_serialized_tasks(query, interpolate_key_frames),
+            export_type,
+            download_resources,
+            request.GET,
+            hostname=request.build_absolute_uri('/'),
         )
 
         r = FileResponse(export_file, as_attachment=True, content_type=content_type, filename=filename)
@@ -340,6 +344,15 @@ class ExportListAPI(generics.ListCreateAPIView):
         serialization_options = serializer.validated_data.pop('serialization_options')
 
         project = self._get_project()
+        base_export = serializer.validated_data.get('base_export')
+        if base_export is not None and base_export.project_id != project.id:
+            raise ValidationError({'base_export': ['Base export must belong to the same project']})
+        if base_export is not None and base_export.snapshot_options != Export.get_snapshot_options(
+            task_filter_options, annotation_filter_options, serialization_options
+        ):
+            raise ValidationError(
+                {'base_export': ['Base export must be made with the same filter and serialization options']}
+            )
         serializer.save(project=project, created_by=self.request.user)
         instance = serializer.instance
 
@@ -590,7 +603,9 @@ def async_convert(converted_format_id, export_type, project, hostname, download_
     file_name = f'project-{project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}.{ext}'
     file_path = f'{project.id}/{file_name}'  # finally file will be in settings.DELAYED_EXPORT_DIR/project.id/file_name
     file_ = File(converted_file, name=file_path)
-    converted_format.file.save(file_path, file_)
+    # the converted file is streamed into the storage in chunks and removed from disk once closed
+    with converted_file:
+        converted_format.file.save(file_path, file_)
     converted_format.status = ConvertedFormat.Status.COMPLETED
     converted_format.save(update_fields=['file', 'status'])
 
@@ -665,3 +680,57 @@ class ExportConvertAPI(generics.RetrieveAPIView):
             on_failure=set_convert_background_failure,
         )
         return Response({'export_type': export_type, 'converted_format': converted_format.id})
+
+
+@method_decorator(
+    name='post',
+    decorator=swagger_auto_schema(
+        tags=['Export'],
+        operation_summary='Materialize full export snapshot',
+        operation_description="""
+        Create a new full export snapshot by merging the full snapshot a delta snapshot is based on
+        with all deltas up to the given one. The snapshot is created in the background,
+        check its status to see when it's completed.
+        """,
+        request_body=no_body,
+        responses={201: ExportSerializer},
+        manual_parameters=[
+            openapi.Parameter(
+                name='id',
+                type=openapi.TYPE_INTEGER,
+                in_=openapi.IN_PATH,
+                description='A unique integer value identifying this project.',
+            ),
+            openapi.Parameter(
+                name='export_pk',
+                type=openapi.TYPE_STRING,
+                in_=openapi.IN_PATH,
+                description='Primary key identifying the delta export snapshot.',
+            ),
+        ],
+    ),
+)
+class ExportMaterializeAPI(generics.GenericAPIView):
+    queryset = Export.objects.all()
+    project_model = Project
+    serializer_class = ExportSerializer
+    lookup_url_kwarg = 'export_pk'
+    permission_required = all_permissions.projects_change
+
+    def get_queryset(self):
+        project = generics.get_object_or_404(
+            self.project_model.objects.for_user(self.request.user),
+            pk=self.kwargs.get('pk'),
+        )
+        return super().get_queryset().filter(project=project)
+
+    def post(self, request, *args, **kwargs):
+        snapshot = self.get_object()
+        if snapshot.status != Export.Status.COMPLETED:
+            raise ValidationError('Export is not completed')
+        if snapshot.snapshot_type != Export.SnapshotType.DELTA:
+            raise ValidationError('Export is already a full snapshot')
+
+        export = snapshot.run_snapshot_materializing(created_by=request.user)
+        export.refresh_from_db()
+        return Response(self.get_serializer(export).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,31 @@
+"""Process pool of parallel exports, see ExportMixin.get_export_data_parallel.
+
+Workers are spawned rather than forked: RQ and web workers may run threads, and
+a forked child would inherit their held locks and the open DB and Redis sockets
+of the parent process. A spawned worker sets Django up from scratch, so this
+module must not import models: the worker imports it before Django is ready.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+
+def get_export_executor(max_workers) -> ProcessPoolExecutor:
+    """Processes serializing export batches, connected to the same databases as this process"""
+    databases = {alias: connections[alias].settings_dict for alias in connections}
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_export_worker,
+        initargs=(databases,),
+    )
+
+
+def init_export_worker(databases):
+    import django
+
+    # override before the first connection is opened, e.g. to use the test database in tests
+    settings.DATABASES = databases
+    django.setup()
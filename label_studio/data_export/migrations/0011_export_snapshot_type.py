@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_export", "0010_alter_convertedformat_export_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="export",
+            name="base_export",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Previous snapshot this delta snapshot continues from",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="deltas",
+                to="data_export.export",
+            ),
+        ),
+        migrations.AddField(
+            model_name="export",
+            name="high_water_mark",
+            field=models.JSONField(
+                default=dict,
+                help_text="Latest task and annotation updated_at and id covered by this snapshot",
+                verbose_name="high water mark",
+            ),
+        ),
+        migrations.AddField(
+            model_name="export",
+            name="snapshot_type",
+            field=models.CharField(
+                choices=[("full", "Full"), ("delta", "Delta")],
+                default="full",
+                help_text="Full snapshots contain all filtered tasks, delta snapshots only tasks changed since base_export",
+                max_length=16,
+                verbose_name="snapshot type",
+            ),
+        ),
+    ]
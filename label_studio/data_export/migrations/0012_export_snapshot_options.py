@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_export", "0011_export_snapshot_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="export",
+            name="snapshot_options",
+            field=models.JSONField(
+                default=dict,
+                help_text="Task filter, annotation filter and serialization options this snapshot was made with",
+                verbose_name="snapshot options",
+            ),
+        ),
+    ]
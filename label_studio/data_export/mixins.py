@@ -1,34 +1,39 @@
 import hashlib
-import io
 import json
 import logging
 import pathlib
 import shutil
+from collections import deque
 from datetime import datetime
 from functools import reduce
 
 import django_rq
+import ijson
 from core.redis import redis_connected
-from core.utils.common import batch
+from core.utils.common import batch, batched_iterator, db_is_not_sqlite
 from core.utils.io import (
     SerializableGenerator,
     get_all_dirs_from_dir,
     get_all_files_from_dir,
     get_temp_dir,
 )
+from data_export.executor import get_export_executor
+from data_export.parquet import PARQUET, get_project_data_columns, write_parquet
 from data_manager.models import View
 from django.conf import settings
 from django.core.files import File
 from django.core.files import temp as tempfile
 from django.db import transaction
-from django.db.models import Prefetch
+from django.db.models import Max, Prefetch
 from django.db.models.query_utils import Q
 from django.utils import dateformat, timezone
+from django.utils.dateparse import parse_datetime
 from label_studio_sdk.converter import Converter
 from tasks.models import Annotation, AnnotationDraft, Task
 
 ONLY = 'only'
 EXCLUDE = 'exclude'
+CONVERT_CHUNK_SIZE = 1024 * 1024
 
 
 logger = logging.getLogger(__name__)
@@ -150,8 +155,10 @@ class ExportMixin:
                 options['download_resources'] = True
         return options
 
-    def get_task_queryset(self, ids, annotation_filter_options):
+    def get_task_queryset(self, ids, annotation_filter_options, annotation_id_cutoff=None):
         annotations_qs = self._get_filtered_annotations_queryset(annotation_filter_options=annotation_filter_options)
+        if annotation_id_cutoff is not None:
+            annotations_qs = annotations_qs.filter(id__lte=annotation_id_cutoff)
 
         return (
             Task.objects.filter(id__in=ids)
@@ -163,8 +170,100 @@ class ExportMixin:
             )
         )
 
-    def get_export_data(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
+    def get_high_water_mark(self):
+        """Latest task and annotation changes of the project, a delta snapshot exports tasks changed after them"""
+        mark = Task.objects.filter(project_id=self.project_id).aggregate(
+            task_updated_at=Max('updated_at'), task_id=Max('id')
+        )
+        mark.update(
+            Annotation.objects.filter(task__project_id=self.project_id).aggregate(
+                annotation_updated_at=Max('updated_at'), annotation_id=Max('id')
+            )
+        )
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in mark.items()}
+
+    @staticmethod
+    def _get_changed_tasks(tasks, high_water_mark):
+        """Filter tasks created or updated, or with annotations created or updated, after the high water mark"""
+        if high_water_mark.get('task_id') is None:
+            # the base snapshot was taken from an empty project
+            return tasks
+        q = Q(id__gt=high_water_mark['task_id'])
+        if high_water_mark.get('task_updated_at'):
+            q |= Q(updated_at__gt=parse_datetime(high_water_mark['task_updated_at']))
+        if high_water_mark.get('annotation_id') is None:
+            q |= Q(annotations__isnull=False)
+        else:
+            q |= Q(annotations__id__gt=high_water_mark['annotation_id'])
+            if high_water_mark.get('annotation_updated_at'):
+                q |= Q(annotations__updated_at__gt=parse_datetime(high_water_mark['annotation_updated_at']))
+        return tasks.filter(q)
+
+    @staticmethod
+    def get_snapshot_options(task_filter_options=None, annotation_filter_options=None, serialization_options=None):
+        """Options a delta snapshot must share with its base, otherwise their tasks don't line up"""
+        return {
+            'task_filter_options': task_filter_options,
+            'annotation_filter_options': annotation_filter_options,
+            'serialization_options': serialization_options,
+        }
+
+    def get_base_export(self):
         """
+        The snapshot a delta snapshot continues from: the given one or the latest completed in the project,
+        made with the same snapshot options. None if there is no such snapshot.
+        """
+        if self.base_export is not None:
+            return self.base_export if self.base_export.snapshot_options == self.snapshot_options else None
+        exports = (
+            self.__class__.objects.filter(project_id=self.project_id, status=self.Status.COMPLETED, id__lt=self.id)
+            .exclude(high_water_mark={})
+            .order_by('-id')
+        )
+        # compared in python, JSON equality differs between database backends
+        for export in exports.only('id', 'snapshot_options', 'high_water_mark').iterator():
+            if export.snapshot_options == self.snapshot_options:
+                return export
+        return None
+
+    def get_export_task_ids(self, task_filter_options=None, high_water_mark=None):
+        tasks = self._get_filtered_tasks(self.project.tasks, task_filter_options=task_filter_options)
+        if high_water_mark is not None:
+            tasks = self._get_changed_tasks(tasks, high_water_mark)
+        return tasks.distinct().values_list('id', flat=True)
+
+    def serialize_tasks_batch(
+        self,
+        ids,
+        task_filter_options,
+        annotation_filter_options,
+        serialization_options,
+        export_serializer_option,
+        annotation_id_cutoff=None,
+    ):
+        from .serializers import ExportDataSerializer
+
+        tasks = list(self.get_task_queryset(ids, annotation_filter_options, annotation_id_cutoff=annotation_id_cutoff))
+        if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
+            tasks = [task for task in tasks if task.annotations.exists()]
+
+        if serialization_options and serialization_options.get('include_annotation_history') is True:
+            task_ids = [task.id for task in tasks]
+            annotation_ids = Annotation.objects.filter(task_id__in=task_ids).values_list('id', flat=True)
+            export_serializer_option = self.update_export_serializer_option(export_serializer_option, annotation_ids)
+
+        return ExportDataSerializer(tasks, many=True, **export_serializer_option).data
+
+    def get_export_data(
+        self,
+        task_filter_options=None,
+        annotation_filter_options=None,
+        serialization_options=None,
+        high_water_mark=None,
+    ):
+        """
+        high_water_mark: None or Dict as returned by get_high_water_mark(), export only tasks changed after it
+
         serialization_options: None or Dict({
             drafts: optional
                 None
@@ -186,8 +285,6 @@ class ExportMixin:
                 })
         })
         """
-        from .serializers import ExportDataSerializer
-
         logger.debug('Run get_task_queryset')
 
         start = datetime.now()
@@ -195,39 +292,89 @@ class ExportMixin:
             # TODO: make counters from queryset
             # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
             self.counters = {'task_number': 0}
-            all_tasks = self.project.tasks
             logger.debug('Tasks filtration')
-            task_ids = (
-                self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
-                .distinct()
-                .values_list('id', flat=True)
-            )
+            task_ids = self.get_export_task_ids(task_filter_options, high_water_mark)
             base_export_serializer_option = self._get_export_serializer_option(serialization_options)
             i = 0
             BATCH_SIZE = 1000
             for ids in batch(task_ids, BATCH_SIZE):
                 i += 1
-                tasks = list(self.get_task_queryset(ids, annotation_filter_options))
                 logger.debug(f'Batch: {i*BATCH_SIZE}')
-                if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
-                    tasks = [task for task in tasks if task.annotations.exists()]
-
-                if serialization_options and serialization_options.get('include_annotation_history') is True:
-                    task_ids = [task.id for task in tasks]
-                    annotation_ids = Annotation.objects.filter(task_id__in=task_ids).values_list('id', flat=True)
-                    base_export_serializer_option = self.update_export_serializer_option(
-                        base_export_serializer_option, annotation_ids
-                    )
-
-                serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
-                self.counters['task_number'] += len(tasks)
-                for task in serializer.data:
+                data = self.serialize_tasks_batch(
+                    ids,
+                    task_filter_options,
+                    annotation_filter_options,
+                    serialization_options,
+                    base_export_serializer_option,
+                )
+                self.counters['task_number'] += len(data)
+                for task in data:
                     yield task
         duration = datetime.now() - start
         logger.info(
             f'{self.counters["task_number"]} tasks from project {self.project_id} exported in {duration.total_seconds():.2f} seconds'
         )
 
+    def can_export_in_parallel(self):
+        """Workers open their own DB connections, so the export can't run inside a transaction or on sqlite"""
+        return (
+            settings.EXPORT_PARALLEL_WORKERS > 1
+            and db_is_not_sqlite()
+            and not transaction.get_connection().in_atomic_block
+        )
+
+    def get_export_data_parallel(
+        self,
+        task_filter_options=None,
+        annotation_filter_options=None,
+        serialization_options=None,
+        high_water_mark=None,
+    ):
+        """Like get_export_data, but task batches are serialized by EXPORT_PARALLEL_WORKERS processes.
+
+        Instead of one transaction, the snapshot is defined by an ID cutoff: the task ids are collected
+        and the latest annotation id is taken before serialization starts.
+        Yields JSON-encoded tasks in task id order.
+        """
+        start = datetime.now()
+        self.counters = {'task_number': 0}
+        task_ids = list(self.get_export_task_ids(task_filter_options, high_water_mark).order_by('id'))
+        annotations = Annotation.objects.filter(task__project_id=self.project_id)
+        annotation_id_cutoff = annotations.aggregate(max_id=Max('id'))['max_id']
+        batches = batch(task_ids, settings.EXPORT_PARALLEL_BATCH_SIZE)
+        max_workers = settings.EXPORT_PARALLEL_WORKERS
+
+        def collect(future):
+            encoded_tasks = future.result()
+            self.counters['task_number'] += len(encoded_tasks)
+            return encoded_tasks
+
+        with get_export_executor(max_workers) as executor:
+            pending = deque()
+            for ids in batches:
+                pending.append(
+                    executor.submit(
+                        serialize_export_batch,
+                        self.id,
+                        ids,
+                        task_filter_options,
+                        annotation_filter_options,
+                        serialization_options,
+                        annotation_id_cutoff,
+                    )
+                )
+                # keep a bounded number of serialized batches in memory, stitch them in order
+                if len(pending) >= max_workers * 2:
+                    yield from collect(pending.popleft())
+            while pending:
+                yield from collect(pending.popleft())
+
+        duration = datetime.now() - start
+        logger.info(
+            f'{self.counters["task_number"]} tasks from project {self.project_id} exported by {max_workers} '
+            f'workers in {duration.total_seconds():.2f} seconds'
+        )
+
     def update_export_serializer_option(self, base_export_serializer_option, annotation_ids):
         return base_export_serializer_option
 
@@ -244,12 +391,13 @@ class ExportMixin:
 
     def save_file(self, file, md5):
         now = datetime.now()
-        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}.json'
+        suffix = '-delta' if self.snapshot_type == self.SnapshotType.DELTA else ''
+        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}{suffix}.json'
         file_path = f'{self.project.id}/{file_name}'  # finally file will be in settings.DELAYED_EXPORT_DIR/self.project.id/file_name
         file_ = File(file, name=file_path)
         self.file.save(file_path, file_)
         self.md5 = md5
-        self.save(update_fields=['file', 'md5', 'counters'])
+        self.save(update_fields=['file', 'md5', 'counters', 'high_water_mark'])
 
     def export_to_file(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
         logger.debug(
@@ -259,15 +407,35 @@ class ExportMixin:
             f'serialization_options: {serialization_options}\n'
         )
         try:
-            iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
-                SerializableGenerator(
-                    self.get_export_data(
-                        task_filter_options=task_filter_options,
-                        annotation_filter_options=annotation_filter_options,
-                        serialization_options=serialization_options,
-                    )
-                )
+            # taken before serialization, so changes made while exporting go to the next delta
+            high_water_mark = self.get_high_water_mark()
+            base_high_water_mark = None
+            self.snapshot_options = self.get_snapshot_options(
+                task_filter_options, annotation_filter_options, serialization_options
             )
+            if self.snapshot_type == self.SnapshotType.DELTA:
+                base_export = self.get_base_export()
+                if base_export is None:
+                    logger.info(f'No snapshot with the same options to continue export {self.id}, making a full one')
+                    self.snapshot_type = self.SnapshotType.FULL
+                    self.base_export = None
+                else:
+                    self.base_export = base_export
+                    base_high_water_mark = base_export.high_water_mark
+            self.save(update_fields=['snapshot_options', 'snapshot_type', 'base_export'])
+
+            export_options = dict(
+                task_filter_options=task_filter_options,
+                annotation_filter_options=annotation_filter_options,
+                serialization_options=serialization_options,
+                high_water_mark=base_high_water_mark,
+            )
+            if self.can_export_in_parallel():
+                iter_json = iter_json_list(self.get_export_data_parallel(**export_options))
+            else:
+                iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
+                    SerializableGenerator(self.get_export_data(**export_options))
+                )
             with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
                 for chunk in iter_json:
                     encoded_chunk = chunk.encode('utf-8')
@@ -275,6 +443,7 @@ class ExportMixin:
                 file.seek(0)
 
                 md5 = self.eval_md5(file)
+                self.high_water_mark = high_water_mark
                 self.save_file(file, md5)
 
             self.status = self.Status.COMPLETED
@@ -314,7 +483,115 @@ class ExportMixin:
                 serialization_options=serialization_options,
             )
 
+    @staticmethod
+    def iter_file_tasks(file):
+        """Read tasks of a snapshot file one by one"""
+        with file.open('rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+
+    def get_snapshot_chain(self):
+        """Return the full snapshot this snapshot is built on and its deltas up to this one, oldest first"""
+        chain = [self]
+        while chain[-1].snapshot_type == self.SnapshotType.DELTA:
+            base_export = chain[-1].base_export
+            if base_export is None or base_export.status != self.Status.COMPLETED or not base_export.file:
+                raise ValueError(f'Export {chain[-1].id} has no completed snapshot to continue from')
+            chain.append(base_export)
+        full, *deltas = reversed(chain)
+        return full, deltas
+
+    def _iter_merged_tasks(self, full, deltas):
+        # deltas hold only changed tasks, so they are small enough to be kept in memory
+        changed = {}
+        for delta in deltas:
+            for task in self.iter_file_tasks(delta.file):
+                changed[task['id']] = task
+
+        def existing(tasks):
+            # tasks deleted since the snapshots were taken are dropped
+            ids = set(
+                Task.objects.filter(project_id=self.project_id, id__in=[task['id'] for task in tasks]).values_list(
+                    'id', flat=True
+                )
+            )
+            return [task for task in tasks if task['id'] in ids]
+
+        for tasks in batched_iterator(self.iter_file_tasks(full.file), settings.BATCH_SIZE):
+            for task in existing(tasks):
+                yield changed.pop(task['id'], task)
+        for tasks in batched_iterator(changed.values(), settings.BATCH_SIZE):
+            yield from existing(tasks)
+
+    def materialize_snapshot(self, export):
+        """Merge the full snapshot with the deltas up to this one into the given export as a full snapshot"""
+        from .models import DataExport
+
+        try:
+            full, deltas = self.get_snapshot_chain()
+            export.snapshot_type = self.SnapshotType.FULL
+            export.base_export = self
+            export.counters = {'task_number': 0}
+
+            def tasks():
+                for task in self._iter_merged_tasks(full, deltas):
+                    export.counters['task_number'] += 1
+                    yield task
+
+            with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
+                md5 = DataExport.write_export_file(tasks(), file)
+                file.seek(0)
+                export.high_water_mark = self.high_water_mark
+                export.snapshot_options = self.snapshot_options
+                export.save(update_fields=['snapshot_type', 'base_export', 'snapshot_options'])
+                export.save_file(file, md5)
+
+            export.status = self.Status.COMPLETED
+            export.save(update_fields=['status'])
+        except Exception as e:
+            export.status = self.Status.FAILED
+            export.save(update_fields=['status'])
+            logger.exception('Snapshot materializing was failed: %s', e)
+        finally:
+            export.finished_at = datetime.now()
+            export.save(update_fields=['finished_at'])
+
+    def run_snapshot_materializing(self, created_by=None):
+        """Create a full snapshot from this delta snapshot in the background, returns the new export"""
+        export = self.__class__.objects.create(
+            project=self.project,
+            created_by=created_by,
+            status=self.Status.IN_PROGRESS,
+            snapshot_type=self.SnapshotType.FULL,
+            base_export=self,
+        )
+        if redis_connected():
+            queue = django_rq.get_queue('default')
+            queue.enqueue(
+                materialize_background,
+                export.id,
+                self.id,
+                on_failure=set_export_background_failure,
+                job_timeout='3h',  # 3 hours
+            )
+        else:
+            self.materialize_snapshot(export)
+        return export
+
+    def convert_to_parquet(self):
+        """Stream the snapshot into a Parquet file, task by task"""
+        converted = tempfile.NamedTemporaryFile(suffix='.parquet', dir=settings.FILE_UPLOAD_TEMP_DIR)
+        try:
+            write_parquet(self.iter_file_tasks(self.file), converted, get_project_data_columns(self.project))
+        except Exception:
+            converted.close()
+            raise
+        converted.seek(0)
+        return File(converted, name=pathlib.Path(self.file.name).stem + '.parquet')
+
     def convert_file(self, to_format, download_resources=False, hostname=None):
+        if to_format == PARQUET:
+            return self.convert_to_parquet()
+
         with get_temp_dir() as tmp_dir:
             OUT = 'out'
             out_dir = pathlib.Path(tmp_dir) / OUT
@@ -332,8 +609,9 @@ class ExportMixin:
             input_name = pathlib.Path(self.file.name).name
             input_file_path = pathlib.Path(tmp_dir) / input_name
 
-            with open(input_file_path, 'wb') as file_:
-                file_.write(self.file.open().read())
+            # copy the snapshot in chunks, it can be larger than the available memory
+            with self.file.open('rb') as snapshot, open(input_file_path, 'wb') as file_:
+                shutil.copyfileobj(snapshot, file_, CONVERT_CHUNK_SIZE)
 
             converter.convert(input_file_path, out_dir, to_format, is_dir=False)
 
@@ -350,12 +628,40 @@ class ExportMixin:
                 output_file = pathlib.Path(tmp_dir) / (str(out_dir.stem) + '.zip')
                 filename = pathlib.Path(input_name).stem + '.zip'
 
-            # TODO(jo): can we avoid the `f.read()` here?
+            # the temp dir is removed on exit, move the result to a temp file that is deleted once it's closed
+            converted = tempfile.NamedTemporaryFile(
+                suffix=pathlib.Path(filename).suffix, dir=settings.FILE_UPLOAD_TEMP_DIR
+            )
             with open(output_file, mode='rb') as f:
-                return File(
-                    io.BytesIO(f.read()),
-                    name=filename,
-                )
+                shutil.copyfileobj(f, converted, CONVERT_CHUNK_SIZE)
+            converted.seek(0)
+            return File(converted, name=filename)
+
+
+def serialize_export_batch(
+    export_id, ids, task_filter_options, annotation_filter_options, serialization_options, annotation_id_cutoff
+):
+    """Serialize one batch of tasks in an export worker, returns JSON-encoded tasks"""
+    from data_export.models import Export
+
+    export = Export.objects.select_related('project').get(id=export_id)
+    data = export.serialize_tasks_batch(
+        ids,
+        task_filter_options,
+        annotation_filter_options,
+        serialization_options,
+        export._get_export_serializer_option(serialization_options),
+        annotation_id_cutoff=annotation_id_cutoff,
+    )
+    return [json.dumps(task, ensure_ascii=False) for task in data]
+
+
+def iter_json_list(encoded_items):
+    """Stitch JSON-encoded items into a JSON list"""
+    yield '['
+    for i, item in enumerate(encoded_items):
+        yield ', ' + item if i else item
+    yield ']'
 
 
 def export_background(
@@ -370,6 +676,13 @@ def export_background(
     )
 
 
+def materialize_background(export_id, delta_export_id, *args, **kwargs):
+    from data_export.models import Export
+
+    export = Export.objects.get(id=export_id)
+    Export.objects.get(id=delta_export_id).materialize_snapshot(export)
+
+
 def set_export_background_failure(job, connection, type, value, traceback):
     from data_export.models import Export
 
@@ -4,6 +4,7 @@ import hashlib
 import logging
 import os
 import shutil
+import tempfile
 from copy import deepcopy
 from datetime import datetime
 
@@ -20,6 +21,8 @@ from django.utils.translation import gettext_lazy as _
 from label_studio_sdk.converter import Converter
 from tasks.models import Annotation
 
+from .parquet import PARQUET, PARQUET_CONTENT_TYPE, PARQUET_FORMAT_INFO, get_project_data_columns, write_parquet
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +36,10 @@ class Export(ExportMixin, models.Model):
         FAILED = 'failed', _('Failed')
         COMPLETED = 'completed', _('Completed')
 
+    class SnapshotType(models.TextChoices):
+        FULL = 'full', _('Full')
+        DELTA = 'delta', _('Delta')
+
     title = models.CharField(
         _('title'),
         blank=True,
@@ -82,6 +89,31 @@ class Export(ExportMixin, models.Model):
         null=True,
         verbose_name=_('created by'),
     )
+    snapshot_type = models.CharField(
+        _('snapshot type'),
+        max_length=16,
+        choices=SnapshotType.choices,
+        default=SnapshotType.FULL,
+        help_text='Full snapshots contain all filtered tasks, delta snapshots only tasks changed since base_export',
+    )
+    base_export = models.ForeignKey(
+        'self',
+        related_name='deltas',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        help_text='Previous snapshot this delta snapshot continues from',
+    )
+    high_water_mark = models.JSONField(
+        _('high water mark'),
+        default=dict,
+        help_text='Latest task and annotation updated_at and id covered by this snapshot',
+    )
+    snapshot_options = models.JSONField(
+        _('snapshot options'),
+        default=dict,
+        help_text='Task filter, annotation filter and serialization options this snapshot was made with',
+    )
 
 
 @receiver(post_save, sender=Export)
@@ -92,18 +124,16 @@ def set_export_default_name(sender, instance, created, **kwargs):
 
 
 class DataExport(object):
-    # TODO: deprecated
     @staticmethod
-    def save_export_files(project, now, get_args, data, md5, name):
-        """Generate two files: meta info and result file and store them locally for logging"""
-        filename_results = os.path.join(settings.EXPORT_DIR, name + '.json')
-        filename_info = os.path.join(settings.EXPORT_DIR, name + '-info.json')
+    def save_export_info(project, now, get_args, md5, filename_results):
+        """Store meta info of the result file next to it for logging"""
+        filename_info = os.path.splitext(filename_results)[0] + '-info.json'
         annotation_number = Annotation.objects.filter(project=project).count()
         try:
             platform_version = version.get_git_version()
         except:  # noqa: E722
             platform_version = 'none'
-            logger.error('Version is not detected in save_export_files()')
+            logger.error('Version is not detected in save_export_info()')
         info = {
             'project': {
                 'title': project.title,
@@ -121,13 +151,39 @@ class DataExport(object):
                 'md5': md5,
             },
         }
+        with open(filename_info, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        return filename_info
 
+    # TODO: deprecated
+    @staticmethod
+    def save_export_files(project, now, get_args, data, md5, name):
+        """Generate two files: meta info and result file and store them locally for logging"""
+        filename_results = os.path.join(settings.EXPORT_DIR, name + '.json')
         with open(filename_results, 'w', encoding='utf-8') as f:
             f.write(data)
-        with open(filename_info, 'w', encoding='utf-8') as f:
-            json.dump(info, f, ensure_ascii=False)
+        DataExport.save_export_info(project, now, get_args, md5, filename_results)
         return filename_results
 
+    @staticmethod
+    def write_export_file(tasks, file):
+        """Stream serialized tasks into a binary file as a JSON list, one task at a time.
+
+        :param tasks: iterable of serialized tasks, it's consumed lazily
+        :return: md5 of the written content
+        """
+        md5 = hashlib.md5()   # nosec
+        separator = b'['
+        for task in tasks:
+            chunk = separator + json.dumps(task, ensure_ascii=False).encode('utf-8')
+            md5.update(chunk)
+            file.write(chunk)
+            separator = b', '
+        tail = b']' if separator == b', ' else b'[]'
+        md5.update(tail)
+        file.write(tail)
+        return md5.hexdigest()
+
     @staticmethod
     def get_export_formats(project):
         converter = Converter(config=project.get_parsed_config(), project_dir=None)
@@ -139,22 +195,52 @@ class DataExport(object):
             if format.name not in supported_formats:
                 format_info['disabled'] = True
             formats.append(format_info)
+        formats.append(deepcopy(PARQUET_FORMAT_INFO))
         return sorted(formats, key=lambda f: f.get('disabled', False))
 
+    @staticmethod
+    def generate_parquet_file(project, tasks, get_args):
+        """Write tasks straight into a Parquet file, without the intermediate JSON and converter"""
+        now = datetime.now()
+        with tempfile.NamedTemporaryFile(dir=settings.EXPORT_DIR, suffix='.parquet.part', delete=False) as file:
+            try:
+                write_parquet(tasks, file, get_project_data_columns(project))
+            except Exception:
+                os.unlink(file.name)
+                raise
+        with open(file.name, 'rb') as f:
+            md5 = ExportMixin.eval_md5(f)
+        name = 'project-' + str(project.id) + '-at-' + now.strftime('%Y-%m-%d-%H-%M') + f'-{md5[0:8]}'
+        output_file = os.path.join(settings.EXPORT_DIR, name + '.parquet')
+        os.replace(file.name, output_file)
+        DataExport.save_export_info(project, now, get_args, md5, output_file)
+        return path_to_open_binary_file(output_file), PARQUET_CONTENT_TYPE, name + '.parquet'
+
     @staticmethod
     def generate_export_file(project, tasks, output_format, download_resources, get_args, hostname=None):
         """Generate export file and return it as an open file object.
 
         Be sure to close the file after using it, to avoid wasting disk space.
+
+        Tasks can be any iterable of serialized tasks: they are written to the export file as they come,
+        so a generator keeps memory usage independent of the project size.
         """
 
-        # prepare for saving
+        if output_format == PARQUET:
+            return DataExport.generate_parquet_file(project, tasks, get_args)
+
+        # stream tasks into the export dir first, the final name depends on the md5 of the content
         now = datetime.now()
-        data = json.dumps(tasks, ensure_ascii=False)
-        md5 = hashlib.md5(json.dumps(data).encode('utf-8')).hexdigest()   # nosec
+        with tempfile.NamedTemporaryFile(dir=settings.EXPORT_DIR, suffix='.json.part', delete=False) as file:
+            try:
+                md5 = DataExport.write_export_file(tasks, file)
+            except Exception:
+                os.unlink(file.name)
+                raise
         name = 'project-' + str(project.id) + '-at-' + now.strftime('%Y-%m-%d-%H-%M') + f'-{md5[0:8]}'
-
-        input_json = DataExport.save_export_files(project, now, get_args, data, md5, name)
+        input_json = os.path.join(settings.EXPORT_DIR, name + '.json')
+        os.replace(file.name, input_json)
+        DataExport.save_export_info(project, now, get_args, md5, input_json)
 
         converter = Converter(
             config=project.get_parsed_config(),
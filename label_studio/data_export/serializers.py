@@ -95,8 +95,10 @@ class ExportSerializer(serializers.ModelSerializer):
             'md5',
             'counters',
             'converted_formats',
+            'high_water_mark',
+            'snapshot_options',
         ]
-        fields = ['title'] + read_only
+        fields = ['title', 'snapshot_type', 'base_export'] + read_only
 
     created_by = UserSimpleSerializer(required=False)
     converted_formats = ConvertedFormatSerializer(many=True, required=False)
@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import logging
+from functools import partial
 
 from asgiref.sync import async_to_sync, sync_to_async
 from core.feature_flags import flag_set
@@ -18,9 +19,9 @@ from data_manager.serializers import (
     ViewResetSerializer,
     ViewSerializer,
 )
+from data_manager.totals import count_exact_totals, count_totals, get_tasks_totals, is_filtered
 from django.conf import settings
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -205,11 +206,21 @@ class ViewAPI(viewsets.ModelViewSet):
         return View.objects.filter(project__organization=self.request.user.active_organization).order_by('order', 'id')
 
 
+class CountedPaginator(Paginator):
+    """Paginator taking the number of objects from the caller instead of running its own COUNT"""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = count
+
+
 class TaskPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
     total_annotations = 0
     total_predictions = 0
+    estimated_totals = ()
     max_page_size = settings.TASK_API_PAGE_SIZE_MAX
 
     @async_to_sync
@@ -221,34 +232,45 @@ class TaskPagination(PageNumberPagination):
         self.total_annotations = await sync_to_async(annotations_count_qs.count, thread_sensitive=True)()
         return await sync_to_async(super().paginate_queryset, thread_sensitive=True)(queryset, request, view)
 
-    def sync_paginate_queryset(self, queryset, request, view=None):
-        self.total_predictions = Prediction.objects.filter(task_id__in=queryset).count()
-        self.total_annotations = Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count()
-        return super().paginate_queryset(queryset, request, view)
-
-    def paginate_totals_queryset(self, queryset, request, view=None):
-        totals = queryset.values('id').aggregate(
-            total_annotations=Coalesce(Sum('total_annotations'), 0),
-            total_predictions=Coalesce(Sum('total_predictions'), 0),
-        )
+    @staticmethod
+    def get_totals(queryset, view=None, exact=False):
+        # views with prepare params get project counters for unfiltered lists and cached totals otherwise
+        prepare_params = getattr(view, 'prepare_params', None)
+        if prepare_params is None:
+            return count_exact_totals(queryset) if exact else count_totals(queryset)
+        return get_tasks_totals(queryset, prepare_params.project, filtered=is_filtered(prepare_params), exact=exact)
+
+    def paginate_queryset_with_totals(self, queryset, request, view, totals):
         self.total_annotations = totals['total_annotations']
         self.total_predictions = totals['total_predictions']
+        self.estimated_totals = totals.get('estimated', ())
+        self.django_paginator_class = partial(CountedPaginator, count=totals['total'])
         return super().paginate_queryset(queryset, request, view)
 
+    def sync_paginate_queryset(self, queryset, request, view=None):
+        totals = self.get_totals(queryset, view, exact=True)
+        return self.paginate_queryset_with_totals(queryset, request, view, totals)
+
+    def paginate_totals_queryset(self, queryset, request, view=None):
+        totals = self.get_totals(queryset, view)
+        return self.paginate_queryset_with_totals(queryset, request, view, totals)
+
     def paginate_queryset(self, queryset, request, view=None):
         if flag_set('fflag_fix_back_optic_1407_optimize_tasks_api_pagination_counts'):
             return self.paginate_totals_queryset(queryset, request, view)
         return self.sync_paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
-        return Response(
-            {
-                'total_annotations': self.total_annotations,
-                'total_predictions': self.total_predictions,
-                'total': self.page.paginator.count,
-                'tasks': data,
-            }
-        )
+        response = {
+            'total_annotations': self.total_annotations,
+            'total_predictions': self.total_predictions,
+            'total': self.page.paginator.count,
+            'tasks': data,
+        }
+        # totals taken from the planner estimate are flagged, e.g. total_estimated=True
+        for field in self.estimated_totals:
+            response[f'{field}_estimated'] = True
+        return Response(response)
 
 
 class TaskListAPI(generics.ListCreateAPIView):
@@ -310,6 +332,8 @@ class TaskListAPI(generics.ListCreateAPIView):
         prepare_params = get_prepare_params(request, project)
         queryset = self.get_task_queryset(request, prepare_params)
         context = self.get_task_serializer_context(self.request, project)
+        # used by the pagination to pick how totals are counted
+        self.prepare_params = prepare_params
 
         # paginated tasks
         page = self.paginate_queryset(queryset)
@@ -348,6 +372,9 @@ class TaskListAPI(generics.ListCreateAPIView):
                 evaluate_predictions(tasks_for_predictions)
                 [tasks_by_ids[_id].refresh_from_db() for _id in ids]
 
+            if context['resolve_uri']:
+                # one FileUpload query for the page instead of one per task field
+                context['upload_urls'] = Task.get_upload_urls([task.data for task in page], project)
             serializer = self.task_serializer_class(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
         # all tasks
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class DataManagerConfig(AppConfig):
     name = 'data_manager'
+
+    def ready(self):
+        from data_manager import signals  # noqa: F401
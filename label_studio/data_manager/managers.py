@@ -237,13 +237,47 @@ def add_result_filter(field_name, _filter, filter_expressions, project):
         return 'continue'
     elif _filter.operator == Operator.EMPTY:
         if cast_bool_from_str(_filter.value):
-            q = Q(annotations__result__isnull=True) | Q(annotations__result=[])
+            q = ~annotations_exist() | annotations_exist(Q(result__isnull=True) | Q(result=[]))
         else:
-            q = Q(annotations__result__isnull=False) & ~Q(annotations__result=[])
+            q = annotations_exist(result__isnull=False) & ~annotations_exist(result=[])
         filter_expressions.append(q)
         return 'continue'
 
 
+def annotations_exist(*args, **kwargs):
+    """Match tasks by their annotations without joining them, so tasks aren't repeated per annotation"""
+    from tasks.models import Annotation
+
+    return Exists(Annotation.objects.filter(*args, task=OuterRef('pk'), **kwargs))
+
+
+def predictions_exist(*args, **kwargs):
+    from tasks.models import Prediction
+
+    return Exists(Prediction.objects.filter(*args, task=OuterRef('pk'), **kwargs))
+
+
+def aggregate_index_filters_enabled():
+    """TaskAggregate list columns have GIN indexes on PostgreSQL, see tasks migration 0059"""
+    return settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES and settings.DJANGO_DB != settings.DJANGO_DB_SQLITE
+
+
+def add_annotators_filter(_filter, filter_expressions):
+    if _filter.operator == Operator.CONTAINS:
+        if aggregate_index_filters_enabled():
+            filter_expressions.append(Q(aggregate__annotators__contains=[int(_filter.value)]))
+        else:
+            filter_expressions.append(annotations_exist(completed_by=int(_filter.value)))
+        return 'continue'
+    elif _filter.operator == Operator.NOT_CONTAINS:
+        filter_expressions.append(~annotations_exist(completed_by=int(_filter.value)))
+        return 'continue'
+    elif _filter.operator == Operator.EMPTY:
+        q = annotations_exist(completed_by__isnull=False)
+        filter_expressions.append(~q if cast_bool_from_str(_filter.value) else q)
+        return 'continue'
+
+
 def add_user_filter(enabled, key, _filter, filter_expressions):
     if enabled and _filter.operator == Operator.CONTAINS:
         filter_expressions.append(Q(**{key: int(_filter.value)}))
@@ -286,8 +320,7 @@ def apply_filters(queryset, filters, project, request):
             continue
 
         # annotators
-        result = add_user_filter(field_name == 'annotators', 'annotations__completed_by', _filter, filter_expressions)
-        if result == 'continue':
+        if field_name == 'annotators' and add_annotators_filter(_filter, filter_expressions) == 'continue':
             continue
 
         # updated_by
@@ -308,18 +341,27 @@ def apply_filters(queryset, filters, project, request):
             field_name = 'annotations__id'
             if 'contains' in _filter.operator:
                 # convert string like "1 2,3" => [1,2,3]
-                _filter.value = [int(value) for value in re.split(',|;| ', _filter.value) if value and value.isdigit()]
-                _filter.operator = 'in_list' if _filter.operator == 'contains' else 'not_in_list'
+                ids = [int(value) for value in re.split(',|;| ', _filter.value) if value and value.isdigit()]
+                if ids and _filter.operator == Operator.CONTAINS and aggregate_index_filters_enabled():
+                    q = Q()
+                    for id_ in ids:
+                        q |= Q(aggregate__annotations_ids__contains=[id_])
+                    filter_expressions.append(q)
+                    continue
+                q = annotations_exist(id__in=ids)
+                filter_expressions.append(q if _filter.operator == Operator.CONTAINS else ~q)
+                continue
             elif 'equal' in _filter.operator:
-                if not _filter.value.isdigit():
-                    _filter.value = 0
+                q = annotations_exist(id=int(_filter.value) if _filter.value.isdigit() else 0)
+                filter_expressions.append(q if _filter.operator == Operator.EQUAL else ~q)
+                continue
 
         # predictions model versions
         if field_name == 'predictions_model_versions' and _filter.operator == Operator.CONTAINS:
             q = Q()
             for value in _filter.value:
-                q |= Q(predictions__model_version__contains=value)
-            filter_expressions.append(q)
+                q |= Q(model_version__contains=value)
+            filter_expressions.append(predictions_exist(q))
             continue
         elif field_name == 'predictions_model_versions' and _filter.operator == Operator.NOT_CONTAINS:
             q = Q()
@@ -328,8 +370,8 @@ def apply_filters(queryset, filters, project, request):
             filter_expressions.append(q)
             continue
         elif field_name == 'predictions_model_versions' and _filter.operator == Operator.EMPTY:
-            value = cast_bool_from_str(_filter.value)
-            filter_expressions.append(Q(predictions__model_version__isnull=value))
+            q = predictions_exist(model_version__isnull=False)
+            filter_expressions.append(~q if cast_bool_from_str(_filter.value) else q)
             continue
 
         # use other name because of model names conflict
@@ -592,6 +634,8 @@ def annotate_storage_filename(queryset: TaskQuerySet) -> TaskQuerySet:
 
 
 def annotate_annotations_results(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(annotations_results=F('aggregate__annotations_results'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             annotations_results=Coalesce(
@@ -603,6 +647,8 @@ def annotate_annotations_results(queryset):
 
 
 def annotate_predictions_results(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(predictions_results=F('aggregate__predictions_results'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             predictions_results=Coalesce(
@@ -614,6 +660,8 @@ def annotate_predictions_results(queryset):
 
 
 def annotate_annotators(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(annotators=F('aggregate__annotators'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             annotators=Coalesce(GroupConcat('annotations__completed_by'), Value(''), output_field=models.CharField())
@@ -650,6 +698,8 @@ def annotate_predictions_score(queryset):
 
 
 def annotate_annotations_ids(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(annotations_ids=F('aggregate__annotations_ids'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(annotations_ids=GroupConcat('annotations__id', output_field=models.CharField()))
     else:
@@ -657,6 +707,8 @@ def annotate_annotations_ids(queryset):
 
 
 def annotate_predictions_model_versions(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(predictions_model_versions=F('aggregate__predictions_model_versions'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             predictions_model_versions=GroupConcat('predictions__model_version', output_field=models.CharField())
@@ -666,6 +718,8 @@ def annotate_predictions_model_versions(queryset):
 
 
 def annotate_avg_lead_time(queryset):
+    if settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES:
+        return queryset.annotate(avg_lead_time=F('aggregate__avg_lead_time'))
     return queryset.annotate(avg_lead_time=Avg('annotations__lead_time'))
 
 
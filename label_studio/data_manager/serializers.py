@@ -1,5 +1,6 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import json as std_json
 import os
 
 import ujson as json
@@ -396,10 +397,24 @@ class DataManagerTaskSerializer(TaskSerializer):
 
         return output[: self.CHAR_LIMITS].replace(',"', ', "').replace('],[', '] [').replace('"', '')
 
+    def _aggregated_results(self, task, field):
+        """Results precomputed in TaskAggregate come as a list of results, bring them to the form
+        the GROUP BY annotations return: GROUP_CONCAT text on SQLite and distinct values on PostgreSQL"""
+        result = getattr(task, field, None)
+        if not isinstance(result, list):
+            return
+        if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+            result = ','.join(std_json.dumps(r) for r in result if r is not None)
+        else:
+            result = list({std_json.dumps(r, sort_keys=True): r for r in result}.values())
+        setattr(task, field, result)
+
     def get_annotations_results(self, task):
+        self._aggregated_results(task, 'annotations_results')
         return self._pretty_results(task, 'annotations_results')
 
     def get_predictions_results(self, task):
+        self._aggregated_results(task, 'predictions_results')
         return self._pretty_results(task, 'predictions_results')
 
     def get_predictions(self, task):
@@ -0,0 +1,15 @@
+from data_manager.totals import bump_tasks_totals_version
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from tasks.models import Annotation, Prediction, Task
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Annotation)
+@receiver(post_delete, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
+def invalidate_tasks_totals(sender, instance, **kwargs):
+    """Drop cached Data Manager totals of the project the object belongs to."""
+    bump_tasks_totals_version(instance.project_id)
@@ -0,0 +1,168 @@
+"""Task totals of the Data Manager task list.
+
+Every page of the task list reports the number of tasks, annotations and
+predictions matching the view. Instead of three COUNT queries per request:
+
+* an unfiltered view reads the materialized project counters
+  (projects.models.ProjectCounters) with a single row lookup,
+* a filtered view sums the per-task counters (Task.total_annotations,
+  Task.total_predictions) in one aggregate query (or counts with exact joins
+  when the counters optimization is off) and caches them in Redis for
+  TASK_API_TOTALS_CACHE_TTL seconds, keyed on the SQL of the filtered queryset,
+* with TASK_API_ESTIMATED_COUNT enabled on PostgreSQL, filtered views larger
+  than TASK_API_ESTIMATED_COUNT_THRESHOLD take the number of tasks from the
+  planner estimate and scale annotation/prediction totals of the project to it;
+  all three totals are flagged as estimated then.
+
+Exact totals (the legacy pagination path) are always counted from annotations
+and predictions, for unfiltered views too.
+
+Cached totals are dropped by bumping a per-project version on task, annotation
+and prediction writes (see data_manager.signals) and on counter recalculation.
+Without Redis nothing is cached.
+"""
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from core.redis import redis_connected, redis_get, redis_incr, redis_set
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from projects.models import ProjectCounters
+from tasks.models import Annotation, Prediction, Task
+
+logger = logging.getLogger(__name__)
+
+
+def get_version_key(project_id) -> str:
+    return f'data-manager:tasks-totals-version:{project_id}'
+
+
+def get_totals_key(project_id, version, signature) -> str:
+    return f'data-manager:tasks-totals:{project_id}:{version}:{signature}'
+
+
+def bump_tasks_totals_version(project_id) -> None:
+    """Invalidate cached totals of a project now and once more after commit."""
+    if not project_id or not redis_connected():
+        return
+    key = get_version_key(project_id)
+    redis_incr(key)
+    transaction.on_commit(lambda: redis_incr(key))
+
+
+def get_queryset_signature(queryset) -> str:
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    return hashlib.md5(f'{sql}:{params!r}'.encode()).hexdigest()
+
+
+def count_totals(queryset) -> dict:
+    """Number of tasks and sums of their annotation/prediction counters in one query."""
+    return (
+        queryset.order_by()
+        .values('id')
+        .aggregate(
+            total=Count('id'),
+            total_annotations=Coalesce(Sum('total_annotations'), 0),
+            total_predictions=Coalesce(Sum('total_predictions'), 0),
+        )
+    )
+
+
+def count_exact_totals(queryset) -> dict:
+    """Totals counted from annotations and predictions themselves, not from the task counters."""
+    return {
+        'total': queryset.count(),
+        'total_annotations': Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count(),
+        'total_predictions': Prediction.objects.filter(task_id__in=queryset).count(),
+    }
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """Number of rows the PostgreSQL planner expects the queryset to return."""
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.order_by().values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+    except Exception as exc:
+        logger.warning(f'Failed to estimate tasks count: {exc}')
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _cached(project_id, signature, compute) -> dict:
+    if not settings.TASK_API_TOTALS_CACHE_TTL or not redis_connected():
+        return compute()
+    version = int(redis_get(get_version_key(project_id)) or 0)
+    key = get_totals_key(project_id, version, signature)
+    cached = redis_get(key)
+    if cached is not None:
+        return json.loads(cached)
+    totals = compute()
+    redis_set(key, json.dumps(totals), ttl=settings.TASK_API_TOTALS_CACHE_TTL)
+    return totals
+
+
+def get_project_totals(project_id) -> dict:
+    """Totals of all tasks of the project from its materialized counters."""
+    counters = None
+    if settings.PROJECT_COUNTERS_MATERIALIZED:
+        counters = (
+            ProjectCounters.objects.filter(project_id=project_id)
+            .values('task_number', 'total_annotations_number', 'total_predictions_number')
+            .first()
+        )
+    if counters is None:
+        return count_totals(Task.objects.filter(project_id=project_id))
+    return {
+        'total': counters['task_number'],
+        'total_annotations': counters['total_annotations_number'],
+        'total_predictions': counters['total_predictions_number'],
+    }
+
+
+def is_filtered(prepare_params) -> bool:
+    """Whether prepare params narrow the task list down from all tasks of the project"""
+    if prepare_params.filters and prepare_params.filters.items:
+        return True
+    selected = prepare_params.selectedItems
+    return bool(selected and (selected.excluded if selected.all else selected.included))
+
+
+def get_tasks_totals(queryset, project_id, filtered=True, exact=False) -> dict:
+    """Return {'total', 'total_annotations', 'total_predictions'} of the task list queryset.
+
+    :param filtered: False when the queryset holds all tasks of the project
+    :param exact: count annotations and predictions instead of reading the project and task counters
+    """
+    if not filtered and not exact:
+        return get_project_totals(project_id)
+
+    if settings.TASK_API_ESTIMATED_COUNT and not exact:
+        estimated = estimate_count(queryset)
+        if estimated is not None and estimated >= settings.TASK_API_ESTIMATED_COUNT_THRESHOLD:
+            project_totals = get_project_totals(project_id)
+            total = min(estimated, project_totals['total'])
+            ratio = total / project_totals['total'] if project_totals['total'] else 0
+            return {
+                'total': total,
+                'total_annotations': round(project_totals['total_annotations'] * ratio),
+                'total_predictions': round(project_totals['total_predictions'] * ratio),
+                'estimated': ['total', 'total_annotations', 'total_predictions'],
+            }
+
+    try:
+        signature = f'{"exact" if exact else "counters"}:{get_queryset_signature(queryset)}'
+    except EmptyResultSet:
+        return {'total': 0, 'total_annotations': 0, 'total_predictions': 0}
+    compute = count_exact_totals if exact else count_totals
+    return _cached(project_id, signature, lambda: compute(queryset))
@@ -17,6 +17,7 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from io_storages.base_models import (
     ExportStorage,
@@ -25,6 +26,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.export_queue import coalesce_annotation_export
 from io_storages.utils import (
     StorageObject,
     load_tasks_json,
@@ -250,6 +252,9 @@ class AzureBlobImportStorageBase(AzureBlobStorageMixin, ImportStorage):
     def can_resolve_url(self, url: Union[str, None]) -> bool:
         return storage_can_resolve_bucket_url(self, url)
 
+    def get_url_route(self):
+        return (self.url_scheme, self.container) if self.container else None
+
     def get_blob_metadata(self, key):
         return AZURE.get_blob_metadata(
             key, self.container, account_name=self.account_name, account_key=self.account_key
@@ -265,17 +270,25 @@ class AzureBlobImportStorage(ProjectStorageMixin, AzureBlobImportStorageBase):
 
 
 class AzureBlobExportStorage(AzureBlobStorageMixin, ExportStorage):  # note: order is important!
+    @cached_property
+    def export_container(self):
+        """Container client shared by all uploads of this storage instance, so they reuse its connections"""
+        return self.get_container()
+
+    def put_object(self, key, data):
+        container = self.export_container
+        key = str(self.prefix) + '/' + key if self.prefix else key
+
+        # put object into storage
+        blob = container.get_blob_client(key)
+        blob.upload_blob(json.dumps(data), overwrite=True)
+
     def save_annotation(self, annotation):
-        container = self.get_container()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
         # get key that identifies this object in storage
         key = AzureBlobExportStorageLink.get_key(annotation)
-        key = str(self.prefix) + '/' + key if self.prefix else key
-
-        # put object into storage
-        blob = container.get_blob_client(key)
-        blob.upload_blob(json.dumps(ser_annotation), overwrite=True)
+        self.put_object(key, ser_annotation)
 
         # create link if everything ok
         AzureBlobExportStorageLink.create(annotation, self)
@@ -293,7 +306,8 @@ def async_export_annotation_to_azure_storages(annotation):
 def export_annotation_to_azure_storages(sender, instance, **kwargs):
     storages = getattr(instance.project, 'io_storages_azureblobexportstorages', None)
     if storages and storages.exists():  # avoid excess jobs in rq
-        start_job_async_or_sync(async_export_annotation_to_azure_storages, instance)
+        if not coalesce_annotation_export(instance, AzureBlobExportStorage, storages.values_list('id', flat=True)):
+            start_job_async_or_sync(async_export_annotation_to_azure_storages, instance)
 
 
 class AzureBlobImportStorageLink(ImportStorageLink):
@@ -10,7 +10,7 @@ import traceback as tb
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime
-from typing import Union
+from typing import Optional, Union
 from urllib.parse import urljoin
 
 import django_rq
@@ -20,17 +20,21 @@ from core.feature_flags import flag_set
 from core.redis import is_job_in_queue, is_job_on_worker, redis_connected
 from core.utils.common import load_func
 from data_export.serializers import ExportDataSerializer
+from data_manager.totals import bump_tasks_totals_version
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db import models, transaction
-from django.db.models import JSONField
+from django.db.models import Count, JSONField
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_rq import job
+from io_storages.uri_cache import generate_http_url_cached
+from io_storages.url_router import bump_storage_router_version
 from io_storages.utils import StorageObject, get_uri_via_regex, parse_bucket_uri
+from rest_framework.exceptions import ValidationError
 from rq.job import Job
-from tasks.models import Annotation, Task
+from tasks.models import Annotation, Task, increase_project_counters
 from tasks.serializers import AnnotationSerializer, PredictionSerializer
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -123,6 +127,11 @@ class StorageInfo(models.Model):
         self.meta['duration'] = (time_failure - self.time_in_progress).total_seconds()
         self.save(update_fields=['status', 'traceback', 'meta'])
 
+    def get_throughput(self, **counts):
+        """Rates since the job moved in progress: get_throughput(objects=10) -> {'objects_per_second': 2.0}"""
+        duration = max((timezone.now() - self.time_in_progress).total_seconds(), 1e-3)
+        return {f'{name}_per_second': round(count / duration, 2) for name, count in counts.items()}
+
     def info_update_progress(self, last_sync_count, **kwargs):
         # update db counter once per 5 seconds to avid db overloads
         now = timezone.now()
@@ -228,6 +237,21 @@ class Storage(StorageInfo):
 
 
 class ImportStorage(Storage):
+    # fields updated by syncs, saving only them doesn't change how the storage resolves URLs
+    sync_status_fields = {'last_sync', 'last_sync_count', 'last_sync_job', 'status', 'traceback', 'meta'}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or not set(update_fields) <= self.sync_status_fields:
+            bump_storage_router_version(self.project_id)
+
+    def delete(self, *args, **kwargs):
+        project_id = self.project_id
+        result = super().delete(*args, **kwargs)
+        bump_storage_router_version(project_id)
+        return result
+
     def iterkeys(self):
         return iter(())
 
@@ -251,6 +275,11 @@ class ImportStorage(Storage):
     def can_resolve_url(self, url: Union[str, None]) -> bool:
         return self.can_resolve_scheme(url)
 
+    def get_url_route(self) -> Optional[tuple[str, str]]:
+        """(url scheme, bucket) of the URLs this storage resolves, it indexes the storage in the project URL router.
+        Storages without a route are asked with can_resolve_url()"""
+        return None
+
     def can_resolve_scheme(self, url: Union[str, None]) -> bool:
         if not url:
             return False
@@ -323,7 +352,7 @@ class ImportStorage(Storage):
                         # this branch is our old approach:
                         # it generates presigned URLs if storage.presign=True;
                         # or it inserts base64 media into task data if storage.presign=False
-                        http_url = self.generate_http_url(extracted_uri)
+                        http_url = generate_http_url_cached(self, extracted_uri)
 
                 return uri.replace(extracted_uri, http_url)
             except Exception:
@@ -341,8 +370,9 @@ class ImportStorage(Storage):
 
         raise NotImplementedError
 
-    @classmethod
-    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+    @staticmethod
+    def _prepare_task(link_object: StorageObject):
+        """Split a storage object into task data, predictions, annotations and link fields"""
         link_kwargs = asdict(link_object)
         data = link_kwargs.pop('task_data', None)
 
@@ -356,13 +386,11 @@ class ImportStorage(Storage):
 
         # annotations
         annotations = data.get('annotations') or []
-        cancelled_annotations = 0
         if annotations:
             if 'data' not in data:
                 raise ValueError(
                     'If you use "annotations" field in the task, ' 'you must put "data" field in the task too'
                 )
-            cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
 
         if 'data' in data and isinstance(data['data'], dict):
             if data['data'] is not None:
@@ -370,116 +398,232 @@ class ImportStorage(Storage):
             else:
                 data.pop('data')
 
+        return data, predictions, annotations, link_kwargs
+
+    @staticmethod
+    def _make_task(project, maximum_annotations, inner_id, data, predictions, annotations):
+        cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
+        return Task(
+            data=data,
+            project=project,
+            overlap=maximum_annotations,
+            is_labeled=len(annotations) >= maximum_annotations,
+            total_predictions=len(predictions),
+            total_annotations=len(annotations) - cancelled_annotations,
+            cancelled_annotations=cancelled_annotations,
+            inner_id=inner_id,
+        )
+
+    @staticmethod
+    def _keep_valid_items():
+        """Save valid predictions and annotations of a task with invalid ones instead of rejecting the task"""
+        return flag_set('ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser())
+
+    @classmethod
+    def _create_predictions_and_annotations(cls, project, tasks_items, keep_valid):
+        """
+        Create predictions and annotations of already saved tasks, passed as [(task, predictions, annotations)].
+
+        Every task is validated on its own, so invalid items of one task don't affect the others.
+        Returns {task: errors} of tasks with invalid predictions or annotations. With keep_valid their
+        valid items are saved and the counters of the invalid ones are reset, otherwise nothing of theirs is saved.
+        """
+        rejected = {}
+        for task, predictions, annotations in tasks_items:
+            serializers = {}
+            for name, serializer_class, items in (
+                ('predictions', PredictionSerializer, predictions),
+                ('annotations', AnnotationSerializer, annotations),
+            ):
+                if not items:
+                    continue
+                logger.debug(f'Create {len(items)} {name} for task={task}')
+                for item in items:
+                    item['task'] = task.id
+                    item['project'] = project.id
+                serializers[name] = serializer_class(data=items, many=True)
+
+            errors = {name: serializer.errors for name, serializer in serializers.items() if not serializer.is_valid()}
+            if errors:
+                rejected[task] = errors
+                if not keep_valid:
+                    continue
+            for name, serializer in serializers.items():
+                if name not in errors:
+                    serializer.save()
+
+        if keep_valid:
+            cls._reset_rejected_counters(rejected)
+        return rejected
+
+    @staticmethod
+    def _reset_rejected_counters(rejected):
+        """Tasks are created with counters of all their items, zero the counters of items that weren't saved"""
+        without_predictions = [task for task, errors in rejected.items() if 'predictions' in errors]
+        for task in without_predictions:
+            task.total_predictions = 0
+        Task.objects.bulk_update(without_predictions, ['total_predictions'])
+
+        without_annotations = [task for task, errors in rejected.items() if 'annotations' in errors]
+        for task in without_annotations:
+            task.total_annotations = task.cancelled_annotations = 0
+            task.is_labeled = False
+        Task.objects.bulk_update(without_annotations, ['total_annotations', 'cancelled_annotations', 'is_labeled'])
+
+    @classmethod
+    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+        data, predictions, annotations, link_kwargs = cls._prepare_task(link_object)
+
         with transaction.atomic():
-            task = Task.objects.create(
-                data=data,
-                project=project,
-                overlap=maximum_annotations,
-                is_labeled=len(annotations) >= maximum_annotations,
-                total_predictions=len(predictions),
-                total_annotations=len(annotations) - cancelled_annotations,
-                cancelled_annotations=cancelled_annotations,
-                inner_id=max_inner_id,
-            )
+            task = cls._make_task(project, maximum_annotations, max_inner_id, data, predictions, annotations)
+            task.save()
 
             link_class.create(task, storage=storage, **link_kwargs)
             logger.debug(f'Create {storage.__class__.__name__} link with {link_kwargs} for {task=}')
 
-            raise_exception = not flag_set(
-                'ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser()
+            keep_valid = cls._keep_valid_items()
+            rejected = cls._create_predictions_and_annotations(project, [(task, predictions, annotations)], keep_valid)
+            if rejected and not keep_valid:
+                raise ValidationError(rejected[task])
+        return task
+        # FIXME: add_annotation_history / post_process_annotations should be here
+
+    @classmethod
+    def add_tasks(
+        cls, project, maximum_annotations, max_inner_id, storage, link_objects: list[StorageObject], link_class
+    ):
+        """Create tasks with their storage links, predictions and annotations in bulk writes.
+
+        bulk_create doesn't send Task signals, so the project summary, project counters
+        and cached Data Manager totals are updated here once per call.
+
+        Returns (created tasks, number of rejected tasks). Tasks with invalid predictions or annotations
+        are rejected unless _keep_valid_items(), the rest of the page is created anyway.
+        """
+        prepared = [cls._prepare_task(link_object) for link_object in link_objects]
+        if not prepared:
+            return [], 0
+
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create(
+                [
+                    cls._make_task(project, maximum_annotations, max_inner_id + i, data, predictions, annotations)
+                    for i, (data, predictions, annotations, _) in enumerate(prepared)
+                ],
+                batch_size=settings.BATCH_SIZE,
             )
+            link_class.objects.bulk_create(
+                [
+                    link_class(task=task, storage=storage, object_exists=True, **link_kwargs)
+                    for task, (_, _, _, link_kwargs) in zip(tasks, prepared)
+                ],
+                batch_size=settings.BATCH_SIZE,
+            )
+            logger.debug(f'Create {len(tasks)} tasks with {storage.__class__.__name__} links')
 
-            # add predictions
-            logger.debug(f'Create {len(predictions)} predictions for task={task}')
-            for prediction in predictions:
-                prediction['task'] = task.id
-                prediction['project'] = project.id
-            prediction_ser = PredictionSerializer(data=predictions, many=True)
-            if prediction_ser.is_valid(raise_exception=raise_exception):
-                prediction_ser.save()
-
-            # add annotations
-            logger.debug(f'Create {len(annotations)} annotations for task={task}')
-            for annotation in annotations:
-                annotation['task'] = task.id
-                annotation['project'] = project.id
-            annotation_ser = AnnotationSerializer(data=annotations, many=True)
-            if annotation_ser.is_valid(raise_exception=raise_exception):
-                annotation_ser.save()
-        return task
+            keep_valid = cls._keep_valid_items()
+            rejected = cls._create_predictions_and_annotations(
+                project,
+                [(task, predictions, annotations) for task, (_, predictions, annotations, _) in zip(tasks, prepared)],
+                keep_valid,
+            )
+            keys = {task: link_kwargs.get('key') for task, (_, _, _, link_kwargs) in zip(tasks, prepared)}
+            for task, errors in rejected.items():
+                logger.error(f'{storage}: invalid predictions or annotations in {keys[task]}: {errors}')
+            if rejected and not keep_valid:
+                # nothing was counted for these tasks yet
+                Task.delete_tasks_without_signals_from_task_ids([task.id for task in rejected])
+                tasks = [task for task in tasks if task not in rejected]
+
+            if hasattr(project, 'summary'):
+                project.summary.update_data_columns(tasks)
+            increase_project_counters(
+                project.id, task_number=len(tasks), finished_task_number=sum(task.is_labeled for task in tasks)
+            )
+            bump_tasks_totals_version(project.id)
+        return tasks, len(prepared) - len(tasks)
         # FIXME: add_annotation_history / post_process_annotations should be here
 
+    def get_link_objects(self, key) -> list[StorageObject]:
+        try:
+            link_objects = self.get_data(key)
+        except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+            logger.debug(exc, exc_info=True)
+            raise ValueError(
+                f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
+                f'(images, audio, text, etc.), edit storage settings and enable '
+                f'"Treat every bucket object as a source file"'
+            )
+
+        if not flag_set('fflag_feat_dia_2092_multitasks_per_storage_link'):
+            link_objects = link_objects[:1]
+        return link_objects
+
     def _scan_and_create_links(self, link_class):
         """
+        Sync storage objects page by page: list STORAGE_SYNC_PAGE_SIZE keys, check which of them
+        are already linked with one query, create tasks for the new ones with bulk writes
+        and update the progress and throughput (objects/sec) once per page.
         TODO: deprecate this function and transform it to "pipeline" version  _scan_and_create_links_v2,
         TODO: it must be compatible with opensource, so old version is needed as well
         """
         # set in progress status for storage info
         self.info_set_in_progress()
 
-        tasks_existed = tasks_created = 0
+        tasks_existed = tasks_created = tasks_rejected = objects_scanned = 0
         maximum_annotations = self.project.maximum_annotations
         task = self.project.tasks.order_by('-inner_id').first()
         max_inner_id = (task.inner_id + 1) if task else 1
 
         tasks_for_webhook = []
-        for key in self.iterkeys():
-            # w/o Dataflow
-            # pubsub.push(topic, key)
-            # -> GF.pull(topic, key) + env -> add_task()
-            logger.debug(f'Scanning key {key}')
-            self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
-
-            # skip if key has already been synced
-            if n_tasks_linked := link_class.n_tasks_linked(key, self):
-                logger.debug(f'{self.__class__.__name__} already has {n_tasks_linked} tasks linked to {key=}')
-                tasks_existed += n_tasks_linked  # update progress counter
-                continue
-
-            logger.debug(f'{self}: found new key {key}')
-            try:
-                link_objects = self.get_data(key)
-            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
-                logger.debug(exc, exc_info=True)
-                raise ValueError(
-                    f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
-                    f'(images, audio, text, etc.), edit storage settings and enable '
-                    f'"Treat every bucket object as a source file"'
-                )
-
-            if not flag_set('fflag_feat_dia_2092_multitasks_per_storage_link'):
-                link_objects = link_objects[:1]
+        for keys in _batched(self.iterkeys(), settings.STORAGE_SYNC_PAGE_SIZE):
+            # skip keys that have already been synced
+            tasks_linked = link_class.n_tasks_linked_by_keys(keys, self)
+            link_objects = []
+            for key in keys:
+                if n_tasks_linked := tasks_linked.get(key):
+                    logger.debug(f'{self.__class__.__name__} already has {n_tasks_linked} tasks linked to {key=}')
+                    tasks_existed += n_tasks_linked  # update progress counter
+                    continue
+
+                logger.debug(f'{self}: found new key {key}')
+                link_objects += self.get_link_objects(key)
+
+            tasks, rejected = self.add_tasks(
+                self.project, maximum_annotations, max_inner_id, self, link_objects, link_class
+            )
+            # inner ids of rejected tasks are left unused
+            max_inner_id += len(tasks) + rejected
+
+            # update progress counters for storage info
+            tasks_created += len(tasks)
+            tasks_rejected += rejected
+            objects_scanned += len(keys)
+            throughput = self.get_throughput(objects=objects_scanned, tasks=tasks_created)
+            logger.debug(f'{self}: scanned {objects_scanned} objects, {throughput["objects_per_second"]} objects/sec')
+            self.info_update_progress(
+                last_sync_count=tasks_created,
+                tasks_existed=tasks_existed,
+                tasks_rejected=tasks_rejected,
+                objects_scanned=objects_scanned,
+                **throughput,
+            )
 
-            for link_object in link_objects:
-                # TODO: batch this loop body with add_task -> add_tasks in a single bulk write.
-                # See DIA-2062 for prerequisites
-                task = self.add_task(
+            # settings.WEBHOOK_BATCH_SIZE
+            # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
+            # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
+            # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
+            # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
+            # call to ensure all tasks are processed and no task is left unreported in the webhook.
+            tasks_for_webhook += tasks
+            while len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
+                emit_webhooks_for_instance(
+                    self.project.organization,
                     self.project,
-                    maximum_annotations,
-                    max_inner_id,
-                    self,
-                    link_object,
-                    link_class=link_class,
+                    WebhookAction.TASKS_CREATED,
+                    tasks_for_webhook[: settings.WEBHOOK_BATCH_SIZE],
                 )
-                max_inner_id += 1
-
-                # update progress counters for storage info
-                tasks_created += 1
-
-                # add task to webhook list
-                tasks_for_webhook.append(task)
-
-                # settings.WEBHOOK_BATCH_SIZE
-                # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
-                # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
-                # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
-                # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
-                # call to ensure all tasks are processed and no task is left unreported in the webhook.
-                if len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
-                    emit_webhooks_for_instance(
-                        self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
-                    )
-                    tasks_for_webhook = []
+                tasks_for_webhook = tasks_for_webhook[settings.WEBHOOK_BATCH_SIZE :]
         if tasks_for_webhook:
             emit_webhooks_for_instance(
                 self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
@@ -490,7 +634,13 @@ class ImportStorage(Storage):
         )
 
         # sync is finished, set completed status for storage info
-        self.info_set_completed(last_sync_count=tasks_created, tasks_existed=tasks_existed)
+        self.info_set_completed(
+            last_sync_count=tasks_created,
+            tasks_existed=tasks_existed,
+            tasks_rejected=tasks_rejected,
+            objects_scanned=objects_scanned,
+            **self.get_throughput(objects=objects_scanned, tasks=tasks_created),
+        )
 
     def scan_and_create_links(self):
         """This is proto method - you can override it, or just replace ImportStorageLink by your own model"""
@@ -608,15 +758,17 @@ class ExportStorage(Storage, ProjectStorageMixin):
     # TODO from testing, more than 8 seems to cause problems. revisit to add more parallelism.
     max_workers = min(8, (os.cpu_count() or 2) * 4)
 
-    def _get_serialized_data(self, annotation):
-        user = self.project.organization.created_by
+    def _is_task_format(self):
+        """Whether a whole task with all its annotations is exported under one key, instead of each annotation"""
+        user = getattr(self, 'cached_user', None) or self.project.organization.created_by
         flag = flag_set(
             'fflag_feat_optic_650_target_storage_task_format_long', user=user, override_system_default=False
         )
-        if settings.FUTURE_SAVE_TASK_TO_STORAGE or flag:
+        return settings.FUTURE_SAVE_TASK_TO_STORAGE or flag
+
+    def _get_serialized_data(self, annotation):
+        if self._is_task_format():
             # export task with annotations
-            # TODO: we have to rewrite save_all_annotations, because this func will be called for each annotation
-            # TODO: instead of each task, however, we have to call it only once per task
             expand = ['annotations.reviews', 'annotations.completed_by']
             context = {'project': self.project}
             return ExportDataSerializer(annotation.task, context=context, expand=expand).data
@@ -628,20 +780,83 @@ class ExportStorage(Storage, ProjectStorageMixin):
     def save_annotation(self, annotation):
         raise NotImplementedError
 
-    def save_annotations(self, annotations: models.QuerySet[Annotation]):
-        annotation_exported = 0
-        total_annotations = annotations.count()
-        self.info_set_in_progress()
-        self.cached_user = self.project.organization.created_by
+    def put_object(self, key, data):
+        """Write serialized data to the storage under the export link key, the storage applies its own prefix"""
+        raise NotImplementedError
+
+    def _get_export_objects(self, task_annotations):
+        """Objects to write for annotations of one task as [(key, serialized data, annotations)]"""
+        link_class = self.links.model
+        if self._is_task_format():
+            # all annotations of the task are written under the same key, serialize the task once
+            annotation = task_annotations[0]
+            return [(link_class.get_key(annotation), self._get_serialized_data(annotation), task_annotations)]
+        return [
+            (link_class.get_key(annotation), self._get_serialized_data(annotation), [annotation])
+            for annotation in task_annotations
+        ]
+
+    def _iter_task_chunks(self, annotations):
+        """Annotations grouped by task, in chunks of about STORAGE_EXPORT_CHUNK_SIZE annotations"""
+        annotations = (
+            annotations.select_related('task')
+            .order_by('task_id', 'id')
+            .iterator(chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE)
+        )
+        chunk, chunk_size = [], 0
+        for task_id, task_annotations in itertools.groupby(annotations, key=lambda annotation: annotation.task_id):
+            task_annotations = list(task_annotations)
+            chunk.append(task_annotations)
+            chunk_size += len(task_annotations)
+            if chunk_size >= settings.STORAGE_EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk, chunk_size = [], 0
+        if chunk:
+            yield chunk
+
+    def _save_annotations_by_task(self, annotations, total_annotations=None):
+        """Serialize each task once in this thread, upload objects through the pool
+        and create export links with one bulk write per chunk. Sync progress is reported with total_annotations"""
+        annotation_exported = objects_written = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for chunk in self._iter_task_chunks(annotations):
+                futures = {}
+                for task_annotations in chunk:
+                    for annotation in task_annotations:
+                        annotation.cached_user = self.cached_user
+                    for key, data, key_annotations in self._get_export_objects(task_annotations):
+                        futures[executor.submit(self.put_object, key, data)] = key_annotations
+
+                saved = []
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception:
+                        logger.error(f'Failed to export annotations {futures[future]} to {self}', exc_info=True)
+                        continue
+                    objects_written += 1
+                    saved += futures[future]
+                self.links.model.create_many(saved, self)
+
+                annotation_exported += len(saved)
+                if total_annotations is not None:
+                    self.info_update_progress(
+                        last_sync_count=annotation_exported,
+                        total_annotations=total_annotations,
+                        objects_written=objects_written,
+                        **self.get_throughput(objects=objects_written, annotations=annotation_exported),
+                    )
+        return annotation_exported, objects_written
 
+    def _save_annotations_one_by_one(self, annotations, total_annotations=None):
+        """Export with save_annotation() for storages that don't implement put_object()"""
+        annotation_exported = 0
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # Batch annotations so that we update progress before having to submit every future.
             # Updating progress in thread requires coordinating on count and db writes, so just
             # batching to keep it simpler.
             for annotation_batch in _batched(
-                Annotation.objects.filter(project=self.project).iterator(
-                    chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE
-                ),
+                annotations.iterator(chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE),
                 settings.STORAGE_EXPORT_CHUNK_SIZE,
             ):
                 futures = []
@@ -651,9 +866,38 @@ class ExportStorage(Storage, ProjectStorageMixin):
 
                 for future in concurrent.futures.as_completed(futures):
                     annotation_exported += 1
-                    self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
+                    if total_annotations is not None:
+                        self.info_update_progress(
+                            last_sync_count=annotation_exported, total_annotations=total_annotations
+                        )
+        return annotation_exported, annotation_exported
+
+    def _get_annotations_writer(self):
+        if type(self).put_object is ExportStorage.put_object:
+            return self._save_annotations_one_by_one
+        return self._save_annotations_by_task
+
+    def save_annotations(self, annotations: models.QuerySet[Annotation]):
+        total_annotations = annotations.count()
+        self.info_set_in_progress()
+        self.cached_user = self.project.organization.created_by
 
-        self.info_set_completed(last_sync_count=annotation_exported, total_annotations=total_annotations)
+        save = self._get_annotations_writer()
+        annotation_exported, objects_written = save(annotations, total_annotations)
+
+        self.info_set_completed(
+            last_sync_count=annotation_exported,
+            total_annotations=total_annotations,
+            objects_written=objects_written,
+            **self.get_throughput(objects=objects_written, annotations=annotation_exported),
+        )
+
+    def export_annotations(self, annotations: models.QuerySet[Annotation]) -> int:
+        """Export saved annotations outside of a storage sync (see io_storages.export_queue),
+        the sync status of the storage is left as is"""
+        self.cached_user = self.project.organization.created_by
+        annotation_exported, _ = self._get_annotations_writer()(annotations)
+        return annotation_exported
 
     def save_all_annotations(self):
         self.save_annotations(Annotation.objects.filter(project=self.project))
@@ -720,6 +964,18 @@ class ImportStorageLink(models.Model):
     def n_tasks_linked(cls, key, storage):
         return cls.objects.filter(key=key, storage=storage.id).count()
 
+    @classmethod
+    def n_tasks_linked_by_keys(cls, keys, storage):
+        """Number of tasks linked to each of the keys, in one query; keys without tasks are omitted"""
+        linked = (
+            cls.objects.filter(key__in=keys, storage=storage.id)
+            .order_by()
+            .values('key')
+            .annotate(n_tasks=Count('id'))
+            .values_list('key', 'n_tasks')
+        )
+        return dict(linked)
+
     @classmethod
     def create(cls, task, key, storage, row_index=None, row_group=None):
         link, created = cls.objects.get_or_create(
@@ -773,6 +1029,22 @@ class ExportStorageLink(models.Model):
             link.save()
         return link
 
+    @classmethod
+    def create_many(cls, annotations, storage):
+        """Bulk create(): add missing links and update updated_at of the existing ones"""
+        annotation_ids = [annotation.id for annotation in annotations]
+        existing = cls.objects.filter(annotation_id__in=annotation_ids, storage=storage, object_exists=True)
+        existing_ids = set(existing.values_list('annotation_id', flat=True))
+        existing.update(updated_at=timezone.now())
+        cls.objects.bulk_create(
+            [
+                cls(annotation=annotation, storage=storage, object_exists=True)
+                for annotation in annotations
+                if annotation.id not in existing_ids
+            ],
+            batch_size=settings.BATCH_SIZE,
+        )
+
     def has_permission(self, user):
         user.project = self.annotation.project  # link for activity log
         if self.annotation.has_permission(user):
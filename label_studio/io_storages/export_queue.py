@@ -0,0 +1,88 @@
+"""Coalesced export of saved annotations to target storages.
+
+With STORAGE_EXPORT_COALESCE_WINDOW set, an annotation save doesn't start an
+export job per storage. The annotation id is added (after commit) to a Redis
+sorted set of pending annotations of each target storage; the first pending
+annotation schedules a flush at the end of the window (a delayed RQ job, so
+workers must run with the RQ scheduler). Saving the same annotation again
+within the window doesn't add anything: it's exported once, with its latest
+state, together with the other pending annotations of the storage, using the
+batched writer of ExportStorage (one object per task in task format).
+
+A storage with STORAGE_EXPORT_COALESCE_MAX_ANNOTATIONS pending annotations,
+or whose scheduled flush was lost, is flushed right away.
+
+Without Redis, or with the window set to 0, annotations are exported one by one as before.
+"""
+import logging
+import time
+
+from core.redis import redis_connected, redis_pipeline, start_job_async_or_sync
+from django.conf import settings
+from django.db import transaction
+from tasks.models import Annotation
+
+logger = logging.getLogger(__name__)
+
+
+def get_pending_key(storage_class, storage_id) -> str:
+    return f'io-storages:export-pending:{storage_class.__name__}:{storage_id}'
+
+
+def coalesce_annotation_export(annotation, storage_class, storage_ids) -> bool:
+    """Queue the annotation for coalesced export to the storages. Returns False if coalescing is off."""
+    if not settings.STORAGE_EXPORT_COALESCE_WINDOW or not redis_connected():
+        return False
+    annotation_id, storage_ids = annotation.id, list(storage_ids)
+    if storage_ids:
+        transaction.on_commit(lambda: add_pending_annotation(annotation_id, storage_class, storage_ids))
+    return True
+
+
+def add_pending_annotation(annotation_id, storage_class, storage_ids) -> None:
+    pipeline = redis_pipeline()
+    if pipeline is None:
+        return
+
+    now = time.time()
+    for storage_id in storage_ids:
+        key = get_pending_key(storage_class, storage_id)
+        # nx keeps the time the annotation became pending, repeated saves don't postpone its export
+        pipeline.zadd(key, {annotation_id: now}, nx=True)
+        pipeline.zcard(key)
+        pipeline.zrange(key, 0, 0, withscores=True)
+    results = pipeline.execute()
+
+    window = settings.STORAGE_EXPORT_COALESCE_WINDOW
+    for index, storage_id in enumerate(storage_ids):
+        added, pending, oldest = results[3 * index : 3 * index + 3]
+        oldest_at = oldest[0][1] if oldest else now
+        if pending >= settings.STORAGE_EXPORT_COALESCE_MAX_ANNOTATIONS or now - oldest_at > 2 * window:
+            # Full queue, or the scheduled flush was lost
+            start_job_async_or_sync(flush_annotation_exports, storage_class, storage_id, queue_name='low')
+        elif added and pending == 1:
+            start_job_async_or_sync(
+                flush_annotation_exports, storage_class, storage_id, queue_name='low', in_seconds=window
+            )
+
+
+def flush_annotation_exports(storage_class, storage_id) -> int:
+    """Export pending annotations of a storage in one batch. Returns the number of exported annotations."""
+    pipeline = redis_pipeline(transaction=True)
+    if pipeline is None:
+        return 0
+    key = get_pending_key(storage_class, storage_id)
+    pipeline.zrange(key, 0, -1)
+    pipeline.delete(key)
+    annotation_ids, _ = pipeline.execute()
+    if not annotation_ids:
+        return 0
+
+    storage = storage_class.objects.filter(id=storage_id).first()
+    if storage is None:
+        logger.debug(f'Dropping {len(annotation_ids)} pending exports of missing storage {storage_class} {storage_id}')
+        return 0
+
+    annotations = Annotation.objects.filter(id__in=[int(i) for i in annotation_ids], project=storage.project_id)
+    logger.debug(f'Export {len(annotation_ids)} pending annotations to {storage}')
+    return storage.export_annotations(annotations)
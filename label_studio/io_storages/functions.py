@@ -1,7 +1,8 @@
 import logging
-from typing import Dict, Iterable, List, Union
+from typing import Dict, Iterable, List, Optional, Union
 
 from io_storages.base_models import ImportStorage
+from io_storages.url_router import StorageURLRouter
 
 from .azure_blob.api import AzureBlobExportStorageListAPI, AzureBlobImportStorageListAPI
 from .gcs.api import GCSExportStorageListAPI, GCSImportStorageListAPI
@@ -40,19 +41,11 @@ def get_storage_list():
     ]
 
 
-def get_storage_by_url(url: Union[str, List, Dict], storage_objects: Iterable[ImportStorage]) -> ImportStorage:
-    """Find the first compatible storage and returns storage that can emit pre-signed URL"""
-
-    for storage_object in storage_objects:
-        # check url is string because task can have int, float, dict, list
-        # and 'can_resolve_url' will fail
-        if isinstance(url, str) and storage_object.can_resolve_url(url):
-            return storage_object
-
-    # url is list or dict
-    if isinstance(url, dict) or isinstance(url, list):
-        for storage_object in storage_objects:
-            if storage_object.can_resolve_url(url):
-                # note: only first found storage_object will be used for link resolving
-                # can_resolve_url now checks both the scheme and the bucket to ensure the correct storage is used
-                return storage_object
+def get_storage_by_url(
+    url: Union[str, List, Dict], storage_objects: Union[StorageURLRouter, Iterable[ImportStorage]]
+) -> Optional[ImportStorage]:
+    """Find the first compatible storage and returns storage that can emit pre-signed URL.
+    Pass project.import_storage_router to reuse the cached URL router of the project"""
+    if not isinstance(storage_objects, StorageURLRouter):
+        storage_objects = StorageURLRouter(storage_objects)
+    return storage_objects.match(url)
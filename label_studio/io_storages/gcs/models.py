@@ -13,6 +13,7 @@ from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from google.auth.transport.requests import AuthorizedSession
 from io_storages.base_models import (
@@ -22,6 +23,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.export_queue import coalesce_annotation_export
 from io_storages.gcs.utils import GCS
 from io_storages.utils import (
     StorageObject,
@@ -208,6 +210,9 @@ class GCSImportStorageBase(GCSStorageMixin, ImportStorage):
     def can_resolve_url(self, url: Union[str, None]) -> bool:
         return storage_can_resolve_bucket_url(self, url)
 
+    def get_url_route(self):
+        return (self.url_scheme, self.bucket) if self.bucket else None
+
     def scan_and_create_links(self):
         return self._scan_and_create_links(GCSImportStorageLink)
 
@@ -228,18 +233,26 @@ class GCSImportStorage(ProjectStorageMixin, GCSImportStorageBase):
 
 
 class GCSExportStorage(GCSStorageMixin, ExportStorage):
+    @cached_property
+    def export_bucket(self):
+        """Bucket shared by all uploads of this storage instance, so they reuse the client connections"""
+        return self.get_bucket()
+
+    def put_object(self, key, data):
+        bucket = self.export_bucket
+        key = str(self.prefix) + '/' + key if self.prefix else key
+
+        # put object into storage
+        blob = bucket.blob(key)
+        blob.upload_from_string(json.dumps(data))
+
     def save_annotation(self, annotation):
-        bucket = self.get_bucket()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = GCSExportStorageLink.get_key(annotation)
-        key = str(self.prefix) + '/' + key if self.prefix else key
-
-        # put object into storage
-        blob = bucket.blob(key)
-        blob.upload_from_string(json.dumps(ser_annotation))
+        self.put_object(key, ser_annotation)
 
         # create link if everything ok
         GCSExportStorageLink.create(annotation, self)
@@ -257,7 +270,8 @@ def async_export_annotation_to_gcs_storages(annotation):
 def export_annotation_to_gcs_storages(sender, instance, **kwargs):
     storages = getattr(instance.project, 'io_storages_gcsexportstorages', None)
     if storages and storages.exists():  # avoid excess jobs in rq
-        start_job_async_or_sync(async_export_annotation_to_gcs_storages, instance)
+        if not coalesce_annotation_export(instance, GCSExportStorage, storages.values_list('id', flat=True)):
+            start_job_async_or_sync(async_export_annotation_to_gcs_storages, instance)
 
 
 class GCSImportStorageLink(ImportStorageLink):
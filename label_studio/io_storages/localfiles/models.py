@@ -20,6 +20,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.export_queue import coalesce_annotation_export
 from io_storages.utils import StorageObject, load_tasks_json
 from rest_framework.exceptions import ValidationError
 from tasks.models import Annotation
@@ -111,17 +112,20 @@ class LocalFilesImportStorage(ProjectStorageMixin, LocalFilesImportStorageBase):
 
 
 class LocalFilesExportStorage(LocalFilesMixin, ExportStorage):
+    def put_object(self, key, data):
+        key = os.path.join(self.path, f'{key}')
+
+        # put object into storage
+        with open(key, mode='w') as f:
+            json.dump(data, f, indent=2)
+
     def save_annotation(self, annotation):
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = LocalFilesExportStorageLink.get_key(annotation)
-        key = os.path.join(self.path, f'{key}')
-
-        # put object into storage
-        with open(key, mode='w') as f:
-            json.dump(ser_annotation, f, indent=2)
+        self.put_object(key, ser_annotation)
 
         # Create export storage link
         LocalFilesExportStorageLink.create(annotation, self)
@@ -139,6 +143,9 @@ class LocalFilesExportStorageLink(ExportStorageLink):
 def export_annotation_to_local_files(sender, instance, **kwargs):
     project = instance.project
     if hasattr(project, 'io_storages_localfilesexportstorages'):
-        for storage in project.io_storages_localfilesexportstorages.all():
+        storages = project.io_storages_localfilesexportstorages.all()
+        if coalesce_annotation_export(instance, LocalFilesExportStorage, storages.values_list('id', flat=True)):
+            return
+        for storage in storages:
             logger.debug(f'Export {instance} to Local Storage {storage}')
             storage.save_annotation(instance)
@@ -0,0 +1,23 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from io_storages.media_cache import clear_media_cache, get_cache_dir, get_media_cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Show hit ratio and counters of the storage media cache, or remove all cached media with --clear'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='remove all cached media')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            removed = clear_media_cache()
+            logger.debug(f'Removed {removed} files from media cache {get_cache_dir()}.')
+            self.stdout.write(f'Removed {removed} files from {get_cache_dir()}')
+            return
+
+        for name, value in get_media_cache_stats().items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,263 @@
+"""On-disk LRU cache of media proxied from storages with presign off.
+
+With STORAGE_MEDIA_CACHE_SIZE set, the storage proxy (see
+ResolveStorageUriAPIMixin.proxy_data_from_storage) downloads objects up to
+STORAGE_MEDIA_CACHE_MAX_OBJECT_SIZE once into STORAGE_MEDIA_CACHE_DIR and
+serves them, HTTP Range requests included, from disk. Repeated views of the
+same image or audio don't download it from the bucket again.
+
+An entry is a data file and a JSON sidecar with the ETag, size and content type
+of the object, named after the storage and the object URI. Entries older than
+STORAGE_MEDIA_CACHE_REVALIDATE seconds are checked with a 1-byte ranged read of
+the object: the same ETag keeps the entry, another one downloads it again.
+Once the cache is over its size budget, the least recently served entries are removed.
+
+Hits, revalidations, misses, bypasses (objects too large or failed downloads)
+and evictions are counted in Redis, see the media_cache management command.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Optional
+
+from core.redis import redis_pipeline
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'io-storages:media-cache-stats'
+STATS = ('hits', 'revalidated', 'misses', 'bypassed', 'evicted')
+
+
+@dataclass
+class CachedMedia:
+    path: str
+    size: int
+    etag: Optional[str]
+    content_type: str
+    last_modified: Optional[str]
+    validated_at: float
+
+    @property
+    def metadata(self) -> dict:
+        """Object metadata in the get_bytes_stream() format"""
+        return {
+            'ETag': self.etag,
+            'ContentLength': self.size,
+            'LastModified': datetime.fromisoformat(self.last_modified) if self.last_modified else None,
+        }
+
+
+def get_cache_dir() -> str:
+    return settings.STORAGE_MEDIA_CACHE_DIR or os.path.join(settings.BASE_DATA_DIR, 'media-cache')
+
+
+def get_entry_path(storage, uri) -> str:
+    digest = hashlib.sha256(f'{storage.__class__.__name__}:{storage.id}:{uri}'.encode()).hexdigest()
+    return os.path.join(get_cache_dir(), digest)
+
+
+def get_object_size(metadata) -> Optional[int]:
+    """Total object size from 'bytes 0-0/12345' Content-Range of a ranged read"""
+    try:
+        return int(metadata['ContentRange'].rsplit('/', 1)[1])
+    except (KeyError, AttributeError, IndexError, ValueError):
+        return None
+
+
+def close_stream(stream):
+    try:
+        stream.close()
+    except Exception as exc:
+        logger.debug(f"Couldn't close stream: {exc}")
+
+
+def record(**counts):
+    pipeline = redis_pipeline()
+    if pipeline is None:
+        return
+    for name, count in counts.items():
+        pipeline.hincrby(STATS_KEY, name, count)
+    pipeline.execute()
+
+
+def get_media_cache_stats() -> dict:
+    pipeline = redis_pipeline()
+    stats = dict.fromkeys(STATS, 0)
+    if pipeline is not None:
+        pipeline.hgetall(STATS_KEY)
+        (values,) = pipeline.execute()
+        stats.update({name.decode(): int(value) for name, value in values.items()})
+    lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+    stats['hit_ratio'] = round((stats['hits'] + stats['revalidated']) / lookups, 4) if lookups else None
+    return stats
+
+
+def read_entry(path) -> Optional[CachedMedia]:
+    try:
+        with open(path + '.json') as f:
+            entry = CachedMedia(path=path, **json.load(f))
+        # data and sidecar are replaced one after another, skip a half-written entry
+        if os.path.getsize(path) != entry.size:
+            return None
+    except (OSError, ValueError, TypeError):
+        return None
+    return entry
+
+
+def write_sidecar(entry: CachedMedia):
+    fields = {name: value for name, value in entry.__dict__.items() if name != 'path'}
+    with tempfile.NamedTemporaryFile('w', dir=get_cache_dir(), delete=False, suffix='.tmp') as f:
+        json.dump(fields, f)
+    os.replace(f.name, entry.path + '.json')
+
+
+def touch(entry: CachedMedia):
+    """Mark the entry as recently served, eviction removes entries with the oldest sidecar mtime first"""
+    try:
+        os.utime(entry.path + '.json')
+    except OSError:
+        pass
+
+
+def download(storage, uri, path) -> Optional[CachedMedia]:
+    stream, content_type, metadata = storage.get_bytes_stream(uri)
+    if stream is None:
+        return None
+    try:
+        size = metadata.get('ContentLength')
+        if size is None or size > settings.STORAGE_MEDIA_CACHE_MAX_OBJECT_SIZE:
+            logger.debug(f'{uri} of {size} bytes is not cached')
+            return None
+
+        deadline = time.monotonic() + settings.RESOLVER_PROXY_TIMEOUT
+        written = 0
+        with tempfile.NamedTemporaryFile('wb', dir=get_cache_dir(), delete=False, suffix='.tmp') as f:
+            try:
+                for chunk in stream.iter_chunks(chunk_size=settings.RESOLVER_PROXY_BUFFER_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if time.monotonic() >= deadline:
+                        break
+            except Exception:
+                os.unlink(f.name)
+                raise
+        if written != size:
+            logger.warning(f'Downloaded {written} of {size} bytes of {uri}, not cached')
+            os.unlink(f.name)
+            return None
+        os.replace(f.name, path)
+    finally:
+        close_stream(stream)
+
+    last_modified = metadata.get('LastModified')
+    entry = CachedMedia(
+        path=path,
+        size=size,
+        etag=metadata.get('ETag'),
+        content_type=content_type or 'application/octet-stream',
+        last_modified=last_modified.isoformat() if last_modified else None,
+        validated_at=time.time(),
+    )
+    write_sidecar(entry)
+    return entry
+
+
+def revalidate(storage, uri, entry: CachedMedia) -> bool:
+    """Check with a 1-byte read that the object is still the cached one"""
+    stream, _, metadata = storage.get_bytes_stream(uri, range_header='bytes=0-0')
+    if stream is None:
+        return False
+    close_stream(stream)
+    if not entry.etag or metadata.get('ETag') != entry.etag or get_object_size(metadata) != entry.size:
+        return False
+    entry.validated_at = time.time()
+    write_sidecar(entry)
+    return True
+
+
+def evict(size_budget) -> int:
+    """Remove least recently served entries until the cache fits into the budget, returns the number removed"""
+    entries, total = [], 0
+    with os.scandir(get_cache_dir()) as it:
+        for item in it:
+            if item.name.endswith('.json'):
+                try:
+                    data_size = os.path.getsize(item.path[: -len('.json')])
+                    entries.append((item.stat().st_mtime, item.path[: -len('.json')], data_size))
+                    total += data_size
+                except OSError:
+                    continue
+    evicted = 0
+    for _, path, data_size in sorted(entries):
+        if total <= size_budget:
+            break
+        for name in (path + '.json', path):
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+        total -= data_size
+        evicted += 1
+    return evicted
+
+
+def clear_media_cache() -> int:
+    """Remove all cached media, returns the number of removed files"""
+    removed = 0
+    if not os.path.isdir(get_cache_dir()):
+        return removed
+    with os.scandir(get_cache_dir()) as it:
+        for item in it:
+            if item.is_file():
+                os.unlink(item.path)
+                removed += 1
+    return removed
+
+
+def get_cached_media(storage, uri) -> Optional[CachedMedia]:
+    """Cached copy of the storage object, downloaded or revalidated if needed.
+    None when the object isn't cacheable, then it's proxied from the storage as is"""
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    path = get_entry_path(storage, uri)
+    entry = read_entry(path)
+
+    if entry is not None:
+        if time.time() - entry.validated_at < settings.STORAGE_MEDIA_CACHE_REVALIDATE:
+            record(hits=1)
+            touch(entry)
+            return entry
+        if revalidate(storage, uri, entry):
+            record(revalidated=1)
+            touch(entry)
+            return entry
+
+    try:
+        entry = download(storage, uri, path)
+    except Exception as exc:
+        logger.warning(f'Failed to cache {uri} from {storage}: {exc}', exc_info=True)
+        entry = None
+    if entry is None:
+        record(bypassed=1)
+        return None
+
+    evicted = evict(settings.STORAGE_MEDIA_CACHE_SIZE)
+    record(misses=1, evicted=evicted)
+    # the new entry itself is only evicted if it doesn't fit into the budget alone
+    return read_entry(path)
+
+
+def iter_file_range(path, start, length) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(settings.RESOLVER_PROXY_BUFFER_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
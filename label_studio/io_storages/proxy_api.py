@@ -6,7 +6,7 @@ from urllib.parse import unquote
 
 from core.feature_flags import flag_set
 from django.conf import settings
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.http import FileResponse, HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from projects.models import Project
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -14,6 +14,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from tasks.models import Task
 
+from label_studio.io_storages import media_cache
 from label_studio.io_storages.functions import get_storage_by_url
 from label_studio.io_storages.utils import parse_range
 
@@ -41,8 +42,7 @@ class ResolveStorageUriAPIMixin:
         project = None
         if flag_set('fflag_optic_all_optic_1938_storage_proxy', user='auto'):
             project = instance if isinstance(instance, Project) else instance.project
-            storage_objects = project.get_all_import_storage_objects
-            storage = get_storage_by_url(fileuri, storage_objects)
+            storage = get_storage_by_url(fileuri, project.import_storage_router)
             if not storage:
                 logger.error(f'Could not find storage for URI {fileuri}')
                 return Response(status=status.HTTP_404_NOT_FOUND)
@@ -234,6 +234,11 @@ class ResolveStorageUriAPIMixin:
             # Process and limit the range header for downloaded files
             range_header = self.override_range_header(request)
 
+            if settings.STORAGE_MEDIA_CACHE_SIZE:
+                entry = media_cache.get_cached_media(storage, uri)
+                if entry is not None:
+                    return self.serve_cached_media(request, entry, range_header, project)
+
             # Use the storage-specific method to get data stream and content type
             stream, content_type, metadata = storage.get_bytes_stream(uri, range_header=range_header)
 
@@ -270,6 +275,34 @@ class ResolveStorageUriAPIMixin:
                 status=status.HTTP_424_FAILED_DEPENDENCY,
             )
 
+    def serve_cached_media(self, request, entry, range_header, project):
+        """Serve an object of the media cache from disk, as a whole file or the requested byte range"""
+        metadata = entry.metadata
+        start, end = parse_range(range_header)
+        if start is None:
+            # whole file: FileResponse lets the WSGI server use sendfile
+            response = FileResponse(open(entry.path, 'rb'), content_type=entry.content_type)
+        else:
+            end = entry.size - 1 if end == '' else min(end, entry.size - 1)
+            if start >= entry.size or end < start:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response.headers['Content-Range'] = f'bytes */{entry.size}'
+                return response
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                media_cache.iter_file_range(entry.path, start, length),
+                content_type=entry.content_type,
+                status=status.HTTP_206_PARTIAL_CONTENT,
+            )
+            metadata.update(ContentLength=length, ContentRange=f'bytes {start}-{end}/{entry.size}')
+
+        response = self.prepare_headers(response, metadata, request, project)
+        if settings.RESOLVER_PROXY_ENABLE_ETAG_CACHE and 'Range' not in request.headers:
+            if request.headers.get('If-None-Match') == response.headers.get('ETag'):
+                response.close()
+                return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        return response
+
 
 class TaskResolveStorageUri(ResolveStorageUriAPIMixin, APIView):
     """A file proxy to presign storage urls at the task level.
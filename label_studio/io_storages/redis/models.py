@@ -16,6 +16,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.export_queue import coalesce_annotation_export
 from io_storages.utils import StorageObject, load_tasks_json
 from tasks.models import Annotation
 
@@ -117,16 +118,18 @@ class RedisImportStorage(ProjectStorageMixin, RedisImportStorageBase):
 class RedisExportStorage(RedisStorageMixin, ExportStorage):
     db = models.PositiveSmallIntegerField(_('db'), default=2, help_text='Server Database')
 
-    def save_annotation(self, annotation):
+    def put_object(self, key, data):
         client = self.get_client()
+        # put object into storage
+        client.set(key, json.dumps(data))
+
+    def save_annotation(self, annotation):
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = RedisExportStorageLink.get_key(annotation)
-
-        # put object into storage
-        client.set(key, json.dumps(ser_annotation))
+        self.put_object(key, ser_annotation)
 
         # create link if everything ok
         RedisExportStorageLink.create(annotation, self)
@@ -141,7 +144,10 @@ class RedisExportStorage(RedisStorageMixin, ExportStorage):
 def export_annotation_to_redis_storages(sender, instance, **kwargs):
     project = instance.project
     if hasattr(project, 'io_storages_redisexportstorages'):
-        for storage in project.io_storages_redisexportstorages.all():
+        storages = project.io_storages_redisexportstorages.all()
+        if coalesce_annotation_export(instance, RedisExportStorage, storages.values_list('id', flat=True)):
+            return
+        for storage in storages:
             logger.debug(f'Export {instance} to Redis storage {storage}')
             storage.save_annotation(instance)
 
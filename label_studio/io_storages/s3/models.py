@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 
+import io
 import json
 import logging
 import re
@@ -8,6 +9,7 @@ from typing import Union
 from urllib.parse import urlparse
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from core.feature_flags import flag_set
 from core.redis import start_job_async_or_sync
 from django.conf import settings
@@ -22,6 +24,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.export_queue import coalesce_annotation_export
 from io_storages.s3.utils import (
     catch_and_reraise_from_none,
     get_client_and_resource,
@@ -238,6 +241,9 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
     def can_resolve_url(self, url: Union[str, None]) -> bool:
         return storage_can_resolve_bucket_url(self, url)
 
+    def get_url_route(self):
+        return (self.url_scheme, self.bucket) if self.bucket else None
+
     @catch_and_reraise_from_none
     def get_blob_metadata(self, key):
         return AWS.get_blob_metadata(
@@ -261,13 +267,10 @@ class S3ImportStorage(ProjectStorageMixin, S3ImportStorageBase):
 
 class S3ExportStorage(S3StorageMixin, ExportStorage):
     @catch_and_reraise_from_none
-    def save_annotation(self, annotation):
-        client, s3 = self.get_client_and_resource()
-        logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
-        ser_annotation = self._get_serialized_data(annotation)
-
-        # get key that identifies this object in storage
-        key = S3ExportStorageLink.get_key(annotation)
+    def put_object(self, key, data):
+        # the client is cached and thread-safe, so uploads from the export pool reuse its connections;
+        # bodies above the multipart threshold are uploaded in parts
+        client, _ = self.get_client_and_resource()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
@@ -284,7 +287,22 @@ class S3ExportStorage(S3StorageMixin, ExportStorage):
             else:
                 additional_params['ServerSideEncryption'] = 'AES256'
 
-        s3.Object(self.bucket, key).put(Body=json.dumps(ser_annotation), **additional_params)
+        client.upload_fileobj(
+            io.BytesIO(json.dumps(data).encode()),
+            self.bucket,
+            key,
+            ExtraArgs=additional_params,
+            Config=TransferConfig(multipart_threshold=settings.STORAGE_EXPORT_MULTIPART_THRESHOLD),
+        )
+
+    @catch_and_reraise_from_none
+    def save_annotation(self, annotation):
+        logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
+        ser_annotation = self._get_serialized_data(annotation)
+
+        # get key that identifies this object in storage
+        key = S3ExportStorageLink.get_key(annotation)
+        self.put_object(key, ser_annotation)
 
         # create link if everything ok
         S3ExportStorageLink.create(annotation, self)
@@ -317,7 +335,8 @@ def async_export_annotation_to_s3_storages(annotation):
 def export_annotation_to_s3_storages(sender, instance, **kwargs):
     storages = getattr(instance.project, 'io_storages_s3exportstorages', None)
     if storages and storages.exists():  # avoid excess jobs in rq
-        start_job_async_or_sync(async_export_annotation_to_s3_storages, instance)
+        if not coalesce_annotation_export(instance, S3ExportStorage, storages.values_list('id', flat=True)):
+            start_job_async_or_sync(async_export_annotation_to_s3_storages, instance)
 
 
 @receiver(pre_delete, sender=Annotation)
@@ -0,0 +1,117 @@
+import json
+
+import boto3
+import mock
+import pytest
+from io_storages.export_queue import flush_annotation_exports, get_pending_key
+from io_storages.models import S3ExportStorage
+from io_storages.s3.models import S3ExportStorageLink
+from moto import mock_s3
+from projects.tests.factories import ProjectFactory
+from tasks.models import Annotation
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+from tests.utils import fake_redis  # noqa
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def s3_export_storage(settings):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = True
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='pytest-export')
+        project = ProjectFactory()
+        storage = S3ExportStorage.objects.create(
+            project=project,
+            bucket='pytest-export',
+            prefix='export',
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+        )
+        yield s3, storage
+
+
+def test_export_storage_writes_one_object_per_task(s3_export_storage, settings):
+    """Export writer against moto: every task is serialized and written once"""
+    s3, storage = s3_export_storage
+    settings.STORAGE_EXPORT_CHUNK_SIZE = 25
+    task_number, annotations_per_task = 40, 3
+    for _ in range(task_number):
+        task = TaskFactory(project=storage.project)
+        for _ in range(annotations_per_task):
+            AnnotationFactory(task=task, project=storage.project, completed_by=storage.project.created_by)
+    S3ExportStorageLink.objects.filter(storage=storage).delete()
+
+    storage.info_set_queued()
+    serialize_task = S3ExportStorage._get_serialized_data
+    with mock.patch.object(S3ExportStorage, '_get_serialized_data', autospec=True, side_effect=serialize_task) as m:
+        storage.save_all_annotations()
+
+    assert m.call_count == task_number
+    keys = [obj['Key'] for obj in s3.list_objects_v2(Bucket='pytest-export', Prefix='export/')['Contents']]
+    assert len(keys) == task_number
+    body = json.loads(s3.get_object(Bucket='pytest-export', Key=keys[0])['Body'].read())
+    assert len(body['annotations']) == annotations_per_task
+
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == task_number * annotations_per_task
+    assert storage.meta['objects_written'] == task_number
+    assert storage.meta['objects_per_second'] > 0
+    assert S3ExportStorageLink.objects.filter(storage=storage).count() == task_number * annotations_per_task
+
+    # links of exported annotations are updated, not duplicated
+    storage.info_set_queued()
+    storage.save_all_annotations()
+    assert S3ExportStorageLink.objects.filter(storage=storage).count() == Annotation.objects.count()
+
+
+@pytest.fixture
+def fake_export_queue_redis(fake_redis):
+    with mock.patch('io_storages.export_queue.start_job_async_or_sync') as start_job:
+        yield fake_redis, start_job
+
+
+def test_export_queue_coalesces_annotation_saves(
+    s3_export_storage, fake_export_queue_redis, settings, django_capture_on_commit_callbacks
+):
+    s3, storage = s3_export_storage
+    redis, start_job = fake_export_queue_redis
+    settings.STORAGE_EXPORT_COALESCE_WINDOW = 30
+    user = storage.project.created_by
+
+    with django_capture_on_commit_callbacks(execute=True):
+        annotation = AnnotationFactory(task=TaskFactory(project=storage.project), completed_by=user)
+        for lead_time in (1, 2):
+            annotation.lead_time = lead_time
+            annotation.save()
+        AnnotationFactory(task=TaskFactory(project=storage.project), completed_by=user)
+
+    # one delayed flush for the window, repeated saves of the same annotation are pending once
+    start_job.assert_called_once()
+    assert start_job.call_args.args == (flush_annotation_exports, S3ExportStorage, storage.id)
+    assert start_job.call_args.kwargs['in_seconds'] == 30
+    key = get_pending_key(S3ExportStorage, storage.id)
+    assert redis.zcard(key) == 2
+    assert s3.list_objects_v2(Bucket='pytest-export', Prefix='export/')['KeyCount'] == 0
+
+    assert flush_annotation_exports(S3ExportStorage, storage.id) == 2
+    assert not redis.exists(key)
+    assert s3.list_objects_v2(Bucket='pytest-export', Prefix='export/')['KeyCount'] == 2
+    assert S3ExportStorageLink.objects.filter(storage=storage).count() == 2
+    for obj in s3.list_objects_v2(Bucket='pytest-export', Prefix='export/')['Contents']:
+        body = json.loads(s3.get_object(Bucket='pytest-export', Key=obj['Key'])['Body'].read())
+        if body['id'] == annotation.task_id:
+            assert body['annotations'][0]['lead_time'] == 2
+    assert flush_annotation_exports(S3ExportStorage, storage.id) == 0
+
+    # a full queue is flushed right away
+    settings.STORAGE_EXPORT_COALESCE_MAX_ANNOTATIONS = 2
+    start_job.reset_mock()
+    with django_capture_on_commit_callbacks(execute=True):
+        AnnotationFactory(task=TaskFactory(project=storage.project), completed_by=user)
+        AnnotationFactory(task=TaskFactory(project=storage.project), completed_by=user)
+    assert start_job.call_count == 2
+    assert start_job.call_args_list[0].kwargs['in_seconds'] == 30
+    assert 'in_seconds' not in start_job.call_args_list[1].kwargs
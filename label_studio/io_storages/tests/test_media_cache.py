@@ -0,0 +1,145 @@
+import os
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from io_storages.proxy_api import ResolveStorageUriAPIMixin
+from rest_framework import status
+from tests.utils import fake_redis  # noqa
+
+from label_studio.io_storages import media_cache
+
+DATA = bytes(range(256)) * 4
+
+
+class FakeStream:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size=1024):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeStorage:
+    """Non-presigned storage returning objects in the get_bytes_stream() format"""
+
+    presign = False
+
+    def __init__(self, storage_id=1):
+        self.id = storage_id
+        self.objects = {}
+        self.calls = []
+
+    def get_bytes_stream(self, uri, range_header=None):
+        self.calls.append(range_header)
+        data, etag = self.objects[uri]
+        metadata = {'ETag': etag, 'LastModified': datetime(2024, 1, 1), 'StatusCode': 200}
+        if range_header == 'bytes=0-0':
+            metadata.update(ContentLength=1, ContentRange=f'bytes 0-0/{len(data)}', StatusCode=206)
+            return FakeStream(data[:1]), 'image/png', metadata
+        metadata['ContentLength'] = len(data)
+        return FakeStream(data), 'image/png', metadata
+
+
+@pytest.fixture
+def cache_settings(settings, tmp_path):
+    settings.STORAGE_MEDIA_CACHE_DIR = str(tmp_path)
+    settings.STORAGE_MEDIA_CACHE_SIZE = 10 * len(DATA)
+    settings.STORAGE_MEDIA_CACHE_MAX_OBJECT_SIZE = 2 * len(DATA)
+    settings.STORAGE_MEDIA_CACHE_REVALIDATE = 300
+    return settings
+
+
+def proxy_request(headers=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    request.user.id = 1
+    return request
+
+
+def test_media_cache_serves_ranges_from_disk(cache_settings, fake_redis):
+    storage = FakeStorage()
+    storage.objects['s3://bucket/image.png'] = (DATA, '"v1"')
+    mixin = ResolveStorageUriAPIMixin()
+
+    response = mixin.proxy_data_from_storage(proxy_request(), 's3://bucket/image.png', MagicMock(), storage)
+    assert response.status_code == status.HTTP_200_OK
+    assert b''.join(response.streaming_content) == DATA
+    assert response.headers['Content-Length'] == str(len(DATA))
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+    request = proxy_request({'Range': 'bytes=100-199'})
+    response = mixin.proxy_data_from_storage(request, 's3://bucket/image.png', MagicMock(), storage)
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert b''.join(response.streaming_content) == DATA[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(DATA)}'
+    assert response.headers['Content-Length'] == '100'
+
+    request = proxy_request({'Range': f'bytes={len(DATA)}-'})
+    response = mixin.proxy_data_from_storage(request, 's3://bucket/image.png', MagicMock(), storage)
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    # the object was downloaded once, the rest came from disk
+    assert storage.calls == [None]
+    stats = media_cache.get_media_cache_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 2
+    assert stats['hit_ratio'] == round(2 / 3, 4)
+
+
+def test_media_cache_revalidates_by_etag(cache_settings, fake_redis):
+    storage = FakeStorage()
+    storage.objects['s3://bucket/image.png'] = (DATA, '"v1"')
+    entry = media_cache.get_cached_media(storage, 's3://bucket/image.png')
+
+    cache_settings.STORAGE_MEDIA_CACHE_REVALIDATE = 0
+    assert media_cache.get_cached_media(storage, 's3://bucket/image.png').path == entry.path
+    assert storage.calls == [None, 'bytes=0-0']
+
+    # the object changed in the bucket: the probe sees another ETag and the object is downloaded again
+    storage.objects['s3://bucket/image.png'] = (DATA[::-1], '"v2"')
+    entry = media_cache.get_cached_media(storage, 's3://bucket/image.png')
+    assert entry.etag == '"v2"'
+    with open(entry.path, 'rb') as f:
+        assert f.read() == DATA[::-1]
+    assert storage.calls == [None, 'bytes=0-0', 'bytes=0-0', None]
+
+    stats = media_cache.get_media_cache_stats()
+    assert (stats['misses'], stats['revalidated'], stats['hits']) == (2, 1, 0)
+
+
+def test_media_cache_evicts_least_recently_served(cache_settings, fake_redis):
+    cache_settings.STORAGE_MEDIA_CACHE_SIZE = 2 * len(DATA)
+    storage = FakeStorage()
+    for name in ('a', 'b', 'c'):
+        storage.objects[f's3://bucket/{name}.png'] = (DATA, f'"{name}"')
+
+    entry_a = media_cache.get_cached_media(storage, 's3://bucket/a.png')
+    entry_b = media_cache.get_cached_media(storage, 's3://bucket/b.png')
+    # serve "a" again later than "b", so "b" is the least recently served
+    os.utime(entry_b.path + '.json', (time.time() - 60, time.time() - 60))
+    assert media_cache.get_cached_media(storage, 's3://bucket/a.png') is not None
+    entry_c = media_cache.get_cached_media(storage, 's3://bucket/c.png')
+
+    assert media_cache.read_entry(entry_a.path) is not None
+    assert media_cache.read_entry(entry_b.path) is None
+    assert media_cache.read_entry(entry_c.path) is not None
+    assert media_cache.get_media_cache_stats()['evicted'] == 1
+
+
+def test_media_cache_bypasses_large_objects(cache_settings, fake_redis):
+    storage = FakeStorage()
+    storage.objects['s3://bucket/video.mp4'] = (DATA * 4, '"v1"')
+    mixin = ResolveStorageUriAPIMixin()
+
+    response = mixin.proxy_data_from_storage(proxy_request(), 's3://bucket/video.mp4', MagicMock(), storage)
+    # proxied from the storage as without the cache
+    assert response.status_code == status.HTTP_200_OK
+    assert b''.join(response.streaming_content) == DATA * 4
+    assert media_cache.get_media_cache_stats()['bypassed'] == 1
+    assert os.listdir(cache_settings.STORAGE_MEDIA_CACHE_DIR) == []
@@ -199,6 +199,88 @@ def test_storagelink_fields(project, common_task_data):
         assert storage_links[1].row_group is None
 
 
+@pytest.mark.fflag_feat_dia_2092_multitasks_per_storage_link_on
+def test_sync_creates_tasks_page_by_page(project, common_task_data, settings):
+    from projects.models import ProjectCounters
+
+    settings.STORAGE_SYNC_PAGE_SIZE = 2
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        bucket_name = 'pytest-s3-jsons'
+        s3.create_bucket(Bucket=bucket_name)
+        for i in range(3):
+            s3.put_object(Bucket=bucket_name, Key=f'test{i}.json', Body=json.dumps(common_task_data))
+
+        storage = S3ImportStorage(
+            project=project,
+            bucket=bucket_name,
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+            use_blob_urls=False,
+        )
+        storage.save()
+        storage.sync()
+        storage.refresh_from_db()
+        assert project.tasks.count() == 6
+        assert list(project.tasks.order_by('inner_id').values_list('inner_id', flat=True)) == [1, 2, 3, 4, 5, 6]
+        assert S3ImportStorageLink.objects.filter(storage=storage).count() == 6
+        assert ProjectCounters.objects.get(project=project).task_number == 6
+        assert storage.last_sync_count == 6
+        assert storage.meta['objects_scanned'] == 3
+        assert storage.meta['objects_per_second'] > 0
+
+        # already linked keys are skipped, new ones are picked up
+        s3.put_object(Bucket=bucket_name, Key='test3.json', Body=json.dumps(common_task_data[:1]))
+        storage.sync()
+        storage.refresh_from_db()
+        assert project.tasks.count() == 7
+        assert storage.last_sync_count == 1
+        assert storage.meta['tasks_existed'] == 6
+
+
+@pytest.mark.parametrize('keep_valid', [True, False])
+def test_sync_page_with_invalid_annotations(project, keep_valid):
+    from projects.models import ProjectCounters
+
+    valid = {'data': {'text': 'valid'}, 'annotations': [{'result': []}], 'predictions': [{'result': []}]}
+    invalid = {'data': {'text': 'invalid'}, 'annotations': [{'result': [], 'lead_time': 'slow'}]}
+    with mock_s3(), mock.patch.object(S3ImportStorage, '_keep_valid_items', return_value=keep_valid):
+        s3 = boto3.client('s3', region_name='us-east-1')
+        bucket_name = 'pytest-s3-jsons'
+        s3.create_bucket(Bucket=bucket_name)
+        s3.put_object(Bucket=bucket_name, Key='valid.json', Body=json.dumps(valid))
+        s3.put_object(Bucket=bucket_name, Key='invalid.json', Body=json.dumps(invalid))
+
+        storage = S3ImportStorage(
+            project=project,
+            bucket=bucket_name,
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+            use_blob_urls=False,
+        )
+        storage.save()
+        storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.status == S3ImportStorage.Status.COMPLETED
+    # the valid task of the page is created whatever happens to the invalid one
+    valid_task = project.tasks.get(data__text='valid')
+    assert (valid_task.total_annotations, valid_task.total_predictions, valid_task.is_labeled) == (1, 1, True)
+
+    counters = ProjectCounters.objects.get(project=project)
+    assert counters.finished_task_number == 1
+    if keep_valid:
+        invalid_task = project.tasks.get(data__text='invalid')
+        assert not invalid_task.annotations.exists()
+        assert (invalid_task.total_annotations, invalid_task.is_labeled) == (0, False)
+        assert counters.task_number == storage.last_sync_count == 2
+        assert storage.meta['tasks_rejected'] == 0
+    else:
+        assert not project.tasks.filter(data__text='invalid').exists()
+        assert counters.task_number == storage.last_sync_count == 1
+        assert storage.meta['tasks_rejected'] == 1
+
+
 #
 # Unit tests for load_tasks_json()
 #
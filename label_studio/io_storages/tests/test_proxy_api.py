@@ -137,6 +137,7 @@ class TestResolveStorageUriAPIMixin(unittest.TestCase):
             mock_settings.RESOLVER_PROXY_MAX_RANGE_SIZE = 1024 * 1024  # 1MB
             mock_settings.RESOLVER_PROXY_BUFFER_SIZE = 8192
             mock_settings.RESOLVER_PROXY_CACHE_TIMEOUT = 3600
+            mock_settings.STORAGE_MEDIA_CACHE_SIZE = 0
 
             # Set up mock stream and response
             mock_stream = MagicMock()
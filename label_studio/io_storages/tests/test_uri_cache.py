@@ -0,0 +1,36 @@
+import mock
+import pytest
+from io_storages.models import S3ImportStorage
+from io_storages.uri_cache import get_resolved_uri_key
+from projects.tests.factories import ProjectFactory
+from tasks.models import Task
+from tasks.tests.factories import TaskFactory
+from tests.utils import fake_redis  # noqa
+
+pytestmark = pytest.mark.django_db
+
+
+def test_presigned_urls_are_cached_within_presign_ttl(fake_redis, settings):
+    redis = fake_redis
+    settings.STORAGE_RESOLVED_URI_CACHE_TTL = 300
+    project = ProjectFactory()
+    storage = S3ImportStorage.objects.create(project=project, bucket='pytest-bucket', presign=True, presign_ttl=1)
+    task = TaskFactory(project=project)
+    uri = 's3://pytest-bucket/image.jpg'
+
+    with mock.patch.object(S3ImportStorage, 'generate_http_url', return_value='https://signed/image.jpg') as m:
+        for _ in range(3):
+            assert task.resolve_storage_uri(uri)['url'] == 'https://signed/image.jpg'
+        assert project.resolve_storage_uri(uri)['url'] == 'https://signed/image.jpg'
+    m.assert_called_once_with(uri)
+    # cached for at most half of the presign ttl
+    assert 0 < redis.ttl(get_resolved_uri_key(storage, uri)) <= 30
+
+    # URLs of storages that don't presign aren't cached
+    storage.presign = False
+    storage.save()
+    task = Task.objects.get(id=task.id)
+    with mock.patch.object(S3ImportStorage, 'generate_http_url', return_value='data:image/jpeg;base64,') as m:
+        task.resolve_storage_uri(uri)
+        task.resolve_storage_uri(uri)
+    assert m.call_count == 2
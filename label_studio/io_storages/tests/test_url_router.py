@@ -0,0 +1,93 @@
+import mock
+import pytest
+from io_storages.functions import get_storage_by_url
+from io_storages.models import AzureBlobImportStorage, GCSImportStorage, RedisImportStorage, S3ImportStorage
+from io_storages.url_router import get_project_storage_router
+from projects.models import Project
+from projects.tests.factories import ProjectFactory
+from tests.utils import fake_redis  # noqa
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project_with_storages():
+    project = ProjectFactory()
+    storages = {
+        's3_a': S3ImportStorage.objects.create(project=project, bucket='bucket-a'),
+        's3_b': S3ImportStorage.objects.create(project=project, bucket='bucket-b'),
+        's3_a_other_prefix': S3ImportStorage.objects.create(project=project, bucket='bucket-a', prefix='other'),
+        'gcs_a': GCSImportStorage.objects.create(project=project, bucket='bucket-a'),
+        'azure_c': AzureBlobImportStorage.objects.create(project=project, container='container-c'),
+        'redis': RedisImportStorage.objects.create(project=project, path='bucket-a'),
+    }
+    return project, storages
+
+
+@pytest.fixture
+def fake_router_redis(fake_redis):
+    with mock.patch.dict('io_storages.url_router._routers', clear=True):
+        yield fake_redis
+
+
+@pytest.mark.parametrize(
+    'url, expected',
+    [
+        ('s3://bucket-a/image.jpg', 's3_a'),
+        ('s3://bucket-b/dir/image.jpg', 's3_b'),
+        ('gs://bucket-a/image.jpg', 'gcs_a'),
+        ('azure-blob://container-c/audio.wav', 'azure_c'),
+        ('<img src="s3://bucket-b/image.jpg"/>', 's3_b'),
+        ({'image': 's3://bucket-b/image.jpg'}, 's3_b'),
+        (['gs://bucket-a/1.jpg', 'gs://bucket-a/2.jpg'], 'gcs_a'),
+        ('s3://unknown-bucket/image.jpg', None),
+        ('https://example.com/image.jpg', None),
+        ('some text', None),
+        (42, None),
+    ],
+)
+def test_url_router_matches_linear_scan(project_with_storages, url, expected):
+    project, storages = project_with_storages
+    storage_objects = project.get_all_import_storage_objects
+    scanned = next(
+        (
+            storage
+            for storage in storage_objects
+            if isinstance(url, (str, dict, list)) and storage.can_resolve_url(url)
+        ),
+        None,
+    )
+
+    with mock.patch.object(S3ImportStorage, 'can_resolve_url') as can_resolve_url:
+        storage = get_storage_by_url(url, project.import_storage_router)
+    # storages routed by bucket aren't asked one by one
+    can_resolve_url.assert_not_called()
+
+    assert storage == scanned
+    assert storage == (storages[expected] if expected else None)
+
+
+def test_url_router_is_cached_until_storages_change(project_with_storages, fake_router_redis):
+    project, storages = project_with_storages
+    router = get_project_storage_router(project)
+
+    with mock.patch.object(
+        Project, 'get_all_import_storage_objects', new_callable=mock.PropertyMock
+    ) as get_all_import_storage_objects:
+        assert get_project_storage_router(Project.objects.get(id=project.id)) is router
+        # sync status updates don't change routing
+        storages['s3_a'].info_set_queued()
+        assert get_project_storage_router(Project.objects.get(id=project.id)) is router
+        get_all_import_storage_objects.assert_not_called()
+
+    storage = storages['s3_b']
+    storage.bucket = 'bucket-new'
+    storage.save()
+    router = get_project_storage_router(Project.objects.get(id=project.id))
+    assert router.match('s3://bucket-new/image.jpg') == storage
+    assert router.match('s3://bucket-b/image.jpg') is None
+
+    storage.delete()
+    router = get_project_storage_router(Project.objects.get(id=project.id))
+    assert router.match('s3://bucket-new/image.jpg') is None
+    assert len(router.storages) == len(storages) - 1
@@ -0,0 +1,47 @@
+"""Cache of URLs presigned by import storages.
+
+Every task served to the Data Manager, the label stream or the presign
+endpoint presigns its storage URLs again, which costs a storage client and a
+signature per URL. Presigned URLs are cached in Redis per storage and URI for
+STORAGE_RESOLVED_URI_CACHE_TTL seconds, but never for more than half of the
+storage presign_ttl, so a URL served from the cache stays valid for at least
+half of its lifetime.
+
+URLs of storages with presign off (inlined or proxied content) aren't cached.
+Changing storage credentials doesn't invalidate cached URLs, they expire with the TTL.
+"""
+import hashlib
+import logging
+
+from core.redis import redis_get, redis_set
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_resolved_uri_key(storage, uri) -> str:
+    digest = hashlib.sha1(uri.encode()).hexdigest()  # nosec
+    return f'io-storages:resolved-uri:{storage.__class__.__name__}:{storage.id}:{digest}'
+
+
+def get_cache_ttl(storage) -> int:
+    if not settings.STORAGE_RESOLVED_URI_CACHE_TTL or not getattr(storage, 'presign', False):
+        return 0
+    return min(settings.STORAGE_RESOLVED_URI_CACHE_TTL, storage.presign_ttl * 60 // 2)
+
+
+def generate_http_url_cached(storage, uri):
+    """storage.generate_http_url(uri) served from the cache while the presigned URL is fresh"""
+    ttl = get_cache_ttl(storage)
+    if not ttl:
+        return storage.generate_http_url(uri)
+
+    key = get_resolved_uri_key(storage, uri)
+    cached = redis_get(key)
+    if cached is not None:
+        return cached.decode() if isinstance(cached, bytes) else cached
+
+    http_url = storage.generate_http_url(uri)
+    if http_url:
+        redis_set(key, http_url, ttl=ttl)
+    return http_url
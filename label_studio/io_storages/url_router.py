@@ -0,0 +1,103 @@
+"""Router from storage URLs to the import storages of a project that resolve them.
+
+Instead of asking every import storage of the project whether it can resolve
+a URL, the router indexes storages by URL scheme and bucket (container for
+Azure), so finding the storage for a URL is one dictionary lookup per scheme:
+
+    {'s3': {'bucket-a': (0, <S3ImportStorage>)}, 'gs': {'bucket-b': (2, <GCSImportStorage>)}}
+
+Storages without a route (see ImportStorage.get_url_route) are still asked
+with can_resolve_url(). If several storages match a URL, the first one in
+Project.get_all_import_storage_objects order wins, as with the linear scan.
+
+Routers are kept per process for STORAGE_URL_ROUTER_CACHE_SIZE projects and
+checked against a per-project version in Redis, bumped whenever an import
+storage of the project is saved (sync status updates aside) or deleted.
+Without Redis a router is built per Project instance.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Union
+
+from core.redis import redis_connected, redis_get, redis_incr
+from django.conf import settings
+from django.db import transaction
+from io_storages.utils import parse_bucket_uri_by_scheme
+
+logger = logging.getLogger(__name__)
+
+_routers = OrderedDict()  # project id => (version, router)
+_routers_lock = threading.Lock()
+
+
+class StorageURLRouter:
+    def __init__(self, storages):
+        self.storages = list(storages)
+        self.routes = {}  # url scheme => bucket => (order, storage), only the first storage of a bucket is kept
+        self.unrouted = []  # (order, storage)
+        for order, storage in enumerate(self.storages):
+            route = storage.get_url_route()
+            if route is None:
+                self.unrouted.append((order, storage))
+            else:
+                url_scheme, bucket = route
+                self.routes.setdefault(url_scheme, {}).setdefault(bucket, (order, storage))
+
+    def match(self, url: Union[str, List, Dict]):
+        """The storage that resolves the URL (or the first URL found in a list or dict), or None"""
+        # task data can have int, float, etc.
+        if not isinstance(url, (str, list, dict)):
+            return None
+
+        best = None
+        for url_scheme, buckets in self.routes.items():
+            uri = parse_bucket_uri_by_scheme(url, url_scheme)
+            if uri is not None and uri.bucket in buckets:
+                candidate = buckets[uri.bucket]
+                if best is None or candidate[0] < best[0]:
+                    best = candidate
+
+        for order, storage in self.unrouted:
+            if best is not None and order > best[0]:
+                break
+            if storage.can_resolve_url(url):
+                best = (order, storage)
+                break
+
+        return best[1] if best else None
+
+
+def get_router_version_key(project_id) -> str:
+    return f'io-storages:url-router-version:{project_id}'
+
+
+def bump_storage_router_version(project_id) -> None:
+    """Invalidate the cached URL routers of the project in all processes"""
+    if not project_id or not redis_connected():
+        return
+    key = get_router_version_key(project_id)
+    redis_incr(key)
+    # bump again after commit, a router built meanwhile could have read the storages before the change
+    transaction.on_commit(lambda: redis_incr(key))
+
+
+def get_project_storage_router(project) -> StorageURLRouter:
+    if not settings.STORAGE_URL_ROUTER_CACHE_SIZE or not redis_connected():
+        return StorageURLRouter(project.get_all_import_storage_objects)
+
+    version = int(redis_get(get_router_version_key(project.id)) or 0)
+    with _routers_lock:
+        cached = _routers.get(project.id)
+        if cached is not None and cached[0] == version:
+            _routers.move_to_end(project.id)
+            return cached[1]
+
+    router = StorageURLRouter(project.get_all_import_storage_objects)
+    with _routers_lock:
+        _routers[project.id] = (version, router)
+        _routers.move_to_end(project.id)
+        while len(_routers) > settings.STORAGE_URL_ROUTER_CACHE_SIZE:
+            _routers.popitem(last=False)
+    logger.debug(f'URL router of project {project.id} built with {len(router.storages)} storages')
+    return router
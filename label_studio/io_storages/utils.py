@@ -56,10 +56,14 @@ def get_uri_via_regex(data, prefixes=('s3', 'gs')) -> tuple[Union[str, None], Un
 
 
 def parse_bucket_uri(value: object, storage) -> Union[BucketURI, None]:
+    return parse_bucket_uri_by_scheme(value, storage.url_scheme)
+
+
+def parse_bucket_uri_by_scheme(value: object, url_scheme: str) -> Union[BucketURI, None]:
     if not value:
         return None
 
-    uri, _ = get_uri_via_regex(value, prefixes=(storage.url_scheme,))
+    uri, _ = get_uri_via_regex(value, prefixes=(url_scheme,))
     if not uri:
         return None
 
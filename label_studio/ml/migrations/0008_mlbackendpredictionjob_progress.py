@@ -0,0 +1,75 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ml", "0007_auto_20240314_1957"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="error_message",
+            field=models.TextField(
+                blank=True,
+                help_text="Error in failed state",
+                null=True,
+                verbose_name="error message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="last_task_id",
+            field=models.IntegerField(
+                blank=True,
+                help_text="Highest task id of the last completed batch, the job is resumed after it",
+                null=True,
+                verbose_name="last task id",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="predictions_created",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of predictions saved by this job",
+                verbose_name="predictions created",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="processed_tasks",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of tasks in completed batches",
+                verbose_name="processed tasks",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("created", "Created"),
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                default="created",
+                max_length=16,
+                verbose_name="status",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlbackendpredictionjob",
+            name="total_tasks",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of tasks to predict",
+                verbose_name="total tasks",
+            ),
+        ),
+    ]
@@ -1,7 +1,10 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import logging
-from typing import Dict, List
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from core.utils.common import conditional_atomic, db_is_not_sqlite, load_func
 from django.conf import settings
@@ -9,12 +12,16 @@ from django.db import models, transaction
 from django.db.models import Count, JSONField, Q
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from ml.api_connector import PREDICT_URL, TIMEOUT_PREDICT, MLApi
 from projects.models import Project
-from tasks.serializers import PredictionSerializer, TaskSimpleSerializer
+from tasks.serializers import TaskSimpleSerializer
 from webhooks.serializers import Webhook, WebhookSerializer
 
+if TYPE_CHECKING:
+    from tasks.models import Prediction
+
 logger = logging.getLogger(__name__)
 
 MAX_JOBS_PER_PROJECT = 1
@@ -193,6 +200,7 @@ class MLBackend(models.Model):
             auth_method=self.auth_method,
             basic_auth_user=self.basic_auth_user,
             basic_auth_pass=self.basic_auth_pass,
+            pool_maxsize=settings.ML_PREDICTION_MAX_WORKERS,
         )
 
     @property
@@ -259,7 +267,7 @@ class MLBackend(models.Model):
         }
 
     def _get_predictions_from_ml_backend_one_by_one(
-        self, serialized_tasks: List[Dict], current_responses: List[Dict]
+        self, serialized_tasks: List[Dict], current_responses: List[Dict], ml_api: MLApi
     ) -> List[Dict]:
         """
         This is helper method to get predictions from ML backend one by one
@@ -277,7 +285,7 @@ class MLBackend(models.Model):
             predictions = []
             for serialized_task in serialized_tasks:
                 # get predictions per task
-                predictions.extend(self._get_predictions_from_ml_backend([serialized_task]))
+                predictions.extend(self._get_predictions_from_ml_backend([serialized_task], ml_api=ml_api))
 
             return predictions
         else:
@@ -289,21 +297,24 @@ class MLBackend(models.Model):
             )
             return []
 
-    def _get_predictions_from_ml_backend(self, serialized_tasks: List[Dict]) -> List[Dict]:
-        result = self.api.make_predictions(serialized_tasks, self.project)
+    def _request_predictions(self, serialized_tasks: List[Dict], ml_api: MLApi) -> Tuple[List[Dict], Optional[str]]:
+        """Request predictions for serialized tasks, returns (predictions, error message).
+
+        Only HTTP calls are made here, so it is safe to run in pool threads.
+        """
+        result = ml_api.make_predictions(serialized_tasks, self.project)
 
         # response validation
         if result.is_error:
-            logger.error(f'Error occurred: {result.error_message}')
-            return []
+            return [], result.error_message
         elif not isinstance(result.response, dict) or 'results' not in result.response:
             logger.error(f'ML backend returns an incorrect response, it must be a dict: {result.response}')
-            return []
+            return [], None
         elif not isinstance(result.response['results'], list) or len(result.response['results']) == 0:
             logger.error(
                 'ML backend returns an incorrect response, results field must be a list with at least one item'
             )
-            return []
+            return [], None
 
         responses = result.response['results']
 
@@ -312,7 +323,7 @@ class MLBackend(models.Model):
             # Number of tasks and responses are not equal
             # It can happen if ML backend doesn't support batch processing but only process one task at a time
             # In the future versions, we may better consider this as an error and deprecate this code branch
-            return self._get_predictions_from_ml_backend_one_by_one(serialized_tasks, responses)
+            return self._get_predictions_from_ml_backend_one_by_one(serialized_tasks, responses, ml_api), None
 
         # ML backend supports batch processing
         for task, response in zip(serialized_tasks, responses):
@@ -337,32 +348,133 @@ class MLBackend(models.Model):
                         'project': task['project'],
                     }
                 )
+        return predictions, None
+
+    def _get_predictions_from_ml_backend(self, serialized_tasks: List[Dict], ml_api: MLApi = None) -> List[Dict]:
+        predictions, error = self._request_predictions(serialized_tasks, ml_api or self.api)
+        if error:
+            logger.error(f'Error occurred: {error}')
         return predictions
 
-    def predict_tasks(self, tasks):
+    def _save_predictions(self, predictions: List[Dict], task_ids: List[int]) -> List['Prediction']:
+        """Bulk insert predictions of one chunk and update the counters of its tasks"""
+        from tasks.functions import update_tasks_counters
+        from tasks.models import Prediction, Task
+
+        # we need to call result normalizer here since "bulk_create" doesn't call save() method
+        db_predictions = [
+            Prediction(
+                task_id=prediction['task'],
+                project_id=prediction['project'],
+                result=Prediction.prepare_prediction_result(prediction['result'], self.project),
+                score=prediction['score'],
+                model_version=prediction['model_version'],
+            )
+            for prediction in predictions
+        ]
+        db_predictions = Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
+        tasks = Task.objects.filter(id__in=task_ids)
+        # new predictions are added to the project counters as deltas, the chunk doesn't recount the project
+        update_tasks_counters(tasks, recalculate_project_counters=False)
+        tasks.update(updated_at=timezone.now())
+        return db_predictions
+
+    def predict_tasks(self, tasks, job: Optional['MLBackendPredictionJob'] = None):
+        """Retrieve predictions for tasks that don't have predictions of the current model version yet.
+
+        Tasks are sent in chunks of ML_PREDICTION_CHUNK_SIZE, up to ML_PREDICTION_MAX_WORKERS chunks
+        at a time over one pooled connector. Predictions are saved per chunk, in task id order, so a job
+        interrupted by an error or a killed worker can be resumed by passing it again with the same tasks:
+        tasks up to job.last_task_id are skipped. A job is created when tasks don't fit into one chunk.
+
+        :return: created predictions, model version if all tasks already have predictions, None if not ready
+        """
         model_version = self.update_state()
         if self.not_ready:
             logger.debug(f'ML backend {self} is not ready')
+            if job is not None:
+                job.fail(f'ML backend {self} is not ready')
             return
 
-        if isinstance(tasks, list):
-            from tasks.models import Task
+        from tasks.models import Task
 
+        if isinstance(tasks, list):
             tasks = Task.objects.filter(id__in=[task.id for task in tasks])
 
         # Filter tasks that already contain the current model version in predictions
         tasks = tasks.annotate(predictions_count=Count('predictions')).exclude(
             Q(predictions_count__gt=0) & Q(predictions__model_version=model_version)
         )
-        if not tasks.exists():
+        if job is not None and job.last_task_id:
+            tasks = tasks.filter(id__gt=job.last_task_id)
+        task_ids = list(tasks.order_by('id').values_list('id', flat=True).distinct())
+        if not task_ids:
             logger.debug(f'All tasks already have prediction from model version={self.model_version}')
+            if job is not None:
+                job.finish()
             return model_version
-        tasks_ser = TaskSimpleSerializer(tasks, many=True).data
-        predictions = self._get_predictions_from_ml_backend(tasks_ser)
-        with conditional_atomic(predicate=db_is_not_sqlite):
-            prediction_ser = PredictionSerializer(data=predictions, many=True)
-            prediction_ser.is_valid(raise_exception=True)
-            instances = prediction_ser.save()
+
+        chunk_size = job.batch_size if job is not None else settings.ML_PREDICTION_CHUNK_SIZE
+        chunks = [task_ids[i : i + chunk_size] for i in range(0, len(task_ids), chunk_size)]
+        if job is None and len(chunks) > 1:
+            job = MLBackendPredictionJob.objects.create(
+                job_id=uuid.uuid4().hex, ml_backend=self, model_version=model_version, batch_size=chunk_size
+            )
+        if job is not None:
+            job.start(total_tasks=job.processed_tasks + len(task_ids))
+
+        # the project and the connector are shared with pool threads, which must not query the database
+        project = self.project
+        ml_api = self.api
+
+        def serialize(chunk):
+            queryset = (
+                Task.objects.filter(id__in=chunk)
+                .select_related('project')
+                .prefetch_related('annotations', 'predictions')
+                .order_by('id')
+            )
+            return TaskSimpleSerializer(queryset, many=True).data
+
+        instances = []
+        max_workers = min(settings.ML_PREDICTION_MAX_WORKERS, len(chunks))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ml-predict') as executor:
+            pending = deque()
+            next_chunk = 0
+            try:
+                while pending or next_chunk < len(chunks):
+                    # keep the pool busy, the next chunk is serialized while earlier ones are in flight
+                    while next_chunk < len(chunks) and len(pending) < max_workers:
+                        chunk = chunks[next_chunk]
+                        future = executor.submit(self._request_predictions, serialize(chunk), ml_api)
+                        pending.append((chunk, future))
+                        next_chunk += 1
+
+                    chunk, future = pending.popleft()
+                    predictions, error = future.result()
+                    if error:
+                        logger.error(f'Error occurred: {error}')
+                        for _, other in pending:
+                            other.cancel()
+                        if job is not None:
+                            job.fail(error)
+                        return instances
+
+                    with conditional_atomic(predicate=db_is_not_sqlite):
+                        instances.extend(self._save_predictions(predictions, chunk))
+                        if job is not None:
+                            job.complete_chunk(chunk, len(predictions))
+            except Exception as exc:
+                # don't leave the job running, it can be resumed from the last saved chunk
+                for _, other in pending:
+                    other.cancel()
+                if job is not None:
+                    job.fail(str(exc))
+                raise
+
+        if job is not None:
+            job.finish()
+        logger.debug(f'ML backend {self} created {len(instances)} predictions for {len(task_ids)} tasks of {project}')
         return instances
 
     def interactive_annotating(self, task, context=None, user=None):
@@ -426,6 +538,13 @@ class MLBackend(models.Model):
         )
 
 
+class MLBackendPredictionJobStatus(models.TextChoices):
+    CREATED = 'created', _('Created')
+    RUNNING = 'running', _('Running')
+    COMPLETED = 'completed', _('Completed')
+    FAILED = 'failed', _('Failed')
+
+
 class MLBackendPredictionJob(models.Model):
 
     job_id = models.CharField(max_length=128)
@@ -436,10 +555,55 @@ class MLBackendPredictionJob(models.Model):
     batch_size = models.PositiveSmallIntegerField(
         _('batch size'), default=100, help_text='Number of tasks processed per batch'
     )
+    status = models.CharField(
+        _('status'),
+        max_length=16,
+        choices=MLBackendPredictionJobStatus.choices,
+        default=MLBackendPredictionJobStatus.CREATED,
+    )
+    total_tasks = models.PositiveIntegerField(_('total tasks'), default=0, help_text='Number of tasks to predict')
+    processed_tasks = models.PositiveIntegerField(
+        _('processed tasks'), default=0, help_text='Number of tasks in completed batches'
+    )
+    predictions_created = models.PositiveIntegerField(
+        _('predictions created'), default=0, help_text='Number of predictions saved by this job'
+    )
+    last_task_id = models.IntegerField(
+        _('last task id'),
+        null=True,
+        blank=True,
+        help_text='Highest task id of the last completed batch, the job is resumed after it',
+    )
+    error_message = models.TextField(_('error message'), blank=True, null=True, help_text='Error in failed state')
 
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
+    @property
+    def progress(self):
+        return self.processed_tasks / self.total_tasks if self.total_tasks else 0.0
+
+    def start(self, total_tasks):
+        self.status = MLBackendPredictionJobStatus.RUNNING
+        self.total_tasks = total_tasks
+        self.error_message = None
+        self.save(update_fields=['status', 'total_tasks', 'error_message', 'updated_at'])
+
+    def complete_chunk(self, task_ids, predictions_count):
+        self.processed_tasks += len(task_ids)
+        self.predictions_created += predictions_count
+        self.last_task_id = max(task_ids)
+        self.save(update_fields=['processed_tasks', 'predictions_created', 'last_task_id', 'updated_at'])
+
+    def finish(self):
+        self.status = MLBackendPredictionJobStatus.COMPLETED
+        self.save(update_fields=['status', 'updated_at'])
+
+    def fail(self, error_message):
+        self.status = MLBackendPredictionJobStatus.FAILED
+        self.error_message = error_message
+        self.save(update_fields=['status', 'error_message', 'updated_at'])
+
 
 class MLBackendTrainJob(models.Model):
 
@@ -1,6 +1,11 @@
 from rest_framework import generics, permissions
-from .models import Notification
-from .serializers import NotificationSerializer
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .hub import notification_hub
+from .models import Notification, get_user_channel
+from .serializers import NotificationMarkReadSerializer, NotificationSerializer
+from .services import get_unread_count, mark_notifications_as_read
 
 
 class NotificationListView(generics.ListAPIView):
@@ -8,11 +13,7 @@ class NotificationListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        user_channel_prefix = f"{user.id}{user.email}"
-        queryset = Notification.objects.filter(
-            channel__startswith=user_channel_prefix
-        )
+        queryset = Notification.objects.for_user(self.request.user)
 
         unread_only = self.request.query_params.get('unread', None)
         if unread_only and unread_only.lower() in ['true', '1']:
@@ -27,11 +28,73 @@ class MarkNotificationAsReadView(generics.UpdateAPIView):
     lookup_field = 'pk'
 
     def get_queryset(self):
-        user = self.request.user
-        user_channel_prefix = f"{user.id}{user.email}"
-        return Notification.objects.filter(
-            channel__startswith=user_channel_prefix
-        )
+        return Notification.objects.for_user(self.request.user)
 
     def perform_update(self, serializer):
-        serializer.save(is_read=True)
\ No newline at end of file
+        # Conditional UPDATE keeps the unread counter exact under concurrent requests
+        mark_notifications_as_read(serializer.instance.channel, ids=[serializer.instance.id])
+        serializer.save(is_read=True)
+
+
+class NotificationInboxPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NotificationInboxAPI(generics.ListAPIView):
+    """
+    Keyset-paginated inbox of the current user.
+
+    Pages are fetched with `channel = %s AND id < cursor`, served by the
+    (channel, id) index, so deep pages cost the same as the first one. The
+    response includes the unread counter for the inbox badge.
+    """
+
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationInboxPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.for_user(self.request.user)
+        unread_only = self.request.query_params.get('unread', None)
+        if unread_only and unread_only.lower() in ['true', '1']:
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['unread_count'] = get_unread_count(get_user_channel(self.request.user))
+        return response
+
+
+class NotificationUnreadCountAPI(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread_count': get_unread_count(get_user_channel(request.user))})
+
+
+class NotificationMarkReadAPI(APIView):
+    """Mark the given notifications (or all of them) as read with a single UPDATE"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        channel = get_user_channel(request.user)
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        updated = mark_notifications_as_read(channel, ids=ids)
+        return Response({'updated': updated, 'unread_count': get_unread_count(channel)})
+
+
+class NotificationStreamStatsAPI(APIView):
+    """Connection and fan-out counters of this process's notification SSE hub"""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(notification_hub.stats())
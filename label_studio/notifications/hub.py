@@ -0,0 +1,122 @@
+"""
+Per-process fan-out hub for notification Server-Sent Events.
+
+Instead of opening one Redis pubsub subscription per browser connection, each
+process holds a single pattern subscription (NOTIFICATION_SSE_CHANNEL_PATTERN)
+and forwards every message to the asyncio queues of the clients connected to
+that channel. The listener starts with the first client and stops when the
+last one disconnects.
+
+Usage:
+    from notifications.hub import notification_hub
+
+    queue = await notification_hub.connect(channel)
+    try:
+        data = await queue.get()
+    finally:
+        notification_hub.disconnect(channel, queue)
+"""
+import asyncio
+import fnmatch
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+import redis
+from django.conf import settings
+
+from .services import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# Delay before re-subscribing after a Redis error
+RECONNECT_DELAY = 1
+
+
+class NotificationHub:
+    """Multiplex one Redis pattern subscription over in-process client queues."""
+
+    def __init__(self, pattern: str, queue_size: int):
+        self.pattern = pattern
+        self.queue_size = queue_size
+        self._queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+        self.connections_opened = 0
+        self.messages_received = 0
+        self.messages_delivered = 0
+        self.messages_dropped = 0
+
+    def accepts(self, channel: str) -> bool:
+        """Whether the hub subscription covers the channel."""
+        return fnmatch.fnmatchcase(channel, self.pattern)
+
+    async def connect(self, channel: str) -> asyncio.Queue:
+        """Register a client queue for channel and make sure the listener is running."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues[channel].add(queue)
+        self.connections_opened += 1
+        self._ensure_listener()
+        return queue
+
+    def disconnect(self, channel: str, queue: asyncio.Queue) -> None:
+        queues = self._queues.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[channel]
+        if not self._queues and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def publish_local(self, channel: str, data) -> None:
+        """Deliver a message received from Redis to every queue subscribed to channel."""
+        self.messages_received += 1
+        for queue in self._queues.get(channel, ()):
+            if queue.full():
+                # A slow client loses its oldest message rather than stalling everyone else
+                queue.get_nowait()
+                self.messages_dropped += 1
+            queue.put_nowait(data)
+            self.messages_delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            'connections': sum(len(queues) for queues in self._queues.values()),
+            'channels': len(self._queues),
+            'connections_opened': self.connections_opened,
+            'messages_received': self.messages_received,
+            'messages_delivered': self.messages_delivered,
+            'messages_dropped': self.messages_dropped,
+            'listening': self._listener is not None and not self._listener.done(),
+        }
+
+    def _ensure_listener(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with RedisClient().get_pubsub_client() as pubsub:
+                    await pubsub.psubscribe(self.pattern)
+                    logger.debug(f'Notification hub subscribed to {self.pattern}')
+                    while True:
+                        msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                        if msg is None or msg['type'] != 'pmessage':
+                            continue
+                        channel = msg['channel']
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        self.publish_local(channel, msg['data'])
+            except asyncio.CancelledError:
+                raise
+            except (redis.RedisError, OSError) as exc:
+                logger.warning(f'Notification hub lost its Redis subscription, reconnecting: {exc}')
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+notification_hub = NotificationHub(
+    pattern=settings.NOTIFICATION_SSE_CHANNEL_PATTERN,
+    queue_size=settings.NOTIFICATION_SSE_QUEUE_SIZE,
+)
@@ -0,0 +1,18 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from notifications.services import dispatch_notification_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending notifications from the outbox (retries rows left behind by Redis failures)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='rows delivered per batch')
+
+    def handle(self, *args, **options):
+        delivered = dispatch_notification_outbox(batch_size=options['batch_size'])
+        logger.debug(f'Delivered {delivered} notifications from the outbox.')
+        self.stdout.write(f'Delivered {delivered} notifications')
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "notifications",
+            "0002_notification_is_read_alter_notification_event_type_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.TextField()),
+                ("channel", models.CharField(max_length=255)),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("project_assigned", "Project Assigned"),
+                            ("project_commented", "Project Task Commented"),
+                            ("project_ocr_import", "Project OCR Import"),
+                            ("review_approved", "Review Approved"),
+                            ("review_rejected", "Review Rejected"),
+                            ("review_revision_requested", "Revision Requested"),
+                            ("review_resubmitted", "Review Resubmitted"),
+                        ],
+                        max_length=64,
+                    ),
+                ),
+                ("content", models.TextField(blank=True)),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of failed publish attempts"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "notification",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Notification row created by the dispatcher; set once the row is inserted",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_entries",
+                        to="notifications.notification",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -5,6 +5,12 @@ from django.utils.translation import gettext_lazy as _
 class NotificationChannel():
     NOTIFICATION = 'notifications'
 
+
+def get_user_channel(user, channel_name=NotificationChannel.NOTIFICATION):
+    """Redis/Notification channel of a user, as built by NotificationService"""
+    return user.user_channel_name + "_" + channel_name
+
+
 class NotificationEventType(models.TextChoices):
     PROJECT_ASSIGNED = 'project_assigned', _('Project Assigned')
     PROJECT_COMMENTED = 'project_commented', _('Project Task Commented')
@@ -15,6 +21,12 @@ class NotificationEventType(models.TextChoices):
     REVIEW_REVISION_REQUESTED = 'review_revision_requested', _('Revision Requested')
     REVIEW_RESUBMITTED = 'review_resubmitted', _('Review Resubmitted')
 
+
+class NotificationQuerySet(models.QuerySet):
+    def for_user(self, user, channel_name=NotificationChannel.NOTIFICATION):
+        return self.filter(channel=get_user_channel(user, channel_name))
+
+
 """ 
 TODO: Redesign the Notification send_notification implementation 
 for easy sourcing action
@@ -33,3 +45,53 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's inbox: WHERE channel = %s AND id < %s ORDER BY id DESC
+            models.Index(fields=['channel', 'id'], name='notification_channel_id_idx'),
+            models.Index(fields=['channel', 'is_read'], name='notification_channel_read_idx'),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count per channel.
+
+    Kept in step with Notification inserts and mark-as-read updates (see
+    notifications.services) so that inbox badges don't count rows on every
+    poll. A missing row is initialized from the table on first read.
+    """
+
+    channel = models.CharField(max_length=255, unique=True)
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class NotificationOutbox(models.Model):
+    """
+    Pending notification delivery.
+
+    Rows are written inside the request transaction by
+    NotificationService.send_notification_sync and consumed by
+    dispatch_notification_outbox, which batches Notification inserts and
+    Redis publishes. A row is deleted when its batch is claimed and put back
+    as pending if publishing the batch fails.
+    """
+
+    source = models.TextField(null=False)
+    channel = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=64, choices=NotificationEventType.choices, null=False)
+    content = models.TextField(null=False, blank=True)
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbox_entries',
+        help_text='Notification row created by the dispatcher; set once the row is inserted',
+    )
+    attempts = models.PositiveIntegerField(default=0, help_text='Number of failed publish attempts')
+    created_at = models.DateTimeField(auto_now_add=True)
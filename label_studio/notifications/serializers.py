@@ -48,4 +48,14 @@ class NotificationSerializer(serializers.ModelSerializer):
             content = json.loads(obj.content)
             return content.get('action_type', None)
         except (json.JSONDecodeError, AttributeError):
-            return None
\ No newline at end of file
+            return None
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    all = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs['all'] and not attrs.get('ids'):
+            raise serializers.ValidationError('Provide notification ids or set all to true')
+        return attrs
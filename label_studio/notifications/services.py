@@ -1,12 +1,19 @@
 import json
+import logging
+from collections import Counter
 from functools import cache
 
 import redis
 import redis.asyncio as aredis
+from core.redis import redis_connected, start_job_async_or_sync
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from users.models import User
 
-from .models import Notification, NotificationEventType
+from .models import Notification, NotificationCounter, NotificationEventType, NotificationOutbox, get_user_channel
+
+logger = logging.getLogger(__name__)
 
 
 class RedisClient:
@@ -29,6 +36,13 @@ class RedisClient:
     def publish(self, channel, message):
         self._get_client().publish(channel=channel, message=message)
 
+    def publish_many(self, messages):
+        """Publish (channel, message) pairs in a single pipelined round trip."""
+        pipeline = self._get_client().pipeline(transaction=False)
+        for channel, message in messages:
+            pipeline.publish(channel=channel, message=message)
+        pipeline.execute()
+
 
 class NotificationService:
     __slots__ = "redis_client"
@@ -47,7 +61,7 @@ class NotificationService:
                                 action_type: str = None,
                                 source: str = None):
 
-            user_channel = receive_user.user_channel_name + "_" + channel_name
+            user_channel = get_user_channel(receive_user, channel_name)
 
             content_data = {
                 'subject': subject,
@@ -66,6 +80,9 @@ class NotificationService:
                 event_type= event_type,
                 content=json.dumps(content_data),
             )
+            await NotificationCounter.objects.filter(channel=user_channel).aupdate(
+                unread_count=F('unread_count') + 1
+            )
 
             context_data = {
                 'id': notification.id,
@@ -100,8 +117,13 @@ class NotificationService:
         """
         Synchronous version of send_notification for use in sync contexts
         like Django REST Framework views.
+
+        Only writes a NotificationOutbox row, so it joins the caller's
+        transaction and does not touch Redis. The Notification row is inserted
+        and published by dispatch_notification_outbox, which is started once
+        the transaction commits.
         """
-        user_channel = receive_user.user_channel_name + "_" + channel_name
+        user_channel = get_user_channel(receive_user, channel_name)
 
         content_data = {
             'subject': subject,
@@ -114,29 +136,169 @@ class NotificationService:
         if action_type:
             content_data['action_type'] = action_type
 
-        notification = Notification.objects.create(
+        NotificationOutbox.objects.create(
             source=source or '',
             channel=user_channel,
             event_type=event_type,
             content=json.dumps(content_data),
         )
 
-        context_data = {
-            'id': notification.id,
-            'type': 'info',
-            'subject': subject,
-            'message': message,
-            'message_time': ts.timestamp(),
-        }
+        start_job_async_or_sync(dispatch_notification_outbox, queue_name='low')
 
-        if path:
-            context_data['path'] = path
-        if action_type:
-            context_data['action_type'] = action_type
-
-        self.redis_client.publish(
-            user_channel,
-            json.dumps({
-                'context': context_data,
-            }),
-        )
\ No newline at end of file
+
+def get_unread_count(channel):
+    """
+    Return the unread notification count of a channel from its counter row.
+
+    The row is initialized from a COUNT query the first time a channel is read;
+    afterwards it is maintained by increment_unread_counts and
+    decrement_unread_count. The row is created and locked before counting, so
+    increments of notifications dispatched meanwhile wait for the initial
+    value instead of updating a missing row.
+    """
+    counter = NotificationCounter.objects.filter(channel=channel).values_list('unread_count', flat=True).first()
+    if counter is not None:
+        return counter
+
+    with transaction.atomic():
+        counter, _ = NotificationCounter.objects.select_for_update().get_or_create(channel=channel)
+        counter.unread_count = Notification.objects.filter(channel=channel, is_read=False).count()
+        counter.save(update_fields=['unread_count'])
+    return counter.unread_count
+
+
+def increment_unread_counts(counts):
+    """Add {channel: number of new unread notifications} to existing counter rows"""
+    for channel, count in counts.items():
+        NotificationCounter.objects.filter(channel=channel).update(unread_count=F('unread_count') + count)
+
+
+def decrement_unread_count(channel, count):
+    """Subtract notifications marked as read from the channel counter"""
+    if count:
+        NotificationCounter.objects.filter(channel=channel).update(unread_count=F('unread_count') - count)
+
+
+def mark_notifications_as_read(channel, ids=None):
+    """
+    Mark unread notifications of a channel as read with a single UPDATE.
+
+    Marks all of them when ids is None. Returns the number of updated rows.
+    """
+    queryset = Notification.objects.filter(channel=channel, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    with transaction.atomic():
+        updated = queryset.update(is_read=True)
+        decrement_unread_count(channel, updated)
+    return updated
+
+
+def build_notification_message(notification_id, content):
+    """Build the Redis payload consumed by the SSE stream from stored notification content."""
+    content_data = json.loads(content)
+    context_data = {
+        'id': notification_id,
+        'type': 'info',
+        'subject': content_data.get('subject', ''),
+        'message': content_data.get('message', ''),
+        'message_time': content_data['message_time'],
+    }
+    for key in ('path', 'action_type'):
+        if content_data.get(key):
+            context_data[key] = content_data[key]
+    return json.dumps({'context': context_data})
+
+
+def schedule_outbox_retry():
+    """Dispatch the outbox again later, so pending rows don't wait for the next notification"""
+    if not redis_connected():
+        # without the job queue the retry would run right away in this process
+        logger.warning('Job queue is not available, pending notifications are delivered with the next dispatch')
+        return
+    start_job_async_or_sync(
+        dispatch_notification_outbox, queue_name='low', in_seconds=settings.NOTIFICATION_OUTBOX_RETRY_DELAY
+    )
+
+
+def dispatch_notification_outbox(batch_size=None):
+    """
+    Deliver pending NotificationOutbox rows.
+
+    For each batch one transaction claims the rows, inserts Notification rows
+    for new entries with one bulk_create, marks notifications as dispatched and
+    deletes the outbox rows. All messages are published through one Redis
+    pipeline after that transaction commits, so no row lock is held while
+    waiting on Redis. If Redis is unavailable a second transaction puts the
+    rows back as pending, keeping the Notification rows (so the inbox stays
+    complete), and a retry is scheduled in NOTIFICATION_OUTBOX_RETRY_DELAY
+    seconds; after NOTIFICATION_OUTBOX_MAX_ATTEMPTS failures the notifications
+    are marked as failed.
+
+    Returns the number of published notifications.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    redis_client = RedisClient()
+    dispatched = 0
+
+    while True:
+        with transaction.atomic():
+            entries = list(NotificationOutbox.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+            if not entries:
+                return dispatched
+
+            new_entries = [entry for entry in entries if entry.notification_id is None]
+            notifications = Notification.objects.bulk_create(
+                [
+                    Notification(
+                        source=entry.source,
+                        channel=entry.channel,
+                        event_type=entry.event_type,
+                        content=entry.content,
+                    )
+                    for entry in new_entries
+                ]
+            )
+            for entry, notification in zip(new_entries, notifications):
+                entry.notification = notification
+            increment_unread_counts(Counter(entry.channel for entry in new_entries))
+
+            Notification.objects.filter(id__in=[entry.notification_id for entry in entries]).update(
+                status=Notification.Status.DISPATHED
+            )
+            NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).delete()
+
+        try:
+            redis_client.publish_many(
+                (entry.channel, build_notification_message(entry.notification_id, entry.content)) for entry in entries
+            )
+        except redis.RedisError as exc:
+            logger.warning(f'Failed to publish {len(entries)} notifications, will retry: {exc}')
+            _revert_outbox_entries(entries)
+            return dispatched
+
+        dispatched += len(entries)
+        if len(entries) < batch_size:
+            return dispatched
+
+
+def _revert_outbox_entries(entries):
+    """Put entries of a failed publish back as pending, or mark them failed after the last attempt"""
+    for entry in entries:
+        entry.attempts += 1
+    failed = [entry for entry in entries if entry.attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS]
+    pending = [entry for entry in entries if entry.attempts < settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS]
+
+    with transaction.atomic():
+        Notification.objects.filter(id__in=[entry.notification_id for entry in failed]).update(
+            status=Notification.Status.DISPATHED_FAILED
+        )
+        Notification.objects.filter(id__in=[entry.notification_id for entry in pending]).update(
+            status=Notification.Status.CREATED
+        )
+        # rows keep their ids, so retries are still delivered in the original order
+        NotificationOutbox.objects.bulk_create(pending)
+
+    if pending:
+        schedule_outbox_retry()
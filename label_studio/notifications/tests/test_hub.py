@@ -0,0 +1,123 @@
+"""
+Tests for the notification SSE hub and the event stream served from it.
+"""
+import asyncio
+import json
+from unittest import mock
+
+import fakeredis
+import pytest
+from notifications import urls
+from notifications.hub import NotificationHub
+from notifications.models import Notification
+from users.tests.factories import UserFactory
+
+
+def _message(notification_id, subject='Hello'):
+    return json.dumps(
+        {'context': {'id': notification_id, 'type': 'info', 'subject': subject, 'message': '', 'message_time': 0}}
+    )
+
+
+async def _next(stream, timeout=2):
+    return await asyncio.wait_for(stream.__anext__(), timeout=timeout)
+
+
+class TestNotificationHub:
+    def test_fans_out_to_channel_queues(self):
+        async def scenario():
+            hub = NotificationHub(pattern='*_notifications', queue_size=10)
+            with mock.patch.object(hub, '_ensure_listener'):
+                first = await hub.connect('1a@b.c_notifications')
+                second = await hub.connect('1a@b.c_notifications')
+                other = await hub.connect('2d@e.f_notifications')
+
+            hub.publish_local('1a@b.c_notifications', 'payload')
+            assert first.get_nowait() == second.get_nowait() == 'payload'
+            assert other.empty()
+            assert hub.stats()['connections'] == 3
+            assert hub.stats()['channels'] == 2
+
+            hub.disconnect('1a@b.c_notifications', first)
+            hub.disconnect('1a@b.c_notifications', second)
+            assert hub.stats()['channels'] == 1
+
+        asyncio.run(scenario())
+
+    def test_slow_client_drops_oldest_message(self):
+        async def scenario():
+            hub = NotificationHub(pattern='*', queue_size=2)
+            with mock.patch.object(hub, '_ensure_listener'):
+                queue = await hub.connect('channel')
+            for index in range(3):
+                hub.publish_local('channel', index)
+
+            assert [queue.get_nowait(), queue.get_nowait()] == [1, 2]
+            assert hub.stats()['messages_dropped'] == 1
+
+        asyncio.run(scenario())
+
+    def test_accepts_only_pattern_channels(self):
+        hub = NotificationHub(pattern='*_notifications', queue_size=1)
+        assert hub.accepts('1a@b.c_notifications')
+        assert not hub.accepts('rq:pubsub:worker')
+
+    def test_single_redis_subscription_for_all_clients(self):
+        server = fakeredis.FakeServer()
+
+        async def scenario():
+            hub = NotificationHub(pattern='*_notifications', queue_size=10)
+            with mock.patch(
+                'notifications.hub.RedisClient.get_pubsub_client',
+                side_effect=lambda: fakeredis.aioredis.FakeRedis(server=server).pubsub(),
+            ) as get_pubsub_client:
+                queues = [await hub.connect(f'{index}_notifications') for index in range(3)]
+                publisher = fakeredis.aioredis.FakeRedis(server=server)
+                for _ in range(50):
+                    if await publisher.publish('1_notifications', 'payload'):
+                        break
+                    await asyncio.sleep(0.01)
+
+                assert await asyncio.wait_for(queues[1].get(), timeout=2) == b'payload'
+                assert queues[0].empty() and queues[2].empty()
+                assert get_pubsub_client.call_count == 1
+
+                for index, queue in enumerate(queues):
+                    hub.disconnect(f'{index}_notifications', queue)
+                assert not hub.stats()['listening']
+
+        asyncio.run(scenario())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestStreamedEvents:
+    def test_replays_missed_notifications_then_streams(self, settings):
+        settings.NOTIFICATION_SSE_HEARTBEAT_INTERVAL = 0.05
+        user = UserFactory()
+        channel = f'{user.user_channel_name}_notifications'
+        content = json.dumps({'subject': 'Hello', 'message': '', 'message_time': 0})
+        notifications = [
+            Notification.objects.create(source='', channel=channel, event_type='review_approved', content=content)
+            for _ in range(3)
+        ]
+
+        async def scenario():
+            hub = NotificationHub(pattern='*_notifications', queue_size=10)
+            with mock.patch.object(urls, 'notification_hub', hub), mock.patch.object(hub, '_ensure_listener'):
+                stream = urls.streamed_events(channel, None, last_event_id=notifications[0].id)
+                replayed = [await _next(stream), await _next(stream)]
+                # Published while replaying: the duplicate is skipped, the new one is delivered
+                hub.publish_local(channel, _message(notifications[2].id))
+                hub.publish_local(channel, _message(notifications[2].id + 1, subject='Live'))
+                live = await _next(stream)
+                keepalive = await _next(stream)
+                await stream.aclose()
+                return replayed, live, keepalive, hub.stats()
+
+        replayed, live, keepalive, stats = asyncio.run(scenario())
+
+        assert replayed[0].startswith(f'id: {notifications[1].id}\ndata: ')
+        assert replayed[1].startswith(f'id: {notifications[2].id}\n')
+        assert json.loads(live.split('data: ', 1)[1])['subject'] == 'Live'
+        assert keepalive == ': keepalive\n\n'
+        assert stats['connections'] == 0
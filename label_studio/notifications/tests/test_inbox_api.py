@@ -0,0 +1,140 @@
+"""
+Tests for the keyset-paginated notification inbox, unread counters and bulk mark-as-read.
+"""
+import json
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+from notifications.models import Notification, NotificationCounter, NotificationOutbox, get_user_channel
+from notifications.services import RedisClient, dispatch_notification_outbox, get_unread_count
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.tests.factories import UserFactory
+
+
+@pytest.fixture
+def user(db):
+    return UserFactory()
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def _create_notifications(user, count, **kwargs):
+    content = json.dumps({'subject': 'Hello', 'message': 'World', 'message_time': 0})
+    return [
+        Notification.objects.create(
+            source='', channel=get_user_channel(user), event_type='review_approved', content=content, **kwargs
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestNotificationInboxAPI:
+    url = reverse('notifications:api:notification-inbox')
+
+    def test_pages_with_cursor(self, client, user):
+        notifications = _create_notifications(user, 5)
+        _create_notifications(UserFactory(), 2)
+
+        response = client.get(self.url, {'page_size': 3})
+        assert response.status_code == status.HTTP_200_OK
+        assert [n['id'] for n in response.data['results']] == [n.id for n in notifications[:1:-1]]
+        assert response.data['unread_count'] == 5
+
+        response = client.get(response.data['next'])
+        assert [n['id'] for n in response.data['results']] == [notifications[1].id, notifications[0].id]
+        assert response.data['next'] is None
+
+    def test_unread_filter(self, client, user):
+        _create_notifications(user, 2, is_read=True)
+        unread = _create_notifications(user, 1)
+
+        response = client.get(self.url, {'unread': 'true'})
+        assert [n['id'] for n in response.data['results']] == [unread[0].id]
+
+
+@pytest.mark.django_db
+class TestUnreadCounter:
+    def test_counter_initialized_once_then_served_from_row(self, client, user, django_assert_num_queries):
+        _create_notifications(user, 3)
+
+        response = client.get(reverse('notifications:api:notification-unread-count'))
+        assert response.data == {'unread_count': 3}
+        assert NotificationCounter.objects.get(channel=get_user_channel(user)).unread_count == 3
+
+        with django_assert_num_queries(1):
+            assert get_unread_count(get_user_channel(user)) == 3
+
+    def test_counter_row_exists_before_initial_count(self, user):
+        """Notifications dispatched while the initial COUNT runs must find the row to increment"""
+        channel = get_user_channel(user)
+        _create_notifications(user, 2)
+        count = Notification.objects.filter(channel=channel, is_read=False).count
+
+        def count_with_counter_row():
+            assert NotificationCounter.objects.filter(channel=channel).exists()
+            return count()
+
+        with mock.patch('django.db.models.query.QuerySet.count', side_effect=count_with_counter_row):
+            assert get_unread_count(channel) == 2
+        assert NotificationCounter.objects.get(channel=channel).unread_count == 2
+
+    def test_dispatch_increments_counter(self, user):
+        channel = get_user_channel(user)
+        assert get_unread_count(channel) == 0
+        NotificationOutbox.objects.create(
+            source='', channel=channel, event_type='review_approved', content=json.dumps({'message_time': 0})
+        )
+
+        with mock.patch.object(RedisClient, 'publish_many'):
+            dispatch_notification_outbox()
+
+        assert get_unread_count(channel) == 1
+
+    def test_mark_single_as_read_decrements_once(self, client, user):
+        notification = _create_notifications(user, 2)[0]
+        get_unread_count(get_user_channel(user))
+        url = reverse('notifications:api:notification-detail', kwargs={'pk': notification.id})
+
+        client.patch(url, {}, format='json')
+        client.patch(url, {}, format='json')
+
+        notification.refresh_from_db()
+        assert notification.is_read
+        assert get_unread_count(get_user_channel(user)) == 1
+
+
+@pytest.mark.django_db
+class TestNotificationMarkReadAPI:
+    url = reverse('notifications:api:notification-mark-read')
+
+    def test_marks_given_ids_with_single_update(self, client, user):
+        notifications = _create_notifications(user, 4)
+        other = _create_notifications(UserFactory(), 1)[0]
+        get_unread_count(get_user_channel(user))
+
+        response = client.post(self.url, {'ids': [notifications[0].id, notifications[1].id, other.id]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'updated': 2, 'unread_count': 2}
+        other.refresh_from_db()
+        assert not other.is_read
+
+    def test_marks_all(self, client, user):
+        _create_notifications(user, 3)
+
+        response = client.post(self.url, {'all': True}, format='json')
+
+        assert response.data == {'updated': 3, 'unread_count': 0}
+        assert not Notification.objects.for_user(user).filter(is_read=False).exists()
+
+    def test_requires_ids_or_all(self, client):
+        response = client.post(self.url, {}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,129 @@
+"""
+Tests for the notification outbox: send_notification_sync writes outbox rows and
+dispatch_notification_outbox delivers them in batches.
+"""
+import json
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+import redis
+from django.core.management import call_command
+from notifications.models import Notification, NotificationChannel, NotificationEventType, NotificationOutbox
+from notifications.services import NotificationService, RedisClient, dispatch_notification_outbox
+from users.tests.factories import UserFactory
+
+
+@pytest.fixture
+def user(db):
+    return UserFactory()
+
+
+def _send(user, subject='Review Decision', path=None):
+    NotificationService().send_notification_sync(
+        channel_name=NotificationChannel.NOTIFICATION,
+        event_type=NotificationEventType.REVIEW_APPROVED,
+        subject=subject,
+        message='Approved',
+        ts=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        receive_user=user,
+        path=path,
+    )
+
+
+@pytest.mark.django_db
+class TestNotificationOutbox:
+    def test_send_writes_outbox_row_and_dispatches_after_commit(self, user, django_capture_on_commit_callbacks):
+        with mock.patch.object(RedisClient, 'publish_many') as publish_many:
+            with django_capture_on_commit_callbacks(execute=False) as callbacks:
+                _send(user, path='/aviation/projects/1')
+
+            assert NotificationOutbox.objects.count() == 1
+            assert not Notification.objects.exists()
+            publish_many.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        notification = Notification.objects.get()
+        assert notification.status == Notification.Status.DISPATHED
+        assert notification.channel == f'{user.user_channel_name}_{NotificationChannel.NOTIFICATION}'
+        assert not NotificationOutbox.objects.exists()
+
+        [(channel, message)] = list(publish_many.call_args[0][0])
+        assert channel == notification.channel
+        assert json.loads(message)['context'] == {
+            'id': notification.id,
+            'type': 'info',
+            'subject': 'Review Decision',
+            'message': 'Approved',
+            'message_time': 1767225600.0,
+            'path': '/aviation/projects/1',
+        }
+
+    def test_dispatch_batches_inserts_and_publishes(self, user):
+        with mock.patch('notifications.services.start_job_async_or_sync'):
+            for index in range(5):
+                _send(user, subject=f'Subject {index}')
+
+        with mock.patch.object(RedisClient, 'publish_many') as publish_many:
+            publish_many.side_effect = lambda messages: list(messages)
+            assert dispatch_notification_outbox(batch_size=10) == 5
+
+        assert publish_many.call_count == 1
+        assert Notification.objects.filter(status=Notification.Status.DISPATHED).count() == 5
+        assert not NotificationOutbox.objects.exists()
+
+    def test_publishes_after_claim_transaction(self, user):
+        with mock.patch('notifications.services.start_job_async_or_sync'):
+            _send(user)
+
+        def publish_many(messages):
+            # the claim, insert and status update are already written when Redis is called
+            assert not NotificationOutbox.objects.exists()
+            assert Notification.objects.get().status == Notification.Status.DISPATHED
+            list(messages)
+
+        with mock.patch.object(RedisClient, 'publish_many', side_effect=publish_many):
+            assert dispatch_notification_outbox() == 1
+
+    def test_redis_failure_keeps_rows_for_retry(self, user, settings):
+        with mock.patch('notifications.services.start_job_async_or_sync'):
+            _send(user)
+
+        with mock.patch.object(RedisClient, 'publish_many', side_effect=redis.ConnectionError), mock.patch(
+            'notifications.services.redis_connected', return_value=True
+        ), mock.patch('notifications.services.start_job_async_or_sync') as start_job:
+            assert dispatch_notification_outbox() == 0
+
+        # A delayed dispatch is scheduled for the rows left pending
+        start_job.assert_called_once_with(
+            dispatch_notification_outbox, queue_name='low', in_seconds=settings.NOTIFICATION_OUTBOX_RETRY_DELAY
+        )
+        entry = NotificationOutbox.objects.get()
+        assert entry.attempts == 1
+        assert entry.notification_id == Notification.objects.get().id
+        assert entry.notification.status == Notification.Status.CREATED
+
+        # The retry reuses the already inserted Notification row
+        with mock.patch.object(RedisClient, 'publish_many'):
+            call_command('dispatch_notifications')
+
+        assert Notification.objects.get().status == Notification.Status.DISPATHED
+        assert not NotificationOutbox.objects.exists()
+
+    def test_marks_failed_after_max_attempts(self, user, settings):
+        settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 2
+        with mock.patch('notifications.services.start_job_async_or_sync'):
+            _send(user)
+
+        with mock.patch.object(RedisClient, 'publish_many', side_effect=redis.ConnectionError), mock.patch(
+            'notifications.services.redis_connected', return_value=True
+        ), mock.patch('notifications.services.start_job_async_or_sync') as start_job:
+            dispatch_notification_outbox()
+            dispatch_notification_outbox()
+
+        # No retry is scheduled once nothing is left pending
+        assert start_job.call_count == 1
+        assert Notification.objects.get().status == Notification.Status.DISPATHED_FAILED
+        assert not NotificationOutbox.objects.exists()
@@ -2,40 +2,79 @@ import asyncio
 import json
 import logging
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from django.http import HttpRequest, HttpResponseBase, HttpResponseNotAllowed, StreamingHttpResponse
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    HttpResponseBase,
+    HttpResponseNotAllowed,
+    HttpResponseNotFound,
+    StreamingHttpResponse,
+)
 from django.urls import include, path
 
 from . import api
-from .services import RedisClient
+from .hub import notification_hub
+from .models import Notification
+from .services import build_notification_message
 
 logger = logging.getLogger(__name__)
 app_name = 'notifications'
 
-redis_client = RedisClient()
 
-async def streamed_events(event_name: str, request: HttpRequest) -> AsyncGenerator[str, None]:
-    """Listen for events and generate an SSE message for each event"""
+def format_event(ctx: dict) -> str:
+    """Render a notification context as an SSE message, using the notification id as event id"""
+    ctx['message_time'] = datetime.fromtimestamp(ctx['message_time']).isoformat()
+    event_id = f'id: {ctx["id"]}\n' if ctx.get('id') is not None else ''
+    return f'{event_id}data: {json.dumps(ctx)}\n\n'
+
+
+def get_last_event_id(request: HttpRequest) -> Optional[int]:
+    """Last-Event-ID header sent by EventSource on reconnect (or last_event_id query param)"""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
     try:
-        async with redis_client.get_pubsub_client() as pubsub:
-            await pubsub.subscribe(event_name)
-            while True:
-                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
-                if msg is None:
-                    continue
-
-                data = json.loads(msg['data'])
-                ctx = data['context']
-                msg_time = datetime.fromtimestamp(ctx['message_time']).isoformat().__str__()
-                ctx['message_time'] = msg_time
-
-                yield f'data: {json.dumps(ctx)}\n\n'
-    except asyncio.CancelledError:
-        # Do any cleanup when the client disconnects
-        # Note: this will only be called starting from Django 5.0; until then, there is no cleanup,
-        # and you get some spammy 'took too long to shut down and was killed' log messages from Daphne etc.
-        raise
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def can_replay(request: HttpRequest, event_name: str) -> bool:
+    """Only the owner of a channel may replay its stored notifications"""
+    user = await request.auser()
+    return user.is_authenticated and event_name.startswith(user.user_channel_name + '_')
+
+
+async def streamed_events(
+    event_name: str, request: HttpRequest, last_event_id: Optional[int] = None
+) -> AsyncGenerator[str, None]:
+    """Listen for events on the process hub and generate an SSE message for each event"""
+    queue = await notification_hub.connect(event_name)
+    try:
+        # Subscribe before replaying so nothing published meanwhile is lost; duplicates are skipped below
+        replayed_up_to = last_event_id or 0
+        if last_event_id is not None:
+            notifications = Notification.objects.filter(channel=event_name, id__gt=last_event_id).order_by('id')
+            async for notification in notifications[: settings.NOTIFICATION_SSE_REPLAY_LIMIT]:
+                data = json.loads(build_notification_message(notification.id, notification.content))
+                yield format_event(data['context'])
+                replayed_up_to = notification.id
+
+        while True:
+            try:
+                msg = await asyncio.wait_for(queue.get(), timeout=settings.NOTIFICATION_SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # SSE comment line keeps proxies and load balancers from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+
+            ctx = json.loads(msg)['context']
+            if ctx.get('id') is not None and ctx['id'] <= replayed_up_to:
+                continue
+            yield format_event(ctx)
+    finally:
+        # Runs when the client disconnects (the generator is cancelled or closed)
+        notification_hub.disconnect(event_name, queue)
 
 
 async def events(request: HttpRequest, event_name: str) -> HttpResponseBase:
@@ -47,15 +86,29 @@ async def events(request: HttpRequest, event_name: str) -> HttpResponseBase:
             ]
         )
 
-    return StreamingHttpResponse(
-        streaming_content=streamed_events(event_name, request),
+    if not notification_hub.accepts(event_name):
+        return HttpResponseNotFound()
+
+    last_event_id = get_last_event_id(request)
+    if last_event_id is not None and not await can_replay(request, event_name):
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        streaming_content=streamed_events(event_name, request, last_event_id),
         content_type='text/event-stream',
     )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 _api_urlpatterns = [
     path('', api.NotificationListView.as_view(), name='notification-list'),
     path('<int:pk>/', api.MarkNotificationAsReadView.as_view(), name='notification-detail'),
+    path('inbox/', api.NotificationInboxAPI.as_view(), name='notification-inbox'),
+    path('unread-count/', api.NotificationUnreadCountAPI.as_view(), name='notification-unread-count'),
+    path('mark-read/', api.NotificationMarkReadAPI.as_view(), name='notification-mark-read'),
+    path('stream-stats/', api.NotificationStreamStatsAPI.as_view(), name='notification-stream-stats'),
 ]
 
 urlpatterns = [
@@ -30,6 +30,7 @@ from ml.serializers import MLBackendSerializer
 from notifications.models import NotificationChannel, NotificationEventType
 from notifications.services import NotificationService
 from projects.functions.next_task import get_next_task
+from projects.functions.overlap_cohort import get_overlap_cohort_progress
 from projects.functions.stream_history import get_label_stream_history
 from projects.functions.utils import recalculate_created_annotations_and_labels_from_scratch
 from projects.models import Project, ProjectImport, ProjectManager, ProjectReimport, ProjectSummary
@@ -521,6 +522,16 @@ class LabelStreamHistoryAPI(generics.RetrieveAPIView):
         return Response(history)
 
 
+class ProjectOverlapCohortProgressAPI(generics.RetrieveAPIView):
+    permission_required = all_permissions.projects_view
+    queryset = Project.objects.all()
+    swagger_schema = None  # this endpoint doesn't need to be in swagger API docs
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_object()
+        return Response(get_overlap_cohort_progress(project.id) or {'status': None})
+
+
 @method_decorator(
     name='post',
     decorator=swagger_auto_schema(
@@ -0,0 +1,37 @@
+"""Periodic reconciliation of the materialized project counters.
+
+Task, annotation and prediction writes keep projects.models.ProjectCounters up
+to date with deltas, bulk paths apply the changes of the task counters they
+recount. Whatever drifts (races, bulk writes that bypass both) is fixed by a
+low queue job that recalculates all projects and schedules its next run in
+PROJECT_COUNTERS_RECONCILE_INTERVAL seconds. Bulk counter updates start the
+job when no run is scheduled; a Redis key marks the scheduled run.
+
+Without Redis nothing is scheduled, run `manage.py reconcile_project_counters` instead.
+"""
+from core.redis import redis_connected, redis_delete, redis_get, redis_set, start_job_async_or_sync
+from django.conf import settings
+from django.utils import timezone
+
+SCHEDULED_KEY = 'projects:project-counters-reconcile-scheduled'
+
+
+def schedule_project_counters_reconcile() -> None:
+    """Schedule the next reconcile run, unless one is already scheduled"""
+    interval = settings.PROJECT_COUNTERS_RECONCILE_INTERVAL
+    if not interval or not redis_connected() or redis_get(SCHEDULED_KEY):
+        return
+    # the mark outlives the run a bit, so a lost job gets scheduled again by the next bulk update
+    redis_set(SCHEDULED_KEY, timezone.now().isoformat(), ttl=2 * interval)
+    start_job_async_or_sync(reconcile_project_counters, queue_name='low', in_seconds=interval)
+
+
+def reconcile_project_counters() -> int:
+    """Recalculate counters of all projects and schedule the next run. Returns the number of drifted projects."""
+    from projects.models import ProjectCounters
+
+    redis_delete(SCHEDULED_KEY)
+    try:
+        return ProjectCounters.reconcile()
+    finally:
+        schedule_project_counters_reconcile()
@@ -0,0 +1,49 @@
+"""Progress of the overlap cohort rearrangement of a project.
+
+Rearranging the overlap of a large project runs as a background job (see
+Project.rearrange_overlap_cohort). The job reports its stage to Redis, so the
+project settings page can poll GET /api/projects/<pk>/overlap-cohort/:
+
+    {"status": "running", "stage": "overlap", "stages_done": 1, "stages_total": 4, "tasks": 1000000, ...}
+
+Without Redis the rearrangement runs synchronously and no progress is stored.
+"""
+import json
+from typing import Optional
+
+from core.redis import redis_get, redis_set
+from django.utils import timezone
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+STAGES = ('ranking', 'overlap', 'is_labeled', 'counters')
+
+PROGRESS_TTL = 24 * 60 * 60
+
+
+def get_progress_key(project_id) -> str:
+    return f'projects:overlap-cohort-progress:{project_id}'
+
+
+def get_overlap_cohort_progress(project_id) -> Optional[dict]:
+    progress = redis_get(get_progress_key(project_id))
+    return json.loads(progress) if progress else None
+
+
+def set_overlap_cohort_progress(project_id, status, stage=None, **extra) -> dict:
+    progress = get_overlap_cohort_progress(project_id) or {}
+    if status in (QUEUED, RUNNING) and progress.get('status') in (COMPLETED, FAILED):
+        progress = {}
+    progress.update(extra, status=status, stages_total=len(STAGES), updated_at=timezone.now().isoformat())
+    if stage is not None:
+        progress['stage'] = stage
+        progress['stages_done'] = STAGES.index(stage)
+    if status == RUNNING and 'started_at' not in progress:
+        progress['started_at'] = progress['updated_at']
+    if status == COMPLETED:
+        progress['stages_done'] = len(STAGES)
+        progress.pop('stage', None)
+    if status in (COMPLETED, FAILED):
+        progress['finished_at'] = progress['updated_at']
+    redis_set(get_progress_key(project_id), json.dumps(progress), ttl=PROGRESS_TTL)
+    return progress
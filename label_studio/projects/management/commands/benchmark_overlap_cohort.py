@@ -0,0 +1,52 @@
+import logging
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from projects.models import Project
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the overlap cohort rearrangement of a project on the configured database (SQLite or PostgreSQL). '
+        'Changes are rolled back unless --commit is given'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int, help='project to rearrange')
+        parser.add_argument('--percentage', type=int, default=None, help='overlap cohort percentage to apply')
+        parser.add_argument('--maximum-annotations', type=int, default=None, help='maximum annotations to apply')
+        parser.add_argument('--repeat', type=int, default=1, help='number of runs')
+        parser.add_argument('--commit', action='store_true', help='keep the rearranged overlap')
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(id=options['project_id']).first()
+        if project is None:
+            raise CommandError(f'Project {options["project_id"]} not found')
+        if options['percentage'] is not None:
+            project.overlap_cohort_percentage = options['percentage']
+        if options['maximum_annotations'] is not None:
+            project.maximum_annotations = options['maximum_annotations']
+
+        tasks = project.tasks.count()
+        self.stdout.write(
+            f'Project {project.id} on {connection.vendor}: {tasks} tasks, maximum_annotations '
+            f'{project.maximum_annotations}, overlap_cohort_percentage {project.overlap_cohort_percentage}'
+        )
+        # a dry run must not overwrite the progress of real rearrangements shown in the UI
+        progress = nullcontext() if options['commit'] else mock.patch('projects.models.set_overlap_cohort_progress')
+        for run in range(options['repeat']):
+            with transaction.atomic(), progress:
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.time()
+                    project._rearrange_overlap_cohort()
+                    duration = time.time() - start
+                if not options['commit']:
+                    transaction.set_rollback(True)
+            logger.debug(f'Overlap cohort rearrangement of project {project.id} took {duration:.3f}s')
+            self.stdout.write(f'Run {run + 1}: {duration:.3f}s, {len(queries)} queries')
@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from projects.functions.counters import schedule_project_counters_reconcile
+from projects.models import ProjectCounters
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recalculate materialized project counters and fix the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='projects recalculated per batch')
+
+    def handle(self, *args, **options):
+        drifted = ProjectCounters.reconcile(batch_size=options['batch_size'])
+        logger.debug(f'Reconciled counters of {drifted} projects.')
+        self.stdout.write(f'Reconciled counters of {drifted} projects')
+        # the next runs are done by the periodic job
+        schedule_project_counters_reconcile()
@@ -0,0 +1,119 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+migration_name = '0033_projectcounters'
+
+
+def forwards(apps, schema_editor):
+    from tasks.functions import fill_project_counters
+
+    fill_project_counters(migration_name)
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0032_enhance_fileupload_model"),
+        ("tasks", "0058_taskaggregate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectCounters",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        help_text="Counted project",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counters",
+                        serialize=False,
+                        to="projects.project",
+                    ),
+                ),
+                (
+                    "task_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Total task number in project",
+                        verbose_name="task number",
+                    ),
+                ),
+                (
+                    "finished_task_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Finished tasks (is_labeled=True)",
+                        verbose_name="finished task number",
+                    ),
+                ),
+                (
+                    "total_predictions_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Total predictions number in project",
+                        verbose_name="total predictions number",
+                    ),
+                ),
+                (
+                    "total_annotations_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Total annotations number in project except skipped",
+                        verbose_name="total annotations number",
+                    ),
+                ),
+                (
+                    "num_tasks_with_annotations",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Tasks with useful annotations",
+                        verbose_name="tasks with annotations number",
+                    ),
+                ),
+                (
+                    "useful_annotation_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Annotations that are not skipped, not ground truth and have a result",
+                        verbose_name="useful annotation number",
+                    ),
+                ),
+                (
+                    "ground_truth_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Honeypot annotation number in project",
+                        verbose_name="ground truth number",
+                    ),
+                ),
+                (
+                    "skipped_annotations_number",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Skipped by collaborators annotation number in project",
+                        verbose_name="skipped annotations number",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Last time counters were updated",
+                        verbose_name="updated at",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "project_counters",
+            },
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING, Mapping, Optional
 from core.redis import start_job_async_or_sync
 from django.db.models import QuerySet
 from django.utils.functional import cached_property
+from projects.functions.overlap_cohort import QUEUED, set_overlap_cohort_progress
 from projects.functions.utils import get_unique_ids_list
 
 if TYPE_CHECKING:
@@ -12,8 +13,10 @@ if TYPE_CHECKING:
 class ProjectMixin:
     def rearrange_overlap_cohort(self):
         """
-        Async start rearrange overlap depending on annotation count in tasks
+        Async start rearrange overlap depending on annotation count in tasks,
+        progress is available with projects.functions.overlap_cohort.get_overlap_cohort_progress
         """
+        set_overlap_cohort_progress(self.id, QUEUED)
         start_job_async_or_sync(self._rearrange_overlap_cohort)
 
     def update_tasks_counters_and_is_labeled(self, tasks_queryset, from_scratch=True):
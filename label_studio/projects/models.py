@@ -2,6 +2,7 @@
 
 import json
 import logging
+import time
 from typing import Any, Mapping, Optional
 
 from annoying.fields import AutoOneToOneField
@@ -21,6 +22,8 @@ from core.label_config import (
 )
 from core.services.audit_log_service import AuditLogService
 from core.utils.common import (
+    batch,
+    batched_iterator,
     create_hash,
     get_attr_or_item,
     load_func,
@@ -30,9 +33,11 @@ from core.utils.db import batch_update_with_retry, fast_first
 from django.conf import settings
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 from django.db import models, transaction
-from django.db.models import Avg, BooleanField, Case, Count, JSONField, Max, Q, Sum, Value, When
+from django.db.models import Avg, BooleanField, Case, Count, F, JSONField, Max, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from label_studio_sdk._extensions.label_studio_tools.core.label_config import parse_config
@@ -47,6 +52,7 @@ from projects.functions import (
     annotate_total_predictions_number,
     annotate_useful_annotation_number,
 )
+from projects.functions.overlap_cohort import COMPLETED, FAILED, RUNNING, set_overlap_cohort_progress
 from projects.functions.utils import make_queryset_from_iterable
 from projects.signals import ProjectSignals
 from rest_framework.exceptions import ValidationError
@@ -93,15 +99,22 @@ class ProjectManager(models.Manager):
         return self.with_counts_annotate(self, fields=fields)
 
     @staticmethod
-    def with_counts_annotate(queryset, fields=None):
+    def with_counts_annotate(queryset, fields=None, materialized=None):
+        """Annotate projects with counters, read from ProjectCounters when materialized (by default
+        PROJECT_COUNTERS_MATERIALIZED) or counted with subqueries over tasks and annotations otherwise"""
+        if materialized is None:
+            materialized = settings.PROJECT_COUNTERS_MATERIALIZED
         available_fields = ProjectManager.ANNOTATED_FIELDS
         if fields is None:
             to_annotate = available_fields
         else:
             to_annotate = {field: available_fields[field] for field in fields if field in available_fields}
 
-        for _, annotate_func in to_annotate.items():  # noqa: F402
-            queryset = annotate_func(queryset)
+        for field, annotate_func in to_annotate.items():  # noqa: F402
+            if materialized and field in ProjectManager.COUNTER_FIELDS:
+                queryset = queryset.annotate(**{field: F(f'counters__{field}')})
+            else:
+                queryset = annotate_func(queryset)
 
         return queryset
 
@@ -458,50 +471,74 @@ class Project(ProjectMixin, models.Model):
     def _batch_update_with_retry(self, queryset, batch_size=500, max_retries=3, **update_fields):
         batch_update_with_retry(queryset, batch_size, max_retries, **update_fields)
 
+    def get_overlap_cohort_queryset(self, tasks_count=None):
+        """
+        Tasks of the overlap cohort (the ones that get maximum_annotations overlap) as a subquery:
+        tasks already finished with maximum_annotations come first, then the others ranked by annotation count
+        """
+        max_annotations = self.maximum_annotations
+        all_project_tasks = Task.objects.filter(project=self)
+        # values('id') keeps GROUP BY on the task id only
+        ranked_tasks = (
+            all_project_tasks.values('id')
+            .annotate(
+                anno=Count('annotations', filter=Q_task_finished_annotations & Q(annotations__ground_truth=False)),
+                anno_all=Count('annotations'),
+            )
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    order_by=[
+                        Case(When(anno__gte=max_annotations, then=Value(1)), default=Value(0)).desc(),
+                        F('anno_all').desc(),
+                        F('id').asc(),
+                    ],
+                )
+            )
+        )
+        if tasks_count is None:
+            tasks_count = all_project_tasks.count()
+        tasks_with_max_annotations_count = ranked_tasks.filter(anno__gte=max_annotations).count()
+        must_tasks = int(tasks_count * self.overlap_cohort_percentage / 100 + 0.5)
+        # tasks with max annotations always stay in the cohort, even if there are more of them than required
+        cohort_size = max(must_tasks, tasks_with_max_annotations_count)
+        return ranked_tasks.filter(rank__lte=cohort_size).values('id')
+
     def _rearrange_overlap_cohort(self):
         """
-        Rearrange overlap depending on annotation count in tasks
+        Rearrange overlap depending on annotation count in tasks.
+        The cohort is ranked in SQL and overlap is assigned with two UPDATE statements,
+        only tasks with a changed overlap are written.
         """
         all_project_tasks = Task.objects.filter(project=self)
         max_annotations = self.maximum_annotations
-        must_tasks = int(self.tasks.count() * self.overlap_cohort_percentage / 100 + 0.5)
         logger.info(
             f'Starting _rearrange_overlap_cohort with params: Project {str(self)} maximum_annotations '
             f'{max_annotations} and percentage {self.overlap_cohort_percentage}'
         )
-        tasks_with_max_annotations = all_project_tasks.annotate(
-            anno=Count('annotations', filter=Q_task_finished_annotations & Q(annotations__ground_truth=False))
-        ).filter(anno__gte=max_annotations)
-
-        tasks_with_min_annotations = all_project_tasks.exclude(id__in=tasks_with_max_annotations)
-        # check how many tasks left to finish
-        left_must_tasks = max(must_tasks - tasks_with_max_annotations.count(), 0)
-        logger.info(f'Required tasks {must_tasks} and left required tasks {left_must_tasks}')
-        if left_must_tasks > 0:
-            # if there are unfinished tasks update tasks with count(annotations) >= overlap
-            ids = list(tasks_with_max_annotations.values_list('id', flat=True))
-            self._batch_update_with_retry(
-                all_project_tasks.filter(id__in=ids), overlap=max_annotations, is_labeled=True
-            )
-            # order other tasks by count(annotations)
-            tasks_with_min_annotations = (
-                tasks_with_min_annotations.annotate(anno=Count('annotations')).order_by('-anno').distinct()
-            )
-            # assign overlap depending on annotation count
-            # assign max_annotations and update is_labeled
-            ids = list(tasks_with_min_annotations[:left_must_tasks].values_list('id', flat=True))
-            self._batch_update_with_retry(all_project_tasks.filter(id__in=ids), overlap=max_annotations)
-            # assign 1 to left
-            ids = list(tasks_with_min_annotations[left_must_tasks:].values_list('id', flat=True))
-            min_tasks_to_update = all_project_tasks.filter(id__in=ids)
-            self._batch_update_with_retry(min_tasks_to_update, overlap=1)
-        else:
-            ids = list(tasks_with_max_annotations.values_list('id', flat=True))
-            self._batch_update_with_retry(all_project_tasks.filter(id__in=ids), overlap=max_annotations)
-            ids = list(tasks_with_min_annotations.values_list('id', flat=True))
-            self._batch_update_with_retry(all_project_tasks.filter(id__in=ids), overlap=1)
-        # update is labeled after tasks rearrange overlap
-        bulk_update_stats_project_tasks(all_project_tasks, project=self)
+        start = time.time()
+        tasks_count = all_project_tasks.count()
+        set_overlap_cohort_progress(self.id, RUNNING, stage='ranking', tasks=tasks_count)
+        try:
+            cohort = self.get_overlap_cohort_queryset(tasks_count=tasks_count)
+
+            set_overlap_cohort_progress(self.id, RUNNING, stage='overlap')
+            with transaction.atomic():
+                in_cohort = all_project_tasks.filter(id__in=cohort).exclude(overlap=max_annotations)
+                updated = in_cohort.update(overlap=max_annotations)
+                updated += all_project_tasks.exclude(id__in=cohort).exclude(overlap=1).update(overlap=1)
+            logger.info(f'Project {str(self)}: overlap changed for {updated} tasks')
+
+            # update is labeled after tasks rearrange overlap
+            set_overlap_cohort_progress(self.id, RUNNING, stage='is_labeled', updated_tasks=updated)
+            bulk_update_stats_project_tasks(all_project_tasks, project=self)
+
+            set_overlap_cohort_progress(self.id, RUNNING, stage='counters')
+            ProjectCounters.recalculate([self.id])
+        except Exception as exc:
+            set_overlap_cohort_progress(self.id, FAILED, error=str(exc))
+            raise
+        set_overlap_cohort_progress(self.id, COMPLETED, duration=round(time.time() - start, 3))
 
     def remove_tasks_by_file_uploads(self, file_upload_ids):
         self.tasks.filter(file_upload_id__in=file_upload_ids).delete()
@@ -1019,6 +1056,13 @@ class Project(ProjectMixin, models.Model):
 
         return storage_objects
 
+    @cached_property
+    def import_storage_router(self):
+        """Router from storage URLs to import storages, see io_storages.url_router"""
+        from io_storages.url_router import get_project_storage_router
+
+        return get_project_storage_router(self)
+
     @cached_property
     def get_all_export_storage_objects(self):
         from io_storages.models import get_storage_classes
@@ -1046,13 +1090,13 @@ class Project(ProjectMixin, models.Model):
 
     def resolve_storage_uri(self, url: str) -> Optional[Mapping[str, Any]]:
         from io_storages.functions import get_storage_by_url
+        from io_storages.uri_cache import generate_http_url_cached
 
-        storage_objects = self.get_all_import_storage_objects
-        storage = get_storage_by_url(url, storage_objects)
+        storage = get_storage_by_url(url, self.import_storage_router)
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': generate_http_url_cached(storage, url),
                 'presign_ttl': storage.presign_ttl,
             }
 
@@ -1073,9 +1117,10 @@ class Project(ProjectMixin, models.Model):
                 # If counters are updated, is_labeled must be updated as well. Hence, if either fails, we
                 # will roll back.
                 queryset = make_queryset_from_iterable(task_ids_slice)
-                num_tasks_updated += update_tasks_counters(queryset, from_scratch)
+                num_tasks_updated += update_tasks_counters(queryset, from_scratch, recalculate_project_counters=False)
                 bulk_update_stats_project_tasks(queryset, self)
             page_idx += 1
+        ProjectCounters.recalculate([self.id])
         return num_tasks_updated
 
     def _update_tasks_counters_and_task_states(
@@ -1427,6 +1472,95 @@ class ProjectSummary(models.Model):
         self.save(update_fields=['created_labels_drafts'])
 
 
+class ProjectCounters(models.Model):
+    """Materialized ProjectManager.COUNTER_FIELDS of a project, so project lists don't count tasks and annotations.
+
+    Single task, annotation and prediction writes apply deltas in the same transaction (see tasks.models),
+    bulk paths apply the changes of the task counters they recount or recalculate the affected projects,
+    and reconcile() fixes any remaining drift periodically (see projects.functions.counters).
+    """
+
+    project = models.OneToOneField(
+        Project, primary_key=True, on_delete=models.CASCADE, related_name='counters', help_text='Counted project'
+    )
+    task_number = models.IntegerField(_('task number'), default=0, help_text='Total task number in project')
+    finished_task_number = models.IntegerField(
+        _('finished task number'), default=0, help_text='Finished tasks (is_labeled=True)'
+    )
+    total_predictions_number = models.IntegerField(
+        _('total predictions number'), default=0, help_text='Total predictions number in project'
+    )
+    total_annotations_number = models.IntegerField(
+        _('total annotations number'), default=0, help_text='Total annotations number in project except skipped'
+    )
+    num_tasks_with_annotations = models.IntegerField(
+        _('tasks with annotations number'), default=0, help_text='Tasks with useful annotations'
+    )
+    useful_annotation_number = models.IntegerField(
+        _('useful annotation number'),
+        default=0,
+        help_text='Annotations that are not skipped, not ground truth and have a result',
+    )
+    ground_truth_number = models.IntegerField(
+        _('ground truth number'), default=0, help_text='Honeypot annotation number in project'
+    )
+    skipped_annotations_number = models.IntegerField(
+        _('skipped annotations number'), default=0, help_text='Skipped by collaborators annotation number in project'
+    )
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text='Last time counters were updated')
+
+    class Meta:
+        db_table = 'project_counters'
+
+    @classmethod
+    def increase(cls, project_id, **deltas):
+        """Add deltas to counters of the project, e.g. increase(1, task_number=1, finished_task_number=-1)"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not project_id or not deltas:
+            return
+        # projects without a counters row (e.g. being deleted) are left to reconcile()
+        cls.objects.filter(project_id=project_id).update(
+            updated_at=timezone.now(), **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+    @classmethod
+    def recalculate(cls, project_ids) -> int:
+        """Count counters of the projects from scratch. Returns the number of projects whose counters changed."""
+        fields = ProjectManager.COUNTER_FIELDS
+        changed = 0
+        for ids in batch(list(project_ids), settings.BATCH_SIZE):
+            with transaction.atomic():
+                # lock existing rows, so deltas of concurrent writes wait for the new values
+                current = {
+                    row.pop('project_id'): row
+                    for row in cls.objects.select_for_update().filter(project_id__in=ids).values('project_id', *fields)
+                }
+                projects = ProjectManager.with_counts_annotate(
+                    Project.objects.filter(id__in=ids), fields=fields, materialized=False
+                ).values('id', *fields)
+                counters = []
+                for row in projects:
+                    project_id = row.pop('id')
+                    changed += current.get(project_id) != row
+                    counters.append(cls(project_id=project_id, **row))
+                cls.objects.bulk_create(
+                    counters, update_conflicts=True, unique_fields=['project'], update_fields=[*fields, 'updated_at']
+                )
+        return changed
+
+    @classmethod
+    def reconcile(cls, batch_size=None) -> int:
+        """Recalculate counters of all projects. Returns the number of projects whose counters had drifted."""
+        batch_size = batch_size or settings.BATCH_SIZE
+        project_ids = Project.objects.order_by('id').values_list('id', flat=True)
+        drifted = 0
+        for ids in batched_iterator(project_ids.iterator(chunk_size=batch_size), batch_size):
+            drifted += cls.recalculate(ids)
+        if drifted:
+            logger.warning(f'Reconciled counters of {drifted} projects')
+        return drifted
+
+
 class ProjectImport(models.Model):
     class Status(models.TextChoices):
         CREATED = 'created', _('Created')
@@ -1489,6 +1623,7 @@ class ProjectReimport(models.Model):
 def create_project(sender, instance, **kwargs):
     user = User.objects.get(id=instance.created_by_id)
     if kwargs.get('created'):
+        ProjectCounters.objects.get_or_create(project=instance)
         AuditLogService.create(
             user=user, action='User #{} "{}" created project #{}'.format(user.id, user.email, instance.id)
         )
@@ -23,6 +23,12 @@ _api_urlpatterns = [
     path('<int:pk>/next/', api.ProjectNextTaskAPI.as_view(), name='project-next'),
     # Label stream history
     path('<int:pk>/label-stream-history/', api.LabelStreamHistoryAPI.as_view(), name='label-stream-history'),
+    # Progress of the overlap cohort rearrangement
+    path(
+        '<int:pk>/overlap-cohort/',
+        api.ProjectOverlapCohortProgressAPI.as_view(),
+        name='project-overlap-cohort-progress',
+    ),
     # Validate label config in general
     path('validate/', api.LabelConfigValidateAPI.as_view(), name='label-config-validate'),
     # Validate label config for project
@@ -3,19 +3,22 @@ import logging
 import os
 import shutil
 import sys
+from collections import Counter, defaultdict
 
 from core.models import AsyncMigrationStatus
-from core.redis import start_job_async_or_sync
+from core.redis import redis_connected, start_job_async_or_sync
 from core.utils.common import batch, batched_iterator
 from data_export.mixins import ExportMixin
 from data_export.models import DataExport
 from data_export.serializers import ExportDataSerializer
 from data_manager.managers import TaskQuerySet
+from data_manager.totals import bump_tasks_totals_version
 from django.conf import settings
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
 from organizations.models import Organization
-from projects.models import Project
-from tasks.models import Annotation, Prediction, Task
+from projects.functions.counters import schedule_project_counters_reconcile
+from projects.models import Project, ProjectCounters
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
 
 logger = logging.getLogger(__name__)
 
@@ -112,10 +115,12 @@ def export_project(project_id, export_format, path, serializer_context=None):
         serializer_context = json.loads(serializer_context)
     serializer_options = ExportMixin._get_export_serializer_option(serializer_context)
 
-    # export cycle
-    tasks = []
-    for _task_ids in batch(task_ids, 1000):
-        tasks += ExportDataSerializer(_task_ids, many=True, **serializer_options).data
+    # export cycle: tasks are serialized batch by batch while they are written to the export file
+    def iter_serialized_tasks():
+        for _task_ids in batch(task_ids, 1000):
+            yield from ExportDataSerializer(_task_ids, many=True, **serializer_options).data
+
+    tasks = iter_serialized_tasks()
 
     # convert to output format
     export_file, _, filename = DataExport.generate_export_file(
@@ -172,11 +177,13 @@ def fill_predictions_project(migration_name):
     logger.info('Finished filling project field for Prediction model')
 
 
-def update_tasks_counters(queryset, from_scratch=True):
+def update_tasks_counters(queryset, from_scratch=True, recalculate_project_counters=True):
     """
     Update tasks counters for the passed queryset of Tasks
     :param queryset: Tasks to update queryset
     :param from_scratch: Skip calculated tasks
+    :param recalculate_project_counters: Recalculate counters of the affected projects (ProjectCounters) from scratch,
+        otherwise apply to them the changes of annotation and prediction counters of the passed tasks
     :return: Count of updated tasks
     """
     total_annotations = Count('annotations', distinct=True, filter=Q(annotations__was_cancelled=False))
@@ -189,15 +196,41 @@ def update_tasks_counters(queryset, from_scratch=True):
     if isinstance(queryset, TaskQuerySet) and queryset.exists() and isinstance(queryset[0], int):
         queryset = Task.objects.filter(id__in=queryset)
 
+    project_ids = list(
+        Task.objects.filter(id__in=queryset.values('id')).order_by().values_list('project_id', flat=True).distinct()
+    )
+    # counters change, so cached Data Manager totals of the affected projects are stale
+    if redis_connected():
+        for project_id in project_ids:
+            bump_tasks_totals_version(project_id)
+
+    # Data Manager aggregates are refreshed along with counters, bulk writes don't send signals
+    aggregates_queryset = queryset if from_scratch else queryset.filter(aggregate__isnull=True)
+    update_task_aggregates(aggregates_queryset.values_list('id', flat=True).iterator(chunk_size=settings.BATCH_SIZE))
+
     if not from_scratch:
         queryset = queryset.exclude(
             Q(total_annotations__gt=0) | Q(cancelled_annotations__gt=0) | Q(total_predictions__gt=0)
         )
 
+    # project counters deltas are the differences between the recounted and the stored task counters
+    project_counters_deltas = defaultdict(Counter)
+
     # filter our tasks with 0 annotations and 0 predictions and update them with 0
-    queryset.filter(annotations__isnull=True, predictions__isnull=True).update(
-        total_annotations=0, cancelled_annotations=0, total_predictions=0
-    )
+    empty_queryset = queryset.filter(annotations__isnull=True, predictions__isnull=True)
+    if not recalculate_project_counters:
+        emptied = (
+            empty_queryset.order_by()
+            .values('project_id')
+            .annotate(
+                total_annotations_number=Sum('total_annotations'),
+                skipped_annotations_number=Sum('cancelled_annotations'),
+                total_predictions_number=Sum('total_predictions'),
+            )
+        )
+        for row in emptied:
+            project_counters_deltas[row.pop('project_id')].subtract(row)
+    empty_queryset.update(total_annotations=0, cancelled_annotations=0, total_predictions=0)
 
     # filter our tasks with 0 annotations and 0 predictions
     queryset = queryset.filter(Q(annotations__isnull=False) | Q(predictions__isnull=False))
@@ -209,13 +242,17 @@ def update_tasks_counters(queryset, from_scratch=True):
 
     updated_count = 0
 
-    tasks_iterator = queryset.only('id', 'total_annotations', 'cancelled_annotations', 'total_predictions').iterator(
-        chunk_size=settings.BATCH_SIZE
-    )
+    tasks_iterator = queryset.only(
+        'id', 'project_id', 'total_annotations', 'cancelled_annotations', 'total_predictions'
+    ).iterator(chunk_size=settings.BATCH_SIZE)
 
     for _batch in batched_iterator(tasks_iterator, settings.BATCH_SIZE):
         batch_list = []
         for task in _batch:
+            deltas = project_counters_deltas[task.project_id]
+            deltas['total_annotations_number'] += task.new_total_annotations - task.total_annotations
+            deltas['skipped_annotations_number'] += task.new_cancelled_annotations - task.cancelled_annotations
+            deltas['total_predictions_number'] += task.new_total_predictions - task.total_predictions
             task.total_annotations = task.new_total_annotations
             task.cancelled_annotations = task.new_cancelled_annotations
             task.total_predictions = task.new_total_predictions
@@ -229,4 +266,115 @@ def update_tasks_counters(queryset, from_scratch=True):
             )
             updated_count += len(batch_list)
 
+    # bulk created or deleted tasks, annotations and predictions don't send signals
+    if recalculate_project_counters:
+        ProjectCounters.recalculate(project_ids)
+    else:
+        for project_id, deltas in project_counters_deltas.items():
+            ProjectCounters.increase(project_id, **deltas)
+    schedule_project_counters_reconcile()
+
     return updated_count
+
+
+def update_task_aggregates(task_ids):
+    """
+    Recalculate Data Manager aggregates (annotators, results, model versions, lead time) for the passed tasks
+    :param task_ids: Task ids, deleted tasks are skipped
+    :return: Count of updated tasks
+    """
+    updated_count = 0
+    for ids in batched_iterator(task_ids, settings.BATCH_SIZE):
+        aggregates = {
+            task_id: TaskAggregate(task_id=task_id)
+            for task_id in Task.objects.filter(id__in=ids).values_list('id', flat=True)
+        }
+        if not aggregates:
+            continue
+
+        lead_times = {}
+        annotations = (
+            Annotation.objects.filter(task_id__in=list(aggregates))
+            .order_by('id')
+            .values_list('task_id', 'id', 'completed_by_id', 'result', 'lead_time')
+        )
+        for task_id, annotation_id, completed_by_id, result, lead_time in annotations:
+            aggregate = aggregates[task_id]
+            aggregate.annotations_ids.append(annotation_id)
+            aggregate.annotations_results.append(result)
+            if completed_by_id is not None and completed_by_id not in aggregate.annotators:
+                aggregate.annotators.append(completed_by_id)
+            if lead_time is not None:
+                lead_times.setdefault(task_id, []).append(lead_time)
+
+        predictions = (
+            Prediction.objects.filter(task_id__in=list(aggregates))
+            .order_by('id')
+            .values_list('task_id', 'result', 'model_version')
+        )
+        for task_id, result, model_version in predictions:
+            aggregate = aggregates[task_id]
+            aggregate.predictions_results.append(result)
+            if model_version and model_version not in aggregate.predictions_model_versions:
+                aggregate.predictions_model_versions.append(model_version)
+
+        for task_id, aggregate in aggregates.items():
+            aggregate.annotators.sort()
+            if task_id in lead_times:
+                aggregate.avg_lead_time = sum(lead_times[task_id]) / len(lead_times[task_id])
+
+        TaskAggregate.objects.bulk_create(
+            aggregates.values(),
+            update_conflicts=True,
+            unique_fields=['task'],
+            update_fields=[
+                'annotators',
+                'annotations_ids',
+                'annotations_results',
+                'predictions_results',
+                'predictions_model_versions',
+                'avg_lead_time',
+                'updated_at',
+            ],
+        )
+        updated_count += len(aggregates)
+
+    return updated_count
+
+
+def _fill_task_aggregates(migration_name):
+    project_ids = Project.objects.all().values_list('id', flat=True)
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        task_ids = Task.objects.filter(project_id=project_id).values_list('id', flat=True)
+        updated_count = update_task_aggregates(task_ids.iterator(chunk_size=settings.BATCH_SIZE))
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.meta = {'tasks_processed': updated_count}
+        migration.save()
+
+
+def _fill_project_counters(migration_name):
+    migration = AsyncMigrationStatus.objects.create(name=migration_name, status=AsyncMigrationStatus.STATUS_STARTED)
+    drifted = ProjectCounters.reconcile()
+    migration.status = AsyncMigrationStatus.STATUS_FINISHED
+    migration.meta = {'projects_processed': Project.objects.count(), 'projects_changed': drifted}
+    migration.save()
+    schedule_project_counters_reconcile()
+
+
+def fill_project_counters(migration_name):
+    logger.info('Start filling materialized project counters')
+    start_job_async_or_sync(_fill_project_counters, migration_name=migration_name)
+    logger.info('Finished filling materialized project counters')
+
+
+def fill_task_aggregates(migration_name):
+    logger.info('Start filling Data Manager aggregates of tasks')
+    start_job_async_or_sync(_fill_task_aggregates, migration_name=migration_name)
+    logger.info('Finished filling Data Manager aggregates of tasks')
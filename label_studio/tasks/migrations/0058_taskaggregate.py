@@ -0,0 +1,108 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+migration_name = '0058_taskaggregate'
+
+
+def forwards(apps, schema_editor):
+    from tasks.functions import fill_task_aggregates
+
+    fill_task_aggregates(migration_name)
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0057_ocrcharacterextraction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskAggregate",
+            fields=[
+                (
+                    "task",
+                    models.OneToOneField(
+                        help_text="Aggregated task",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="aggregate",
+                        serialize=False,
+                        to="tasks.task",
+                    ),
+                ),
+                (
+                    "annotators",
+                    models.JSONField(
+                        default=list,
+                        help_text="Distinct ids of users who annotated the task",
+                        verbose_name="annotators",
+                    ),
+                ),
+                (
+                    "annotations_ids",
+                    models.JSONField(
+                        default=list,
+                        help_text="Ids of task annotations",
+                        verbose_name="annotations ids",
+                    ),
+                ),
+                (
+                    "annotations_results",
+                    models.JSONField(
+                        default=list,
+                        help_text="Results of task annotations",
+                        verbose_name="annotations results",
+                    ),
+                ),
+                (
+                    "predictions_results",
+                    models.JSONField(
+                        default=list,
+                        help_text="Results of task predictions",
+                        verbose_name="predictions results",
+                    ),
+                ),
+                (
+                    "predictions_model_versions",
+                    models.JSONField(
+                        default=list,
+                        help_text="Distinct model versions of task predictions",
+                        verbose_name="predictions model versions",
+                    ),
+                ),
+                (
+                    "avg_lead_time",
+                    models.FloatField(
+                        default=None,
+                        help_text="Average lead time of task annotations",
+                        null=True,
+                        verbose_name="average lead time",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Last time aggregates were updated",
+                        verbose_name="updated at",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "task_aggregate",
+                "indexes": [
+                    models.Index(
+                        fields=["avg_lead_time"], name="task_aggreg_avg_lea_ddef56_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,41 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# Data Manager "contains" filters on these columns are served with the jsonb @> operator
+INDEXES = {
+    'task_aggregate_annotators_gin_idx': 'annotators',
+    'task_aggregate_annotations_ids_gin_idx': 'annotations_ids',
+}
+
+
+def forwards(apps, schema_editor):
+    if not schema_editor.connection.vendor.startswith('postgres'):
+        logger.info('Database vendor: {}'.format(schema_editor.connection.vendor))
+        logger.info('Skipping migration without attempting to CREATE INDEX')
+        return
+
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'create index concurrently if not exists {name} on task_aggregate using gin ({column} jsonb_path_ops);'
+        )
+
+
+def backwards(apps, schema_editor):
+    if not schema_editor.connection.vendor.startswith('postgres'):
+        logger.info('Database vendor: {}'.format(schema_editor.connection.vendor))
+        logger.info('Skipping migration without attempting to DROP INDEX')
+        return
+
+    for name in INDEXES:
+        schema_editor.execute(f'drop index concurrently if exists {name};')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [('tasks', '0058_taskaggregate')]
+
+    operations = [migrations.RunPython(forwards, backwards)]
@@ -29,7 +29,7 @@ from data_import.models import FileUpload
 from data_manager.managers import PreparedTaskManager, TaskManager
 from django.conf import settings
 from django.db import OperationalError, models, transaction
-from django.db.models import CheckConstraint, F, JSONField, Q
+from django.db.models import CheckConstraint, Count, F, JSONField, Q
 from django.db.models.lookups import GreaterThanOrEqual
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
@@ -452,19 +452,38 @@ class Task(TaskMixin, models.Model):
 
     def resolve_storage_uri(self, url) -> Optional[Mapping[str, Any]]:
         from io_storages.functions import get_storage_by_url
+        from io_storages.uri_cache import generate_http_url_cached
 
         # Instead of using self.storage, we check all storage objects for the project to
         # support imported tasks that point to another bucket
-        storage_objects = self.project.get_all_import_storage_objects
-        storage = get_storage_by_url(url, storage_objects)
+        storage = get_storage_by_url(url, self.project.import_storage_router)
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': generate_http_url_cached(storage, url),
                 'presign_ttl': storage.presign_ttl,
             }
 
-    def resolve_uri(self, task_data, project):
+    @classmethod
+    def get_upload_urls(cls, tasks_data, project) -> Mapping[str, str]:
+        """URLs of the files uploaded to the project that are referenced in the data of tasks, in one query"""
+        if not settings.CLOUD_FILE_STORAGE_ENABLED:
+            return {}
+        filenames = set()
+        for task_data in tasks_data:
+            for value in task_data.values():
+                filename = cls.prepare_filename(value)
+                if cls.is_upload_file(filename):
+                    filenames.add(filename)
+        if not filenames:
+            return {}
+        # permission check: resolve uploaded files to the project only
+        file_uploads = FileUpload.objects.filter(project=project, file__in=filenames)
+        return {file_upload.file.name: file_upload.url for file_upload in file_uploads}
+
+    def resolve_uri(self, task_data, project, upload_urls=None):
+        """Resolve storage and uploaded file URLs in task data,
+        upload_urls from get_upload_urls() save the query when a page of tasks is resolved"""
         from io_storages.functions import get_storage_by_url
 
         if project.task_data_login and project.task_data_password:
@@ -480,17 +499,18 @@ class Task(TaskMixin, models.Model):
                 protected_data[key] = value
             return protected_data
         else:
-            storage_objects = project.get_all_import_storage_objects
+            storage_router = project.import_storage_router
+            task_storage = None
 
             # try resolve URLs via storage associated with that task
             for field in task_data:
                 # file saved in django file storage
                 prepared_filename = self.prepare_filename(task_data[field])
                 if settings.CLOUD_FILE_STORAGE_ENABLED and self.is_upload_file(prepared_filename):
-                    # permission check: resolve uploaded files to the project only
-                    file_upload = fast_first(FileUpload.objects.filter(project=project, file=prepared_filename))
-                    if file_upload is not None:
-                        task_data[field] = file_upload.url
+                    if upload_urls is None:
+                        upload_urls = self.get_upload_urls([task_data], project)
+                    if prepared_filename in upload_urls:
+                        task_data[field] = upload_urls[prepared_filename]
                     # it's very rare case, e.g. user tried to reimport exported file from another project
                     # or user wrote his django storage path manually
                     else:
@@ -501,7 +521,12 @@ class Task(TaskMixin, models.Model):
                 # TODO: to resolve nested lists and dicts we should improve get_storage_by_url(),
                 # Now always using get_storage_by_url to ensure the storage with the correct bucket is used
                 # As a last fallback we can use self.storage which is the storage the Task was imported from
-                storage = get_storage_by_url(task_data[field], storage_objects) or self.storage
+                storage = get_storage_by_url(task_data[field], storage_router)
+                if storage is None:
+                    # storage links aren't always prefetched, look the task storage up once per task
+                    if task_storage is None:
+                        task_storage = self.storage or False
+                    storage = task_storage
                 if storage:
                     try:
                         resolved_uri = storage.resolve_uri(task_data[field], self)
@@ -551,6 +576,14 @@ class Task(TaskMixin, models.Model):
     def ensure_unique_groundtruth(self, annotation_id):
         self.annotations.exclude(id=annotation_id).update(ground_truth=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # is_labeled as loaded, so is_labeled saves count finished tasks in the project counters without a SELECT
+        if 'is_labeled' in task.__dict__:
+            task._loaded_is_labeled = task.is_labeled
+        return task
+
     def save(self, *args, update_fields=None, **kwargs):
         if self.inner_id == 0:
             task = Task.objects.filter(project=self.project).order_by('-inner_id').first()
@@ -806,6 +839,7 @@ class Annotation(AnnotationMixin, models.Model):
         result = super().delete(*args, **kwargs)
         self.update_task()
         self.on_delete_update_counters()
+        refresh_task_aggregate(self.task_id)
         return result
 
     def on_delete_update_counters(self):
@@ -821,9 +855,16 @@ class Annotation(AnnotationMixin, models.Model):
             logger.debug(f'On delete updated total_annotations for task {task.id}')
 
         logger.debug(f'Update task stats for task={task}')
+        was_labeled = task.is_labeled
         task.update_is_labeled()
         Task.objects.filter(id=task.id).update(is_labeled=task.is_labeled)
 
+        counters = diff_project_counters(
+            {'finished_task_number': int(bool(task.is_labeled))},
+            dict(get_annotation_project_counters(self), finished_task_number=int(bool(was_labeled))),
+        )
+        increase_project_counters(task.project_id, **counters)
+
         # remove annotation counters in project summary followed by deleting an annotation
         logger.debug('Remove annotation counters in project summary followed by deleting an annotation')
         self.decrease_project_summary_counters()
@@ -847,6 +888,39 @@ class TaskLock(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time', null=True)
 
 
+class TaskAggregate(models.Model):
+    """Annotation and prediction aggregates of a task used by Data Manager columns, filters and ordering.
+
+    Maintained by tasks.functions.update_task_aggregates on annotation/prediction writes,
+    so Data Manager doesn't need to group annotations and predictions of the whole project.
+    """
+
+    task = models.OneToOneField(
+        'tasks.Task',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='aggregate',
+        help_text='Aggregated task',
+    )
+    annotators = JSONField(_('annotators'), default=list, help_text='Distinct ids of users who annotated the task')
+    annotations_ids = JSONField(_('annotations ids'), default=list, help_text='Ids of task annotations')
+    annotations_results = JSONField(_('annotations results'), default=list, help_text='Results of task annotations')
+    predictions_results = JSONField(_('predictions results'), default=list, help_text='Results of task predictions')
+    predictions_model_versions = JSONField(
+        _('predictions model versions'), default=list, help_text='Distinct model versions of task predictions'
+    )
+    avg_lead_time = models.FloatField(
+        _('average lead time'), null=True, default=None, help_text='Average lead time of task annotations'
+    )
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text='Last time aggregates were updated')
+
+    class Meta:
+        db_table = 'task_aggregate'
+        indexes = [
+            models.Index(fields=['avg_lead_time']),
+        ]
+
+
 class AnnotationDraft(models.Model):
     result = JSONField(_('result'), help_text='Draft result in JSON format')
     lead_time = models.FloatField(
@@ -1049,6 +1123,7 @@ class Prediction(models.Model):
         result = super().delete(*args, **kwargs)
         # set updated_at field of task to now()
         self.update_task()
+        refresh_task_aggregate(self.task_id)
         return result
 
     @classmethod
@@ -1267,6 +1342,9 @@ def update_all_task_states_after_deleting_task(sender, instance, **kwargs):
 def remove_data_columns(sender, instance, **kwargs):
     """Reduce data column counters after removing task"""
     instance.decrease_project_summary_counters()
+    # annotations are removed by cascade without signals, predictions are handled on their own
+    counters = diff_project_counters({}, get_task_project_counters(instance))
+    increase_project_counters(instance.project_id, **counters)
 
 
 def _task_data_is_not_updated(update_fields):
@@ -1274,17 +1352,26 @@ def _task_data_is_not_updated(update_fields):
         return True
 
 
+def _get_is_labeled_before(task):
+    """is_labeled of the task in the database, read only when the task was loaded without it"""
+    if '_loaded_is_labeled' in task.__dict__:
+        return task._loaded_is_labeled
+    return Task.objects.filter(id=task.id).values_list('is_labeled', flat=True).first()
+
+
 @receiver(pre_save, sender=Task)
 def delete_project_summary_data_columns_before_updating_task(sender, instance, update_fields, **kwargs):
     """Before updating task fields - ensure previous info removed from project.summary"""
     if _task_data_is_not_updated(update_fields):
         # we don't need to update counters when other than task.data fields are updated
+        instance._is_labeled_before = _get_is_labeled_before(instance)
         return
     try:
         old_task = sender.objects.get(id=instance.id)
     except Task.DoesNotExist:
         # task just created - do nothing
         return
+    instance._is_labeled_before = old_task.is_labeled
     old_task.decrease_project_summary_counters()
 
 
@@ -1297,6 +1384,22 @@ def update_project_summary_data_columns(sender, instance, created, update_fields
     instance.increase_project_summary_counters()
 
 
+@receiver(post_save, sender=Task)
+def update_project_counters_after_saving_task(sender, instance, created, update_fields, **kwargs):
+    """Count a new task, or a finished state change, in the project counters"""
+    is_labeled_before = instance.__dict__.pop('_is_labeled_before', None)
+    if created:
+        increase_project_counters(
+            instance.project_id, task_number=1, finished_task_number=int(bool(instance.is_labeled))
+        )
+    elif is_labeled_before is not None and (update_fields is None or 'is_labeled' in update_fields):
+        increase_project_counters(
+            instance.project_id, finished_task_number=int(bool(instance.is_labeled)) - int(is_labeled_before)
+        )
+    if update_fields is None or 'is_labeled' in update_fields:
+        instance._loaded_is_labeled = instance.is_labeled
+
+
 @receiver(pre_save, sender=Annotation)
 def delete_project_summary_annotations_before_updating_annotation(sender, instance, **kwargs):
     """Before updating annotation fields - ensure previous info removed from project.summary"""
@@ -1306,6 +1409,7 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
         # annotation just created - do nothing
         return
     old_annotation.decrease_project_summary_counters()
+    instance._project_counters_before = get_annotation_project_counters(old_annotation)
 
     # update task counters if annotation changes it's was_cancelled status
     task = instance.task
@@ -1316,7 +1420,11 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
         else:
             task.cancelled_annotations = task.cancelled_annotations - 1
             task.total_annotations = task.total_annotations + 1
+        was_labeled = task.is_labeled
         task.update_is_labeled()
+        increase_project_counters(
+            task.project_id, finished_task_number=int(bool(task.is_labeled)) - int(bool(was_labeled))
+        )
 
         Task.objects.filter(id=instance.task.id).update(
             is_labeled=task.is_labeled,
@@ -1329,6 +1437,10 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
 def update_project_summary_annotations_and_is_labeled(sender, instance, created, **kwargs):
     """Update annotation counters in project summary"""
     instance.increase_project_summary_counters()
+    counters = diff_project_counters(
+        get_annotation_project_counters(instance), instance.__dict__.pop('_project_counters_before', {})
+    )
+    increase_project_counters(instance.task.project_id, **counters)
 
     # If annotation is changed, update task.is_labeled state
     logger.debug(f'Update task stats for task={instance.task}')
@@ -1344,14 +1456,17 @@ def update_project_summary_annotations_and_is_labeled(sender, instance, created,
 @receiver(pre_delete, sender=Prediction)
 def remove_predictions_from_project(sender, instance, **kwargs):
     """Remove predictions counters"""
+    increase_project_counters(instance.task.project_id, total_predictions_number=-1)
     instance.task.total_predictions = instance.task.predictions.all().count() - 1
     instance.task.save(update_fields=['total_predictions'])
     logger.debug(f'Updated total_predictions for {instance.task.id}.')
 
 
 @receiver(post_save, sender=Prediction)
-def save_predictions_to_project(sender, instance, **kwargs):
+def save_predictions_to_project(sender, instance, created, **kwargs):
     """Add predictions counters"""
+    if created:
+        increase_project_counters(instance.task.project_id, total_predictions_number=1)
     instance.task.total_predictions = instance.task.predictions.all().count()
     instance.task.save(update_fields=['total_predictions'])
     logger.debug(f'Updated total_predictions for {instance.task.id}.')
@@ -1360,6 +1475,74 @@ def save_predictions_to_project(sender, instance, **kwargs):
 # =========== END OF PROJECT SUMMARY UPDATES ===========
 
 
+# =========== PROJECT COUNTERS UPDATES ===========
+
+
+def increase_project_counters(project_id, **deltas):
+    """Apply deltas to the materialized project counters (projects.models.ProjectCounters)"""
+    from projects.models import ProjectCounters
+
+    ProjectCounters.increase(project_id, **deltas)
+
+
+def diff_project_counters(after, before):
+    return {field: after.get(field, 0) - before.get(field, 0) for field in set(after) | set(before)}
+
+
+def get_annotation_project_counters(annotation):
+    """Project counters a single annotation is counted in"""
+    useful = not annotation.was_cancelled and not annotation.ground_truth and annotation.result is not None
+    counters = {
+        'total_annotations_number': int(not annotation.was_cancelled),
+        'skipped_annotations_number': int(bool(annotation.was_cancelled)),
+        'ground_truth_number': int(bool(annotation.ground_truth)),
+        'useful_annotation_number': int(useful),
+        'num_tasks_with_annotations': 0,
+    }
+    # the task is counted once, by whichever of its useful annotations is the only one left
+    if useful:
+        counters['num_tasks_with_annotations'] = int(
+            not Annotation.objects.filter(Q_useful_annotations, task_id=annotation.task_id)
+            .exclude(id=annotation.id)
+            .exists()
+        )
+    return counters
+
+
+def get_task_project_counters(task):
+    """Project counters a task is counted in, together with its annotations"""
+    counters = task.annotations.aggregate(
+        total_annotations_number=Count('id', filter=Q(was_cancelled=False)),
+        skipped_annotations_number=Count('id', filter=Q(was_cancelled=True)),
+        ground_truth_number=Count('id', filter=Q(ground_truth=True)),
+        useful_annotation_number=Count('id', filter=Q_useful_annotations),
+    )
+    counters['num_tasks_with_annotations'] = int(counters['useful_annotation_number'] > 0)
+    counters['task_number'] = 1
+    counters['finished_task_number'] = int(bool(task.is_labeled))
+    return counters
+
+
+# =========== END OF PROJECT COUNTERS UPDATES ===========
+
+
+def refresh_task_aggregate(task_id):
+    """Refresh Data Manager aggregates of the task"""
+    from tasks.functions import update_task_aggregates
+
+    update_task_aggregates([task_id])
+
+
+@receiver(post_save, sender=Annotation)
+def update_task_aggregates_after_annotation(sender, instance, **kwargs):
+    refresh_task_aggregate(instance.task_id)
+
+
+@receiver(post_save, sender=Prediction)
+def update_task_aggregates_after_prediction(sender, instance, **kwargs):
+    refresh_task_aggregate(instance.task_id)
+
+
 @receiver(post_save, sender=Annotation)
 def delete_draft(sender, instance, **kwargs):
     task = instance.task
@@ -1419,14 +1602,16 @@ def bulk_update_stats_project_tasks(tasks, project=None):
     :return:
     """
     # recalc accuracy
-    if not tasks:
-        # break if tasks is empty
+    if not (tasks.exists() if isinstance(tasks, models.QuerySet) else tasks):
+        # break if tasks is empty, without fetching the whole queryset
         return
     # get project if it's not in params
     if project is None:
         project = tasks[0].project
 
     with transaction.atomic():
+        task_ids = tasks.values('id') if isinstance(tasks, models.QuerySet) else [task.id for task in tasks]
+        finished_before = Task.objects.filter(id__in=task_ids, is_labeled=True).count()
         use_overlap = project._can_use_overlap()
         # update filters if we can use overlap
         if use_overlap:
@@ -1458,6 +1643,11 @@ def bulk_update_stats_project_tasks(tasks, project=None):
                     batch_size=settings.BATCH_SIZE,
                 )
 
+        finished_after = Task.objects.filter(id__in=task_ids, is_labeled=True).count()
+        increase_project_counters(project.id, finished_task_number=finished_after - finished_before)
+
 
 Q_finished_annotations = Q(was_cancelled=False) & Q(result__isnull=False)
 Q_task_finished_annotations = Q(annotations__was_cancelled=False) & Q(annotations__result__isnull=False)
+# annotations counted in useful_annotation_number and num_tasks_with_annotations of a project
+Q_useful_annotations = Q(was_cancelled=False) & Q(ground_truth=False) & Q(result__isnull=False)
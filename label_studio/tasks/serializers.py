@@ -187,7 +187,8 @@ class BaseTaskSerializer(FlexFieldsModelSerializer):
         if project:
             # resolve uri for storage (s3/gcs/etc)
             if self.context.get('resolve_uri', False):
-                instance.data = instance.resolve_uri(instance.data, project)
+                upload_urls = self.context.get('upload_urls')
+                instance.data = instance.resolve_uri(instance.data, project, upload_urls=upload_urls)
 
             # resolve $undefined$ key in task data
             data = instance.data
@@ -1,11 +1,12 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import json
+from unittest import mock
 
 import pytest
 from projects.models import Project
 
-from ..utils import make_annotation, make_prediction, make_task, project_id  # noqa
+from ..utils import fake_redis, make_annotation, make_prediction, make_task, project_id  # noqa
 
 
 @pytest.mark.django_db
@@ -128,3 +129,220 @@ def test_views_total_counters(tasks_count, annotations_count, predictions_count,
     assert response_data['total'] == tasks_count, response_data
     assert response_data['total_annotations'] == tasks_count * annotations_count, response_data
     assert response_data['total_predictions'] == tasks_count * predictions_count, response_data
+
+
+@pytest.mark.django_db
+def test_task_aggregates_follow_annotation_and_prediction_writes(business_client, project_id):
+    from tasks.functions import update_tasks_counters
+    from tasks.models import Annotation, Prediction, TaskAggregate
+
+    project = Project.objects.get(pk=project_id)
+    task = make_task({'data': {'text': 'aaa'}}, project)
+    result = [{'from_name': 'my_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['pos']}}]
+    first = make_annotation({'result': result, 'lead_time': 2, 'completed_by': business_client.user}, task.id)
+    second = make_annotation({'result': [], 'lead_time': 4, 'completed_by': business_client.user}, task.id)
+    make_prediction({'result': result, 'model_version': 'v1'}, task.id)
+
+    aggregate = TaskAggregate.objects.get(task=task)
+    assert aggregate.annotators == [business_client.user.id]
+    assert aggregate.annotations_ids == [first.id, second.id]
+    assert aggregate.annotations_results == [result, []]
+    assert aggregate.predictions_results == [result]
+    assert aggregate.predictions_model_versions == ['v1']
+    assert aggregate.avg_lead_time == 3
+
+    second.delete()
+    aggregate.refresh_from_db()
+    assert aggregate.annotations_ids == [first.id]
+    assert aggregate.avg_lead_time == 2
+
+    # bulk writes don't send signals, aggregates are refreshed with the task counters
+    Annotation.objects.filter(task=task).delete()
+    Prediction.objects.bulk_create([Prediction(task=task, project=project, result=result, model_version='v2')])
+    update_tasks_counters(project.tasks.all())
+    aggregate.refresh_from_db()
+    assert aggregate.annotations_ids == []
+    assert aggregate.avg_lead_time is None
+    assert aggregate.predictions_model_versions == ['v1', 'v2']
+
+
+@pytest.mark.django_db
+def test_ordering_by_aggregates_without_group_by(business_client, project_id):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = Project.objects.get(pk=project_id)
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(3)]
+    for task, lead_times in zip(tasks, [(5, 7), (1,), ()]):
+        for lead_time in lead_times:
+            make_annotation({'result': [], 'lead_time': lead_time, 'completed_by': business_client.user}, task.id)
+
+    payload = {
+        'project': project_id,
+        'data': {
+            'ordering': ['tasks:avg_lead_time'],
+            'filters': {
+                'conjunction': 'and',
+                'items': [
+                    {
+                        'filter': 'filter:tasks:annotators',
+                        'operator': 'contains',
+                        'type': 'List',
+                        'value': business_client.user.id,
+                    }
+                ],
+            },
+        },
+    }
+    response = business_client.post('/api/dm/views/', data=json.dumps(payload), content_type='application/json')
+    view_id = response.json()['id']
+
+    with CaptureQueriesContext(connection) as queries:
+        response = business_client.get(f'/api/tasks?view={view_id}')
+
+    assert response.status_code == 200, response.content
+    # tasks with several annotations are listed once
+    assert [task['id'] for task in response.json()['tasks']] == [tasks[1].id, tasks[0].id]
+    assert [task['avg_lead_time'] for task in response.json()['tasks']] == [1, 6]
+    assert not [query for query in queries.captured_queries if 'GROUP BY' in query['sql']]
+
+
+def test_annotators_filter_uses_aggregate_index_on_postgresql(settings):
+    from data_manager.managers import add_annotators_filter
+    from data_manager.prepare_params import Filter, Operator
+    from django.db.models import Q
+
+    _filter = Filter(filter='filter:tasks:annotators', operator=Operator.CONTAINS, type='List', value=5)
+
+    settings.DJANGO_DB = settings.DJANGO_DB_POSTGRESQL
+    expressions = []
+    add_annotators_filter(_filter, expressions)
+    assert expressions == [Q(aggregate__annotators__contains=[5])]
+
+    settings.DATA_MANAGER_PRECOMPUTED_AGGREGATES = False
+    expressions = []
+    add_annotators_filter(_filter, expressions)
+    assert not isinstance(expressions[0], Q)
+
+
+@pytest.mark.django_db
+def test_filtered_totals_are_cached_until_tasks_change(business_client, project_id, fake_redis):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = Project.objects.get(pk=project_id)
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(3)]
+    make_annotation({'result': []}, tasks[0].id)
+    make_prediction({'result': []}, tasks[1].id)
+
+    payload = {
+        'project': project_id,
+        'data': {
+            'filters': {
+                'conjunction': 'and',
+                'items': [{'filter': 'filter:tasks:id', 'operator': 'less', 'type': 'Number', 'value': tasks[2].id}],
+            }
+        },
+    }
+    response = business_client.post('/api/dm/views/', data=json.dumps(payload), content_type='application/json')
+    view_id = response.json()['id']
+
+    response = business_client.get(f'/api/tasks?view={view_id}')
+    expected = {'total': 2, 'total_annotations': 1, 'total_predictions': 1}
+    assert {key: response.json()[key] for key in expected} == expected
+
+    with CaptureQueriesContext(connection) as queries:
+        response = business_client.get(f'/api/tasks?view={view_id}')
+    assert {key: response.json()[key] for key in expected} == expected
+    assert len(response.json()['tasks']) == 2
+    assert not [query for query in queries.captured_queries if 'COUNT(' in query['sql'].upper()]
+
+    # a new annotation drops the cached totals of the project
+    make_annotation({'result': []}, tasks[1].id)
+    response = business_client.get(f'/api/tasks?view={view_id}')
+    assert response.json()['total_annotations'] == 2
+
+
+@pytest.mark.django_db
+def test_unfiltered_totals_use_project_counters(business_client, project_id, fake_redis):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = Project.objects.get(pk=project_id)
+    for i in range(2):
+        task = make_task({'data': {'text': str(i)}}, project)
+        make_annotation({'result': []}, task.id)
+        make_prediction({'result': []}, task.id)
+    response = business_client.post(
+        '/api/dm/views/', data=json.dumps({'project': project_id}), content_type='application/json'
+    )
+    view_id = response.json()['id']
+
+    with CaptureQueriesContext(connection) as queries:
+        response = business_client.get(f'/api/tasks?view={view_id}')
+
+    assert response.status_code == 200, response.content
+    assert response.json()['total'] == 2
+    assert response.json()['total_annotations'] == 2
+    assert response.json()['total_predictions'] == 2
+    assert 'total_estimated' not in response.json()
+    # the totals come from the project counters row, tasks aren't counted or summed
+    totals = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql'].upper()]
+    totals += [query['sql'] for query in queries.captured_queries if 'SUM(' in query['sql'].upper()]
+    assert not totals, totals
+
+
+@pytest.mark.django_db
+def test_tasks_totals_exact_and_estimated(project_id, fake_redis, settings):
+    from data_manager.totals import get_tasks_totals
+    from tasks.models import Task
+
+    project = Project.objects.get(pk=project_id)
+    for i in range(4):
+        task = make_task({'data': {'text': str(i)}}, project)
+        make_annotation({'result': []}, task.id)
+    # counters of the tasks drift from the annotations, e.g. after a raw bulk update
+    Task.objects.filter(project=project).update(total_annotations=0)
+    queryset = Task.objects.filter(project=project)
+
+    assert get_tasks_totals(queryset, project_id, filtered=False, exact=True)['total_annotations'] == 4
+    assert get_tasks_totals(queryset, project_id, filtered=True)['total_annotations'] == 0
+
+    settings.TASK_API_ESTIMATED_COUNT = True
+    settings.TASK_API_ESTIMATED_COUNT_THRESHOLD = 1
+    with mock.patch('data_manager.totals.estimate_count', return_value=2):
+        totals = get_tasks_totals(queryset.filter(id__gt=0), project_id)
+        assert totals == {
+            'total': 2,
+            'total_annotations': 2,
+            'total_predictions': 0,
+            'estimated': ['total', 'total_annotations', 'total_predictions'],
+        }
+        # exact totals are never estimated
+        assert get_tasks_totals(queryset.filter(id__gt=0), project_id, exact=True)['total'] == 4
+
+
+@pytest.mark.django_db
+def test_tasks_api_resolves_uploaded_files_in_one_query(business_client, project_id, settings):
+    from data_import.models import FileUpload
+    from django.core.files.base import ContentFile
+    from tasks.models import Task
+
+    settings.CLOUD_FILE_STORAGE_ENABLED = True
+    project = Project.objects.get(pk=project_id)
+    file_uploads = [
+        FileUpload.objects.create(user=project.created_by, project=project, file=ContentFile('', name=f'{i}.jpg'))
+        for i in range(3)
+    ]
+    for file_upload in file_uploads:
+        make_task({'data': {'image': settings.MEDIA_URL + file_upload.file.name, 'text': 'aaa'}}, project)
+    make_task({'data': {'image': settings.MEDIA_URL + settings.UPLOAD_DIR + '/other/missing.jpg'}}, project)
+
+    with mock.patch.object(Task, 'get_upload_urls', wraps=Task.get_upload_urls) as get_upload_urls:
+        response = business_client.get(f'/api/tasks?project={project_id}')
+
+    assert response.status_code == 200, response.content
+    get_upload_urls.assert_called_once()
+    images = [task['data']['image'] for task in response.json()['tasks']]
+    assert images[:3] == [file_upload.url for file_upload in file_uploads]
+    assert images[3].endswith('?not_uploaded_project_file')
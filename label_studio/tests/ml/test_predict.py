@@ -1,8 +1,10 @@
 import json
 
 import pytest
+from ml.models import MLBackend, MLBackendPredictionJobStatus
+from tasks.models import Prediction, Task
 
-from label_studio.tests.utils import make_project, make_task
+from label_studio.tests.utils import make_project, make_task, register_ml_backend_mock
 
 
 @pytest.mark.django_db
@@ -89,3 +91,104 @@ def test_get_multiple_predictions_on_task(business_client, ml_backend_for_test_p
     assert payload['predictions'][0]['model_version'] == 'ModelA'
     assert payload['predictions'][1]['result'][0]['value']['choices'][0] == 'label_B'
     assert payload['predictions'][1]['model_version'] == 'ModelB'
+
+
+def _register_chunked_ml_backend(ml_backend, url, fail_task_id=None):
+    """Mock an ML backend answering one prediction per task, failing on chunks with fail_task_id"""
+    register_ml_backend_mock(ml_backend, url=url, setup_model_version='ModelChunked')
+    requested = []
+
+    def predict(request, context):
+        task_ids = [task['id'] for task in request.json()['tasks']]
+        requested.append(task_ids)
+        if fail_task_id in task_ids:
+            context.status_code = 500
+            return {'error': 'Server error'}
+        return {
+            'results': [
+                {'score': 0.5, 'result': [{'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {}}]}
+                for _ in task_ids
+            ]
+        }
+
+    ml_backend.post(f'{url}/predict', json=predict)
+    return requested
+
+
+@pytest.mark.django_db
+def test_predict_tasks_in_concurrent_chunks(business_client, ml_backend, settings):
+    settings.ML_PREDICTION_CHUNK_SIZE = 2
+    settings.ML_PREDICTION_MAX_WORKERS = 2
+    project = make_project(
+        config=dict(title='test_predict_tasks_in_concurrent_chunks'), user=business_client.user, use_ml_backend=False
+    )
+    tasks = [make_task({'data': {'text': f'test {i}'}}, project) for i in range(5)]
+    url = 'http://test.ml.backend.for.chunks.com:9094'
+    requested = _register_chunked_ml_backend(ml_backend, url)
+    backend = MLBackend.objects.create(project=project, url=url)
+
+    predictions = backend.predict_tasks(Task.objects.filter(project=project))
+
+    assert sorted(requested) == [[tasks[0].id, tasks[1].id], [tasks[2].id, tasks[3].id], [tasks[4].id]]
+    assert len(predictions) == 5
+    assert Prediction.objects.filter(project=project, model_version='ModelChunked').count() == 5
+    assert set(Task.objects.filter(project=project).values_list('total_predictions', flat=True)) == {1}
+    job = backend.prediction_jobs.get()
+    assert job.status == MLBackendPredictionJobStatus.COMPLETED
+    assert (job.total_tasks, job.processed_tasks, job.predictions_created) == (5, 5, 5)
+    assert job.progress == 1.0
+
+    # all tasks already have predictions of this model version
+    assert backend.predict_tasks(Task.objects.filter(project=project)) == 'ModelChunked'
+
+
+@pytest.mark.django_db
+def test_predict_tasks_resumes_failed_job(business_client, ml_backend, settings):
+    settings.ML_PREDICTION_CHUNK_SIZE = 2
+    settings.ML_PREDICTION_MAX_WORKERS = 2
+    project = make_project(
+        config=dict(title='test_predict_tasks_resumes_failed_job'), user=business_client.user, use_ml_backend=False
+    )
+    tasks = [make_task({'data': {'text': f'test {i}'}}, project) for i in range(5)]
+    url = 'http://test.ml.backend.for.chunks.com:9095'
+    _register_chunked_ml_backend(ml_backend, url, fail_task_id=tasks[2].id)
+    backend = MLBackend.objects.create(project=project, url=url)
+
+    backend.predict_tasks(Task.objects.filter(project=project))
+
+    job = backend.prediction_jobs.get()
+    assert job.status == MLBackendPredictionJobStatus.FAILED
+    assert (job.processed_tasks, job.last_task_id) == (2, tasks[1].id)
+    assert Prediction.objects.filter(project=project).count() == 2
+
+    requested = _register_chunked_ml_backend(ml_backend, url)
+    backend.predict_tasks(Task.objects.filter(project=project), job=job)
+
+    assert sorted(requested) == [[tasks[2].id, tasks[3].id], [tasks[4].id]]
+    job.refresh_from_db()
+    assert job.status == MLBackendPredictionJobStatus.COMPLETED
+    assert (job.total_tasks, job.processed_tasks, job.predictions_created) == (5, 5, 5)
+    assert Prediction.objects.filter(project=project).count() == 5
+
+
+@pytest.mark.django_db
+def test_predict_tasks_fails_job_on_exception(business_client, ml_backend, settings):
+    from unittest import mock
+
+    settings.ML_PREDICTION_CHUNK_SIZE = 2
+    project = make_project(
+        config=dict(title='test_predict_tasks_fails_job_on_exception'), user=business_client.user, use_ml_backend=False
+    )
+    for i in range(5):
+        make_task({'data': {'text': f'test {i}'}}, project)
+    url = 'http://test.ml.backend.for.chunks.com:9096'
+    _register_chunked_ml_backend(ml_backend, url)
+    backend = MLBackend.objects.create(project=project, url=url)
+
+    with mock.patch.object(MLBackend, '_save_predictions', side_effect=RuntimeError('Database is gone')):
+        with pytest.raises(RuntimeError):
+            backend.predict_tasks(Task.objects.filter(project=project))
+
+    job = backend.prediction_jobs.get()
+    assert job.status == MLBackendPredictionJobStatus.FAILED
+    assert job.error_message == 'Database is gone'
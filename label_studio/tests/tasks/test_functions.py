@@ -58,7 +58,11 @@ class TestExportProject:
 
         assert filepath == os.path.join(settings.EXPORT_DIR, 'project.json')
 
-        generate_export_file.assert_called_once_with(project, data, 'JSON', settings.CONVERTER_DOWNLOAD_RESOURCES, {})
+        generate_export_file.assert_called_once_with(
+            project, mocker.ANY, 'JSON', settings.CONVERTER_DOWNLOAD_RESOURCES, {}
+        )
+        # tasks are passed as a lazy iterable
+        assert list(generate_export_file.call_args.args[1]) == data
 
     def test_project_does_not_exist(self, mocker, generate_export_file):
         with mocker.patch('builtins.open'):
@@ -1,9 +1,15 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
 import json
+import os
+import tracemalloc
 
+import psutil
 import pytest
+from data_export.models import DataExport
 from django.apps import apps
+from django.db import connection
 from tasks.models import Annotation, Prediction, Task
 from tasks.serializers import AnnotationSerializer
 
@@ -318,3 +324,321 @@ def test_export_with_predictions(
             assert task['predictions'][0]['score'] == predictions['score']
         else:
             assert task['predictions'] == []
+
+
+@pytest.mark.django_db
+def test_export_api_streams_tasks_to_export_file(business_client, configured_project, settings, tmp_path):
+    settings.EXPORT_DIR = str(tmp_path)
+
+    r = business_client.get(
+        f'/api/projects/{configured_project.id}/export', data={'exportType': 'JSON', 'download_all_tasks': 'true'}
+    )
+
+    assert r.status_code == 200
+    exported = json.loads(b''.join(r.streaming_content))
+    assert sorted(task['id'] for task in exported) == sorted(configured_project.tasks.values_list('id', flat=True))
+    # the streamed file and its md5 are kept in the export dir
+    (info_file,) = tmp_path.glob('*-info.json')
+    info = json.loads(info_file.read_text())
+    with open(info['download']['result_filename'], 'rb') as f:
+        assert hashlib.md5(f.read()).hexdigest() == info['download']['md5']  # nosec
+    assert not list(tmp_path.glob('*.part'))
+
+
+def test_write_export_file_rss_benchmark(tmp_path):
+    """Streaming ~100 MB of serialized tasks must not grow the process RSS by the size of the export"""
+    task_number, payload = 20000, 'x' * 5000
+
+    def tasks():
+        for i in range(task_number):
+            yield {'id': i, 'data': {'text': payload}, 'annotations': []}
+
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    tracemalloc.start()
+    try:
+        with open(tmp_path / 'export.json', 'wb') as f:
+            md5 = DataExport.write_export_file(tasks(), f)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_growth = process.memory_info().rss - rss_before
+
+    export_size = os.path.getsize(tmp_path / 'export.json')
+    assert export_size > task_number * len(payload)
+    assert peak < 1024 * 1024
+    assert rss_growth < export_size / 4
+    with open(tmp_path / 'export.json', 'rb') as f:
+        assert hashlib.md5(f.read()).hexdigest() == md5  # nosec
+
+
+def _read_export(export):
+    with export.file.open('rb') as f:
+        return {task['id']: task for task in json.load(f)}
+
+
+@pytest.mark.django_db
+def test_delta_export_snapshots_and_materialize(business_client, configured_project):
+    from data_export.models import Export
+
+    url = f'/api/projects/{configured_project.id}/exports/'
+    r = business_client.post(url, data=json.dumps({'title': 'full'}), content_type='application/json')
+    assert r.status_code == 201
+    full = Export.objects.get(id=r.json()['id'])
+    assert full.status == Export.Status.COMPLETED
+    assert full.high_water_mark['task_id'] == configured_project.tasks.order_by('-id').first().id
+
+    tasks = list(configured_project.tasks.order_by('id'))
+    annotated, deleted = tasks[0], tasks[1]
+    Annotation.objects.create(task=annotated, project=configured_project, result=[], completed_by=business_client.user)
+    added = Task.objects.create(project=configured_project, data={'location': 'London', 'text': 'new'})
+
+    r = business_client.post(url, data=json.dumps({'snapshot_type': 'delta'}), content_type='application/json')
+    assert r.status_code == 201
+    assert r.json()['base_export'] == full.id
+    delta = Export.objects.get(id=r.json()['id'])
+    assert delta.status == Export.Status.COMPLETED
+    assert delta.file.name.endswith('-delta.json')
+    assert set(_read_export(delta)) == {annotated.id, added.id}
+    assert delta.counters == {'task_number': 2}
+
+    deleted.delete()
+    r = business_client.post(f'{url}{delta.id}/materialize')
+    assert r.status_code == 201
+    snapshot = Export.objects.get(id=r.json()['id'])
+    assert snapshot.status == Export.Status.COMPLETED
+    assert snapshot.snapshot_type == Export.SnapshotType.FULL
+    assert snapshot.high_water_mark == delta.high_water_mark
+    merged = _read_export(snapshot)
+    assert set(merged) == set(configured_project.tasks.values_list('id', flat=True))
+    assert len(merged[annotated.id]['annotations']) == 1
+
+    # full snapshots can't be materialized
+    r = business_client.post(f'{url}{full.id}/materialize')
+    assert r.status_code == 400
+
+
+@pytest.mark.django_db
+def test_delta_export_continues_snapshot_with_same_options(business_client, configured_project):
+    from data_export.models import Export
+
+    url = f'/api/projects/{configured_project.id}/exports/'
+    options = {'task_filter_options': {'annotated': 'only'}}
+    r = business_client.post(url, data=json.dumps({'title': 'full'}), content_type='application/json')
+    full = Export.objects.get(id=r.json()['id'])
+    r = business_client.post(url, data=json.dumps({'title': 'annotated', **options}), content_type='application/json')
+    annotated_full = Export.objects.get(id=r.json()['id'])
+
+    # the latest snapshot is skipped, it was made with other filters
+    r = business_client.post(url, data=json.dumps({'snapshot_type': 'delta'}), content_type='application/json')
+    assert r.status_code == 201
+    assert r.json()['base_export'] == full.id
+
+    r = business_client.post(
+        url, data=json.dumps({'snapshot_type': 'delta', **options}), content_type='application/json'
+    )
+    assert r.json()['base_export'] == annotated_full.id
+
+    # an explicit base must match the options too
+    r = business_client.post(
+        url,
+        data=json.dumps({'snapshot_type': 'delta', 'base_export': full.id, **options}),
+        content_type='application/json',
+    )
+    assert r.status_code == 400
+    assert 'base_export' in r.json()['validation_errors']
+
+    # without a matching snapshot the delta falls back to a full one
+    r = business_client.post(
+        url,
+        data=json.dumps({'snapshot_type': 'delta', 'serialization_options': {'drafts': {'only_id': True}}}),
+        content_type='application/json',
+    )
+    export = Export.objects.get(id=r.json()['id'])
+    assert export.snapshot_type == Export.SnapshotType.FULL
+    assert export.base_export is None
+
+
+@pytest.mark.django_db
+def test_delta_export_without_base_is_full(business_client, configured_project):
+    from data_export.models import Export
+
+    r = business_client.post(
+        f'/api/projects/{configured_project.id}/exports/',
+        data=json.dumps({'snapshot_type': 'delta'}),
+        content_type='application/json',
+    )
+
+    export = Export.objects.get(id=r.json()['id'])
+    assert export.snapshot_type == Export.SnapshotType.FULL
+    assert len(_read_export(export)) == configured_project.tasks.count()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_export_stitches_batches_in_order(business_client, configured_project, settings, mocker):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from data_export.mixins import ExportMixin
+    from data_export.models import Export
+
+    settings.EXPORT_PARALLEL_WORKERS = 2
+    settings.EXPORT_PARALLEL_BATCH_SIZE = 1
+    # the in-memory test database can't be shared with worker processes
+    mocker.patch.object(ExportMixin, 'can_export_in_parallel', return_value=True)
+    get_export_executor = mocker.patch(
+        'data_export.mixins.get_export_executor', side_effect=lambda max_workers: ThreadPoolExecutor(max_workers)
+    )
+    task = configured_project.tasks.order_by('id').first()
+    Annotation.objects.create(task=task, project=configured_project, result=[], completed_by=business_client.user)
+
+    r = business_client.post(
+        f'/api/projects/{configured_project.id}/exports/',
+        data=json.dumps({'title': 'parallel'}),
+        content_type='application/json',
+    )
+
+    export = Export.objects.get(id=r.json()['id'])
+    assert export.status == Export.Status.COMPLETED
+    get_export_executor.assert_called_once_with(2)
+    with export.file.open('rb') as f:
+        exported = json.load(f)
+    assert [t['id'] for t in exported] == list(configured_project.tasks.order_by('id').values_list('id', flat=True))
+    assert len(exported[0]['annotations']) == 1
+    assert export.counters == {'task_number': len(exported)}
+
+
+def get_export_worker_state():
+    from django.apps import apps
+    from django.db import connections
+
+    return apps.ready, connections['default'].settings_dict['NAME']
+
+
+@pytest.mark.django_db
+def test_export_executor_spawns_workers_with_parent_databases():
+    from data_export.mixins import get_export_executor
+
+    with get_export_executor(1) as executor:
+        assert executor._mp_context.get_start_method() == 'spawn'
+        apps_ready, database_name = executor.submit(get_export_worker_state).result()
+
+    assert apps_ready
+    assert database_name == connection.settings_dict['NAME']
+
+
+@pytest.mark.skipif(connection.vendor == 'sqlite', reason='Worker processes need a database shared between processes')
+@pytest.mark.django_db(transaction=True)
+def test_parallel_export_in_worker_processes(business_client, configured_project, settings):
+    from data_export.models import Export
+
+    settings.EXPORT_PARALLEL_WORKERS = 2
+    settings.EXPORT_PARALLEL_BATCH_SIZE = 1
+    task = configured_project.tasks.order_by('id').first()
+    Annotation.objects.create(task=task, project=configured_project, result=[], completed_by=business_client.user)
+
+    r = business_client.post(
+        f'/api/projects/{configured_project.id}/exports/',
+        data=json.dumps({'title': 'parallel'}),
+        content_type='application/json',
+    )
+
+    export = Export.objects.get(id=r.json()['id'])
+    assert export.status == Export.Status.COMPLETED
+    with export.file.open('rb') as f:
+        exported = json.load(f)
+    assert [t['id'] for t in exported] == list(configured_project.tasks.order_by('id').values_list('id', flat=True))
+    assert len(exported[0]['annotations']) == 1
+
+
+@pytest.mark.django_db
+def test_convert_file_streams_through_temp_files(business_client, configured_project):
+    from data_export.models import Export
+    from django.core.files.base import ContentFile
+
+    export = Export.objects.create(project=configured_project, created_by=business_client.user)
+    tasks = [{'id': i, 'data': {'text': 'x' * 1000}, 'annotations': []} for i in range(20000)]
+    export.file.save(f'{configured_project.id}/snapshot.json', ContentFile(json.dumps(tasks).encode()))
+    size = export.file.size
+    del tasks
+
+    tracemalloc.start()
+    try:
+        converted = export.convert_file('JSON')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with converted:
+        # backed by a file on disk, not by an in-memory buffer
+        assert os.path.exists(converted.file.name)
+        assert converted.size == size
+        assert json.load(converted)[-1]['id'] == 19999
+    assert not os.path.exists(converted.file.name)
+    assert peak < size / 4
+
+
+@pytest.mark.django_db
+def test_parquet_export_one_row_per_region(business_client, configured_project, settings, tmp_path):
+    import pyarrow.parquet as pq
+
+    settings.EXPORT_DIR = str(tmp_path)
+    settings.EXPORT_PARQUET_ROW_GROUP_SIZE = 2
+    configured_project.summary.all_data_columns = {'location': 2, 'text': 2}
+    configured_project.summary.save(update_fields=['all_data_columns'])
+    task = configured_project.tasks.order_by('id').first()
+    regions = [
+        {'id': f'r{i}', 'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['pos']}}
+        for i in range(3)
+    ]
+    annotation = Annotation.objects.create(
+        task=task, project=configured_project, result=regions, completed_by=business_client.user
+    )
+
+    r = business_client.get(
+        f'/api/projects/{configured_project.id}/export', data={'exportType': 'PARQUET', 'download_all_tasks': 'true'}
+    )
+
+    assert r.status_code == 200
+    assert r['filename'].endswith('.parquet')
+    (output_file,) = tmp_path.glob('*.parquet')
+    parquet_file = pq.ParquetFile(output_file)
+    rows = parquet_file.read().to_pylist()
+    # one row per region of the annotated task, one row for each of the other tasks
+    assert len(rows) == 3 + configured_project.tasks.count() - 1
+    assert parquet_file.metadata.num_row_groups == (len(rows) + 1) // 2
+    annotated = [row for row in rows if row['task_id'] == task.id]
+    assert [row['region_id'] for row in annotated] == ['r0', 'r1', 'r2']
+    assert {row['annotation_id'] for row in annotated} == {annotation.id}
+    assert annotated[0]['completed_by'] == business_client.user.id
+    assert json.loads(annotated[0]['value']) == {'choices': ['pos']}
+    assert annotated[0]['data.text'] == task.data['text']
+    # columns can be read on their own
+    assert pq.read_table(output_file, columns=['task_id']).num_columns == 1
+
+
+@pytest.mark.django_db
+def test_convert_snapshot_to_parquet(business_client, configured_project, settings):
+    import pyarrow.parquet as pq
+    from data_export.models import Export
+    from django.core.files.base import ContentFile
+
+    settings.EXPORT_PARQUET_ROW_GROUP_SIZE = 100
+    configured_project.summary.all_data_columns = {'text': 1000}
+    configured_project.summary.save(update_fields=['all_data_columns'])
+    export = Export.objects.create(project=configured_project, created_by=business_client.user)
+    tasks = [
+        {'id': i, 'data': {'text': str(i)}, 'annotations': [{'id': i, 'result': [{'id': 'a'}, {'id': 'b'}]}]}
+        for i in range(1000)
+    ]
+    export.file.save(f'{configured_project.id}/snapshot.json', ContentFile(json.dumps(tasks).encode()))
+
+    with export.convert_file('PARQUET') as converted:
+        assert converted.name.endswith('.parquet')
+        parquet_file = pq.ParquetFile(converted)
+        assert parquet_file.metadata.num_rows == 2000
+        assert parquet_file.metadata.num_row_groups == 20
+        table = parquet_file.read(columns=['task_id', 'data.text', 'region_id'])
+    assert table.slice(1998).to_pylist() == [
+        {'task_id': 999, 'data.text': '999', 'region_id': 'a'},
+        {'task_id': 999, 'data.text': '999', 'region_id': 'b'},
+    ]
@@ -83,6 +83,8 @@ class TestTaskResolveStorageUri:
             return True  # Match any URL
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
+
+        mock_storage.get_url_route.return_value = None
         project.get_all_import_storage_objects = [mock_storage]
 
         request = APIRequestFactory().get(
@@ -159,6 +161,8 @@ class TestTaskResolveStorageUri:
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
 
+        mock_storage.get_url_route.return_value = None
+
         project.get_all_import_storage_objects = [mock_storage]
         task.project = project
 
@@ -204,6 +208,8 @@ class TestTaskResolveStorageUri:
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
 
+        mock_storage.get_url_route.return_value = None
+
         project.get_all_import_storage_objects = [mock_storage]
         task.project = project
 
@@ -315,6 +321,8 @@ class TestProjectResolveStorageUri:
             return True  # Match any URL
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
+
+        mock_storage.get_url_route.return_value = None
         project.get_all_import_storage_objects = [mock_storage]
 
         request = APIRequestFactory().get(
@@ -387,6 +395,8 @@ class TestProjectResolveStorageUri:
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
 
+        mock_storage.get_url_route.return_value = None
+
         project.get_all_import_storage_objects = [mock_storage]
 
         project.resolve_storage_uri.return_value = dict(
@@ -430,6 +440,8 @@ class TestProjectResolveStorageUri:
 
         mock_storage.can_resolve_url = MagicMock(side_effect=mock_can_resolve)
 
+        mock_storage.get_url_route.return_value = None
+
         project.get_all_import_storage_objects = [mock_storage]
 
         project.resolve_storage_uri.return_value = dict(
@@ -2,7 +2,7 @@ import json
 
 import pytest
 from django.db.models.query import QuerySet
-from tests.utils import make_project
+from tests.utils import fake_redis, make_annotation, make_prediction, make_project, make_task  # noqa
 from users.models import User
 
 
@@ -40,3 +40,231 @@ def test_project_all_members(business_client):
 
     assert isinstance(members, QuerySet)
     assert isinstance(members.first(), User)
+
+
+def _project_counters(project, materialized):
+    from projects.models import Project, ProjectManager
+
+    queryset = Project.objects.filter(id=project.id)
+    return ProjectManager.with_counts_annotate(queryset, materialized=materialized).values(
+        *ProjectManager.COUNTER_FIELDS
+    )[0]
+
+
+@pytest.mark.django_db
+def test_project_counters_follow_task_and_annotation_writes(business_client, django_capture_on_commit_callbacks):
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    result = [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['A']}}]
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(3)]
+
+    useful = make_annotation({'result': result, 'completed_by': business_client.user}, tasks[0].id)
+    make_annotation({'result': result, 'completed_by': business_client.user}, tasks[0].id)
+    make_annotation({'result': result, 'ground_truth': True, 'completed_by': business_client.user}, tasks[1].id)
+    skipped = make_annotation({'result': [], 'was_cancelled': True, 'completed_by': business_client.user}, tasks[1].id)
+    make_prediction({'result': result}, tasks[2].id)
+    assert _project_counters(project, True) == _project_counters(project, False)
+    assert _project_counters(project, True)['num_tasks_with_annotations'] == 1
+
+    skipped.was_cancelled = False
+    skipped.save()
+    useful.delete()
+    tasks[2].delete()
+    counters = _project_counters(project, True)
+    assert counters == _project_counters(project, False)
+    assert counters['task_number'] == 2
+    assert counters['num_tasks_with_annotations'] == 2
+    assert counters['total_predictions_number'] == 0
+
+    # bulk imports don't send signals, counters are recalculated along with the task counters
+    with django_capture_on_commit_callbacks(execute=True):
+        r = business_client.post(
+            f'/api/projects/{project.id}/import',
+            data=json.dumps([{'text': 'imported', 'annotations': [{'result': result}]}]),
+            content_type='application/json',
+        )
+    assert r.status_code == 201, r.content
+    assert _project_counters(project, True) == _project_counters(project, False)
+    assert _project_counters(project, True)['task_number'] == 3
+
+
+@pytest.mark.django_db
+def test_project_counters_reconcile_drift(business_client):
+    from django.core.management import call_command
+    from projects.models import ProjectCounters
+    from tasks.models import Task
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    Task.objects.bulk_create([Task(project=project, data={'text': str(i)}) for i in range(2)])
+    assert ProjectCounters.objects.get(project=project).task_number == 0
+
+    call_command('reconcile_project_counters')
+    assert ProjectCounters.objects.get(project=project).task_number == 2
+    assert ProjectCounters.reconcile() == 0
+
+
+@pytest.mark.django_db
+def test_update_tasks_counters_applies_project_counters_deltas(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from tasks.functions import update_tasks_counters
+    from tasks.models import Prediction, Task
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(2)]
+    Prediction.objects.bulk_create(
+        [Prediction(task=task, project=project, result=[]) for task in (tasks[0], tasks[0], tasks[1])]
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        update_tasks_counters(Task.objects.filter(project=project), recalculate_project_counters=False)
+    # the project isn't recounted, the counters row gets the changes of the task counters
+    assert not [query for query in queries.captured_queries if 'FOR UPDATE' in query['sql']]
+    assert _project_counters(project, True)['total_predictions_number'] == 3
+
+    Prediction.objects.filter(task=tasks[1])._raw_delete(connection.alias)
+    update_tasks_counters(Task.objects.filter(project=project), recalculate_project_counters=False)
+    assert _project_counters(project, True) == _project_counters(project, False)
+    assert _project_counters(project, True)['total_predictions_number'] == 2
+
+
+@pytest.mark.django_db
+def test_is_labeled_save_counts_finished_task_without_select(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from tasks.models import Task
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    task = Task.objects.get(id=make_task({'data': {'text': 'a'}}, project).id)
+
+    task.is_labeled = True
+    with CaptureQueriesContext(connection) as queries:
+        task.save(update_fields=['is_labeled'])
+    assert not [query for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+    assert _project_counters(project, True)['finished_task_number'] == 1
+
+    task.is_labeled = False
+    task.save(update_fields=['is_labeled'])
+    assert _project_counters(project, True) == _project_counters(project, False)
+
+
+@pytest.mark.django_db
+def test_project_counters_reconcile_job_reschedules_itself(
+    business_client, fake_redis, settings, django_capture_on_commit_callbacks
+):
+    import django_rq
+    from projects.functions.counters import reconcile_project_counters, schedule_project_counters_reconcile
+    from projects.models import ProjectCounters
+    from tasks.models import Task
+
+    settings.PROJECT_COUNTERS_RECONCILE_INTERVAL = 60
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    Task.objects.bulk_create([Task(project=project, data={'text': str(i)}) for i in range(2)])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert reconcile_project_counters() == 1
+    assert ProjectCounters.objects.get(project=project).task_number == 2
+    registry = django_rq.get_queue('low').scheduled_job_registry
+    assert len(registry.get_job_ids()) == 1
+
+    # bulk updates don't schedule another run while one is scheduled
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_project_counters_reconcile()
+    assert len(registry.get_job_ids()) == 1
+
+
+@pytest.mark.django_db
+def test_project_list_reads_materialized_counters(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    task = make_task({'data': {'text': 'a'}}, project)
+    make_annotation({'result': [], 'completed_by': business_client.user}, task.id)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = business_client.get('/api/projects/?include=id,task_number,total_annotations_number')
+
+    assert r.status_code == 200, r.content
+    listed = next(item for item in r.json()['results'] if item['id'] == project.id)
+    assert listed['task_number'] == 1
+    assert listed['total_annotations_number'] == 1
+    assert not [query for query in queries.captured_queries if '"task"' in query['sql']]
+
+
+def _overlaps(project):
+    return dict(project.tasks.order_by('id').values_list('id', 'overlap'))
+
+
+@pytest.mark.django_db
+def test_rearrange_overlap_cohort(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from tasks.models import Task
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    result = [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['A']}}]
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(10)]
+    for task in tasks[:2]:
+        for _ in range(2):
+            make_annotation({'result': result, 'completed_by': business_client.user}, task.id)
+    make_annotation({'result': result, 'completed_by': business_client.user}, tasks[5].id)
+    project.maximum_annotations = 2
+
+    # finished tasks first, then the ones with most annotations
+    project.overlap_cohort_percentage = 30
+    with CaptureQueriesContext(connection) as queries:
+        project._rearrange_overlap_cohort()
+    overlaps = _overlaps(project)
+    assert [task.id for task in tasks if overlaps[task.id] == 2] == [tasks[0].id, tasks[1].id, tasks[5].id]
+    assert set(project.tasks.filter(is_labeled=True).values_list('id', flat=True)) == {tasks[0].id, tasks[1].id}
+
+    # finished tasks stay in the cohort even if it's smaller
+    project.overlap_cohort_percentage = 10
+    project._rearrange_overlap_cohort()
+    overlaps = _overlaps(project)
+    assert [task.id for task in tasks if overlaps[task.id] == 2] == [tasks[0].id, tasks[1].id]
+
+    # number of statements doesn't depend on the number of tasks
+    Task.objects.bulk_create([Task(project=project, data={'text': str(i)}) for i in range(100)])
+    project.overlap_cohort_percentage = 30
+    with CaptureQueriesContext(connection) as more_queries:
+        project._rearrange_overlap_cohort()
+    assert len(more_queries) == len(queries)
+    assert sum(overlap == 2 for overlap in _overlaps(project).values()) == 33
+
+
+@pytest.mark.django_db
+def test_rearrange_overlap_cohort_progress(business_client, django_capture_on_commit_callbacks, fake_redis):
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    make_task({'data': {'text': 'a'}}, project)
+    project.maximum_annotations = 2
+    project.overlap_cohort_percentage = 50
+
+    r = business_client.get(f'/api/projects/{project.id}/overlap-cohort/')
+    assert r.json() == {'status': None}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        project.rearrange_overlap_cohort()
+
+    r = business_client.get(f'/api/projects/{project.id}/overlap-cohort/')
+    assert r.status_code == 200, r.content
+    progress = r.json()
+    assert progress['status'] == 'completed'
+    assert progress['stages_done'] == progress['stages_total'] == 4
+    assert progress['tasks'] == 1
+    assert 'finished_at' in progress
+
+
+@pytest.mark.django_db
+def test_benchmark_overlap_cohort_dry_run_keeps_progress(business_client, fake_redis):
+    from django.core.management import call_command
+    from projects.functions.overlap_cohort import get_overlap_cohort_progress
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    make_task({'data': {'text': 'a'}}, project)
+
+    call_command('benchmark_overlap_cohort', project.id, percentage=50, maximum_annotations=2, repeat=2)
+    assert get_overlap_cohort_progress(project.id) is None
+
+    call_command('benchmark_overlap_cohort', project.id, percentage=50, maximum_annotations=2, commit=True)
+    assert get_overlap_cohort_progress(project.id)['status'] == 'completed'
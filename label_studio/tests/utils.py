@@ -245,6 +245,23 @@ def redis_client_mock():
         yield redis
 
 
+@pytest.fixture
+def fake_redis():
+    """Back core.redis helpers (redis_get, redis_set, redis_incr, redis_pipeline, etc.) with FakeRedis,
+    jobs of start_job_async_or_sync run synchronously through RQ queues on the same connection"""
+    import django_rq
+    from fakeredis import FakeRedis, FakeServer
+
+    redis = FakeRedis(server=FakeServer())
+    get_queue = django_rq.get_queue
+
+    def get_fake_queue(name='default', **kwargs):
+        return get_queue(name, connection=redis, is_async=False)
+
+    with mock.patch('core.redis._redis', redis), mock.patch('django_rq.get_queue', side_effect=get_fake_queue):
+        yield redis
+
+
 def upload_data(client, project, tasks):
     tasks = TaskWithAnnotationsSerializer(tasks, many=True).data
     data = [{'data': task['data'], 'annotations': task['annotations']} for task in tasks]
@@ -1,5 +1,5 @@
 import json
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import pytest
 import requests
@@ -7,7 +7,15 @@ import requests_mock
 from django.urls import reverse
 from projects.models import Project
 from webhooks.models import Webhook, WebhookAction
-from webhooks.utils import emit_webhooks, emit_webhooks_for_instance, run_webhook
+from webhooks.utils import (
+    emit_webhooks,
+    emit_webhooks_for_instance,
+    emit_webhooks_sync,
+    run_webhook,
+    run_webhook_sync,
+)
+
+from ..utils import fake_redis  # noqa
 
 
 @pytest.fixture
@@ -440,3 +448,244 @@ def test_start_training_webhook(setup_project_dialog, ml_start_training_webhook,
     assert request_history[0].url == webhook.url
     assert 'project' in request_history[0].json()
     assert request_history[0].json()['action'] == 'START_TRAINING'
+
+
+@pytest.mark.django_db
+def test_failed_delivery_is_retried(organization_webhook):
+    from datetime import timedelta
+
+    from django.utils import timezone
+    from webhooks.dispatcher import retry_webhook_deliveries
+    from webhooks.models import WebhookRetry
+
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', organization_webhook.url, status_code=503)
+        run_webhook_sync(organization_webhook, WebhookAction.PROJECT_CREATED, {'data': 'test'})
+
+    retry = WebhookRetry.objects.get(webhook=organization_webhook)
+    assert retry.attempts == 1
+    assert retry.data == {'action': WebhookAction.PROJECT_CREATED, 'data': 'test'}
+    assert retry.last_error == 'HTTP 503'
+
+    # Not due yet
+    with requests_mock.Mocker() as m:
+        assert retry_webhook_deliveries() == 0
+    assert not m.request_history
+
+    WebhookRetry.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', organization_webhook.url, status_code=503)
+        assert retry_webhook_deliveries() == 0
+    retry.refresh_from_db()
+    assert retry.attempts == 2
+    assert retry.next_attempt_at > timezone.now()
+
+    WebhookRetry.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', organization_webhook.url)
+        assert retry_webhook_deliveries() == 1
+    assert m.request_history[0].json() == {'action': WebhookAction.PROJECT_CREATED, 'data': 'test'}
+    assert not WebhookRetry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_retry_gives_up_after_max_attempts(organization_webhook, settings):
+    from datetime import timedelta
+
+    from django.utils import timezone
+    from webhooks.dispatcher import retry_webhook_deliveries
+    from webhooks.models import WebhookRetry
+
+    settings.WEBHOOK_RETRY_MAX_ATTEMPTS = 2
+    WebhookRetry.objects.create(
+        webhook=organization_webhook,
+        action=WebhookAction.PROJECT_CREATED,
+        data={'action': WebhookAction.PROJECT_CREATED},
+        next_attempt_at=timezone.now() - timedelta(seconds=1),
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', organization_webhook.url, exc=requests.exceptions.ConnectTimeout)
+        assert retry_webhook_deliveries() == 1
+
+    assert not WebhookRetry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_retry_sends_outside_transaction_with_leased_rows(organization_webhook):
+    from datetime import timedelta
+
+    from django.db import connection
+    from django.utils import timezone
+    from webhooks import dispatcher
+    from webhooks.models import WebhookRetry
+
+    retry = WebhookRetry.objects.create(
+        webhook=organization_webhook,
+        action=WebhookAction.PROJECT_CREATED,
+        data={'action': WebhookAction.PROJECT_CREATED},
+        next_attempt_at=timezone.now() - timedelta(seconds=1),
+    )
+    # pytest-django wraps the test in a transaction, count atomic blocks opened inside it
+    outer_atomic_blocks = len(connection.atomic_blocks)
+
+    def send(delivery):
+        assert len(connection.atomic_blocks) == outer_atomic_blocks
+        # the claimed row isn't due while it is being sent
+        assert WebhookRetry.objects.get(id=retry.id).next_attempt_at > timezone.now()
+        delivery.error = 'HTTP 503'
+        return delivery
+
+    with mock.patch.object(dispatcher, 'send', side_effect=send) as send_mock:
+        assert dispatcher.retry_webhook_deliveries() == 0
+
+    send_mock.assert_called_once()
+    retry.refresh_from_db()
+    assert retry.attempts == 2
+    assert retry.last_error == 'HTTP 503'
+
+
+@pytest.mark.django_db
+def test_emit_webhooks_sends_concurrently_with_pooled_sessions(
+    configured_project, organization_webhook, project_webhook
+):
+    import threading
+
+    from webhooks.dispatcher import get_session
+
+    threads = set()
+
+    def callback(request, context):
+        threads.add(threading.get_ident())
+        return {}
+
+    with requests_mock.Mocker(real_http=True) as m:
+        m.register_uri('POST', organization_webhook.url, json=callback)
+        m.register_uri('POST', project_webhook.url, json=callback)
+        emit_webhooks_sync(configured_project.organization, configured_project, WebhookAction.PROJECT_UPDATED, {})
+
+    assert {organization_webhook.url, project_webhook.url} <= {request.url for request in m.request_history}
+    assert len(threads) >= 1 and threading.get_ident() not in threads
+    assert get_session(organization_webhook.url) is get_session(project_webhook.url)
+    assert get_session(organization_webhook.url) is not get_session('https://example.com/hook')
+
+
+@pytest.mark.django_db
+def test_webhook_delivery_stats(business_client, organization_webhook, fake_redis):
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', organization_webhook.url)
+        run_webhook_sync(organization_webhook, WebhookAction.PROJECT_CREATED, {})
+        m.register_uri('POST', organization_webhook.url, status_code=500)
+        run_webhook_sync(organization_webhook, WebhookAction.PROJECT_CREATED, {})
+
+    response = business_client.get(reverse('webhooks:api:webhook-stats', kwargs={'pk': organization_webhook.id}))
+
+    assert response.status_code == 200
+    assert response.json()['deliveries'] == 2
+    assert response.json()['failures'] == 1
+    assert response.json()['last_status_code'] == 500
+    assert response.json()['pending_retries'] == 1
+
+
+@pytest.mark.django_db
+def test_active_webhooks_are_cached_until_changed(configured_project, django_assert_num_queries):
+    from webhooks.utils import get_active_webhooks
+
+    organization = configured_project.organization
+    Webhook.objects.filter(organization=organization).delete()
+
+    get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_CREATED)
+    with django_assert_num_queries(0):
+        assert get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_CREATED) == []
+        emit_webhooks_for_instance(organization, configured_project, WebhookAction.ANNOTATION_CREATED)
+
+    webhook = Webhook.objects.create(
+        organization=organization,
+        project=configured_project,
+        url='http://127.0.0.1:8000/hook',
+        send_for_all_actions=False,
+    )
+    webhook.set_actions([WebhookAction.ANNOTATION_CREATED])
+    assert get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_CREATED) == [webhook]
+    assert get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_UPDATED) == []
+    assert get_active_webhooks(organization, None, WebhookAction.ANNOTATION_CREATED) == []
+
+    webhook.set_actions([WebhookAction.ANNOTATION_UPDATED])
+    assert get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_CREATED) == []
+
+    webhook.is_active = False
+    webhook.save()
+    assert get_active_webhooks(organization, configured_project, WebhookAction.ANNOTATION_UPDATED) == []
+
+
+@pytest.fixture
+def fake_batch_redis(fake_redis):
+    with mock.patch('webhooks.batching.start_job_async_or_sync') as start_job:
+        yield fake_redis, start_job
+
+
+@pytest.mark.django_db
+def test_batched_webhook_coalesces_events(configured_project, fake_batch_redis):
+    from webhooks.batching import BATCH_ACTION, flush_webhook_batch
+
+    redis, start_job = fake_batch_redis
+    organization = configured_project.organization
+    Webhook.objects.filter(organization=organization).delete()
+    webhook = Webhook.objects.create(
+        organization=organization, project=None, url='http://127.0.0.1:8000/batch', batch_window=30
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', webhook.url)
+        emit_webhooks_sync(organization, None, WebhookAction.ANNOTATION_CREATED, {'annotation': {'id': 1}})
+        emit_webhooks_sync(organization, None, WebhookAction.ANNOTATION_UPDATED, {'annotation': {'id': 1, 'v': 1}})
+        emit_webhooks_sync(organization, None, WebhookAction.ANNOTATION_UPDATED, {'annotation': {'id': 1, 'v': 2}})
+        emit_webhooks_sync(organization, None, WebhookAction.ANNOTATION_UPDATED, {'annotation': {'id': 2}})
+        assert not m.request_history
+        # The first buffered event schedules the flush at the end of the window
+        assert start_job.call_count == 1
+        assert start_job.call_args.kwargs['in_seconds'] == 30
+
+        assert flush_webhook_batch(webhook.id) == 3
+
+    [request] = m.request_history
+    body = request.json()
+    assert body['action'] == BATCH_ACTION
+    assert [(event['sequence'], event['ordering_key']) for event in body['events']] == [
+        (1, 'annotation:1'),
+        (3, 'annotation:1'),
+        (4, 'annotation:2'),
+    ]
+    assert body['events'][1]['annotation'] == {'id': 1, 'v': 2}
+    assert not redis.exists(f'webhooks:batch:{webhook.id}')
+
+
+@pytest.mark.django_db
+def test_batched_webhook_flushes_when_full(configured_project, fake_batch_redis):
+    organization = configured_project.organization
+    Webhook.objects.filter(organization=organization).delete()
+    webhook = Webhook.objects.create(
+        organization=organization, url='http://127.0.0.1:8000/batch', batch_window=30, batch_max_events=2
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri('POST', webhook.url)
+        for annotation_id in range(5):
+            payload = {'annotation': {'id': annotation_id}}
+            emit_webhooks_sync(organization, None, WebhookAction.ANNOTATION_CREATED, payload)
+
+    assert [len(request.json()['events']) for request in m.request_history] == [2, 2]
+
+
+@pytest.mark.django_db
+def test_batch_max_events_must_be_positive(business_client, organization_webhook):
+    from django.core.exceptions import ValidationError
+
+    url = reverse('webhooks:api:webhook-detail', kwargs={'pk': organization_webhook.id})
+    response = business_client.patch(url, data={'batch_max_events': 0}, content_type='application/json')
+    assert response.status_code == 400
+    assert 'batch_max_events' in response.json()['validation_errors']
+
+    organization_webhook.batch_max_events = 0
+    with pytest.raises(ValidationError):
+        organization_webhook.full_clean()
@@ -11,6 +11,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .dispatcher import get_webhook_delivery_stats
 from .models import Webhook, WebhookAction
 from .serializers import WebhookSerializer, WebhookSerializerForUpdate
 
@@ -126,6 +127,26 @@ class WebhookAPI(generics.RetrieveUpdateDestroyAPIView):
         return Webhook.objects.filter(organization=self.request.user.active_organization)
 
 
+@method_decorator(
+    name='get',
+    decorator=swagger_auto_schema(
+        x_fern_audiences=['internal'],
+        tags=['Webhooks'],
+        operation_summary='Get webhook delivery stats',
+        operation_description='Get delivery counters, latencies and the number of pending retries of a webhook.',
+    ),
+)
+class WebhookDeliveryStatsAPI(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Webhook.objects.filter(organization=self.request.user.active_organization)
+
+    def get(self, request, *args, **kwargs):
+        webhook = self.get_object()
+        return Response(data=get_webhook_delivery_stats(webhook.id))
+
+
 @method_decorator(
     name='get',
     decorator=swagger_auto_schema(
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class WebhooksConfig(AppConfig):
     name = 'webhooks'
+
+    def ready(self):
+        from webhooks import signals  # noqa: F401
@@ -0,0 +1,139 @@
+"""Opt-in event batching for webhooks.
+
+Webhooks with a non-zero batch_window don't get one HTTP call per event.
+Events are buffered in a Redis list per webhook and delivered as one payload
+when the window has passed (a delayed RQ job, so workers must run with the
+RQ scheduler) or as soon as batch_max_events events are buffered:
+
+    {
+        "action": "EVENTS_BATCH",
+        "events": [
+            {"sequence": 41, "ordering_key": "annotation:17", "action": "ANNOTATION_UPDATED", ...},
+            ...
+        ]
+    }
+
+Each event keeps the body it would have been sent with on its own, plus a
+per-webhook monotonically increasing sequence and an ordering key of the
+object it's about. Repeated *_UPDATED events for the same object within one
+batch are coalesced into the latest one, leaving a gap in the sequence.
+
+Without Redis events are sent immediately.
+"""
+import json
+import logging
+from typing import List
+
+from core.redis import redis_incr, redis_pipeline, start_job_async_or_sync
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .dispatcher import WebhookDelivery, dispatch
+from .models import Webhook, WebhookAction
+
+logger = logging.getLogger(__name__)
+
+BATCH_ACTION = 'EVENTS_BATCH'
+
+COALESCED_ACTIONS = {
+    WebhookAction.PROJECT_UPDATED,
+    WebhookAction.ANNOTATION_UPDATED,
+    WebhookAction.LABEL_LINK_UPDATED,
+}
+
+
+def get_batch_key(webhook_id) -> str:
+    return f'webhooks:batch:{webhook_id}'
+
+
+def get_sequence_key(webhook_id) -> str:
+    return f'webhooks:batch-sequence:{webhook_id}'
+
+
+def get_ordering_key(action, data):
+    """Identify the object(s) an event is about, e.g. 'annotation:17' or 'tasks:1,2,3'."""
+    key = WebhookAction.ACTIONS.get(action, {}).get('key')
+    value = data.get(key)
+    if isinstance(value, dict):
+        ids = value.get('id')
+    elif isinstance(value, list):
+        ids = ','.join(str(item.get('id')) for item in value if isinstance(item, dict))
+    else:
+        ids = None
+    return f'{key}:{ids}' if ids else None
+
+
+def buffer_deliveries(deliveries: List[WebhookDelivery]) -> List[WebhookDelivery]:
+    """Buffer deliveries of batching webhooks in Redis and return the ones to send now."""
+    batched = [delivery for delivery in deliveries if delivery.webhook.batch_window]
+    if not batched:
+        return deliveries
+    pipeline = redis_pipeline()
+    if pipeline is None:
+        return deliveries
+
+    now = timezone.now()
+    for delivery in batched:
+        event = {
+            'ordering_key': get_ordering_key(delivery.action, delivery.data),
+            'created_at': now.isoformat(),
+            **delivery.data,
+        }
+        key = get_batch_key(delivery.webhook.id)
+        pipeline.rpush(key, json.dumps(event))
+        pipeline.lindex(key, 0)
+    results = pipeline.execute()
+
+    for index, delivery in enumerate(batched):
+        webhook = delivery.webhook
+        length, oldest = results[2 * index], results[2 * index + 1]
+        oldest_at = parse_datetime(json.loads(oldest)['created_at']) if oldest else now
+        if length >= webhook.batch_max_events or (now - oldest_at).total_seconds() > 2 * webhook.batch_window:
+            # Full batch, or the scheduled flush was lost
+            flush_webhook_batch(webhook.id)
+        elif length == 1:
+            start_job_async_or_sync(flush_webhook_batch, webhook.id, queue_name='low', in_seconds=webhook.batch_window)
+
+    return [delivery for delivery in deliveries if not delivery.webhook.batch_window]
+
+
+def coalesce(events: List[dict]) -> List[dict]:
+    """Keep only the latest of repeated update events for the same object."""
+    latest = {}
+    for index, event in enumerate(events):
+        if event['action'] in COALESCED_ACTIONS and event.get('ordering_key'):
+            latest[(event['action'], event['ordering_key'])] = index
+    return [
+        event
+        for index, event in enumerate(events)
+        if event['action'] not in COALESCED_ACTIONS
+        or not event.get('ordering_key')
+        or latest[(event['action'], event['ordering_key'])] == index
+    ]
+
+
+def flush_webhook_batch(webhook_id) -> int:
+    """Deliver buffered events of a webhook as one payload. Returns the number of delivered events."""
+    pipeline = redis_pipeline(transaction=True)
+    if pipeline is None:
+        return 0
+    key = get_batch_key(webhook_id)
+    pipeline.lrange(key, 0, -1)
+    pipeline.delete(key)
+    raw_events, _ = pipeline.execute()
+    if not raw_events:
+        return 0
+
+    webhook = Webhook.objects.filter(id=webhook_id, is_active=True).first()
+    if webhook is None:
+        logger.debug(f'Dropping {len(raw_events)} buffered events of missing or inactive webhook {webhook_id}')
+        return 0
+
+    events = [json.loads(raw_event) for raw_event in raw_events]
+    last_sequence = redis_incr(get_sequence_key(webhook_id), len(events))
+    for index, event in enumerate(events):
+        event['sequence'] = last_sequence - len(events) + index + 1
+    events = coalesce(events)
+
+    dispatch([WebhookDelivery(webhook=webhook, action=BATCH_ACTION, data={'action': BATCH_ACTION, 'events': events})])
+    return len(events)
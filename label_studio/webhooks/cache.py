@@ -0,0 +1,86 @@
+"""In-process cache of active webhooks per organization.
+
+Every annotation/task event resolves the webhooks to call, and most
+organizations have none. This module keeps, per process, the active webhooks
+of each organization together with their action sets, so resolving them costs
+no SQL queries once an organization has been loaded.
+
+Webhook/WebhookAction writes (see webhooks.signals) drop the local cache and
+bump a Redis version counter, which other processes compare with the version
+of their cache. Without Redis, each process drops its cache on local writes
+and reloads entries older than WEBHOOK_CACHE_TTL seconds.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from core.redis import redis_connected, redis_get, redis_incr
+from django.conf import settings
+from django.db import transaction
+
+from .models import Webhook
+
+logger = logging.getLogger(__name__)
+
+WEBHOOKS_VERSION_KEY = 'webhooks:version'
+
+# organization_id -> (version, loaded_at, webhooks)
+_cache: Dict[int, Tuple[str, float, List[Webhook]]] = {}
+_lock = threading.Lock()
+# Bumped on every local clear, so a load racing with a write is not kept
+_local_version = 0
+
+
+def get_webhooks_version() -> str:
+    if redis_connected():
+        return f'redis:{int(redis_get(WEBHOOKS_VERSION_KEY) or 0)}:{_local_version}'
+    return f'local:{_local_version}'
+
+
+def clear_webhooks_cache() -> None:
+    global _local_version
+    with _lock:
+        _local_version += 1
+        _cache.clear()
+
+
+def bump_webhooks_version() -> None:
+    """Invalidate cached webhooks in this process now and in every process after commit."""
+
+    def _bump():
+        clear_webhooks_cache()
+        redis_incr(WEBHOOKS_VERSION_KEY)
+
+    clear_webhooks_cache()
+    transaction.on_commit(_bump)
+
+
+def load_organization_webhooks(organization_id) -> List[Webhook]:
+    webhooks = list(
+        Webhook.objects.filter(organization_id=organization_id, is_active=True).prefetch_related('actions')
+    )
+    for webhook in webhooks:
+        webhook.cached_actions = frozenset(action.action for action in webhook.actions.all())
+    return webhooks
+
+
+def get_organization_webhooks(organization_id) -> List[Webhook]:
+    """Return the active webhooks of an organization, each with a cached_actions set.
+
+    The returned instances are shared between callers and must not be modified.
+    """
+    version = get_webhooks_version()
+    entry = _cache.get(organization_id)
+    if entry is not None:
+        cached_version, loaded_at, webhooks = entry
+        if cached_version == version and (
+            version.startswith('redis:') or time.monotonic() - loaded_at < settings.WEBHOOK_CACHE_TTL
+        ):
+            return webhooks
+
+    webhooks = load_organization_webhooks(organization_id)
+    with _lock:
+        _cache[organization_id] = (version, time.monotonic(), webhooks)
+    logger.debug(f'Loaded {len(webhooks)} active webhooks of organization {organization_id}: version={version}')
+    return webhooks
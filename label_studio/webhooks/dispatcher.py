@@ -0,0 +1,267 @@
+"""Concurrent webhook delivery with pooled HTTP sessions and a persisted retry queue.
+
+Deliveries of one event to several webhooks run in a thread pool, so a slow
+endpoint no longer delays the others. Each target host gets its own
+requests.Session, so keep-alive connections and TLS sessions are reused across
+deliveries made by the same process.
+
+Deliveries that time out, fail to connect or get a 429/5xx answer are stored as
+WebhookRetry rows and retried by retry_webhook_deliveries with exponential
+backoff. Per-webhook delivery counters and latencies are kept in Redis (see
+get_webhook_delivery_stats).
+"""
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from core.redis import redis_connected, redis_hgetall, redis_pipeline, start_job_async_or_sync
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import Webhook, WebhookRetry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_DELAY = 3600
+
+_lock = threading.Lock()
+_sessions = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_pid = None
+
+
+@dataclass
+class WebhookDelivery:
+    webhook: Webhook
+    action: str
+    data: dict
+    response: Optional[requests.Response] = None
+    error: str = ''
+    latency: float = 0.0
+
+    @property
+    def failed(self):
+        return self.response is None or self.response.status_code in RETRYABLE_STATUS_CODES
+
+
+def _reset_after_fork():
+    """Sessions and pool threads can't be shared with a forked process (e.g. an RQ job)."""
+    global _sessions, _executor, _pid
+    if _pid != os.getpid():
+        _sessions = {}
+        _executor = None
+        _pid = os.getpid()
+
+
+def get_session(url) -> requests.Session:
+    """Return the pooled session of the URL's scheme and host."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _lock:
+        _reset_after_fork()
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.WEBHOOK_POOL_MAXSIZE)
+            session.mount(f'{parts.scheme}://', adapter)
+            _sessions[key] = session
+    return session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        _reset_after_fork()
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.WEBHOOK_MAX_WORKERS, thread_name_prefix='webhook')
+    return _executor
+
+
+def send(delivery: WebhookDelivery) -> WebhookDelivery:
+    """POST one delivery. Doesn't touch the database, so it is safe to run in pool threads.
+
+    This function must not raise any exceptions.
+    """
+    webhook = delivery.webhook
+    logger.debug('Run webhook %s for action %s', webhook.id, delivery.action)
+    start = time.perf_counter()
+    try:
+        delivery.response = get_session(webhook.url).post(
+            webhook.url,
+            headers=webhook.headers,
+            json=delivery.data,
+            timeout=settings.WEBHOOK_TIMEOUT,
+        )
+    except requests.RequestException as exc:
+        logger.error(exc, exc_info=True)
+        delivery.error = str(exc)
+    delivery.latency = time.perf_counter() - start
+    if delivery.response is not None and delivery.failed:
+        delivery.error = f'HTTP {delivery.response.status_code}'
+    return delivery
+
+
+def send_many(deliveries: List[WebhookDelivery]) -> List[WebhookDelivery]:
+    """Send deliveries concurrently and wait for all of them."""
+    if len(deliveries) <= 1:
+        return [send(delivery) for delivery in deliveries]
+    return list(get_executor().map(send, deliveries))
+
+
+def get_retry_delay(attempts) -> int:
+    return min(settings.WEBHOOK_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def get_stats_key(webhook_id) -> str:
+    return f'webhooks:delivery-stats:{webhook_id}'
+
+
+def record_stats(deliveries: List[WebhookDelivery]) -> None:
+    """Add delivery counters and latencies to the per-webhook Redis hashes in one round trip."""
+    pipeline = redis_pipeline()
+    if pipeline is None:
+        return
+    for delivery in deliveries:
+        key = get_stats_key(delivery.webhook.id)
+        latency_ms = int(delivery.latency * 1000)
+        pipeline.hincrby(key, 'deliveries', 1)
+        pipeline.hincrby(key, 'failures', int(delivery.failed))
+        pipeline.hincrby(key, 'latency_ms_total', latency_ms)
+        pipeline.hset(
+            key,
+            mapping={
+                'last_latency_ms': latency_ms,
+                'last_status_code': delivery.response.status_code if delivery.response is not None else 0,
+                'last_delivered_at': timezone.now().isoformat(),
+            },
+        )
+    try:
+        pipeline.execute()
+    except Exception as exc:
+        logger.warning(f'Failed to record webhook delivery stats: {exc}')
+
+
+def get_webhook_delivery_stats(webhook_id) -> dict:
+    """Return delivery counters of a webhook (empty without Redis)."""
+    stats = {
+        key.decode() if isinstance(key, bytes) else key: value.decode() if isinstance(value, bytes) else value
+        for key, value in (redis_hgetall(get_stats_key(webhook_id)) or {}).items()
+    }
+    for field in ('deliveries', 'failures', 'latency_ms_total', 'last_latency_ms', 'last_status_code'):
+        stats[field] = int(stats.get(field, 0))
+    stats['avg_latency_ms'] = stats['latency_ms_total'] / stats['deliveries'] if stats['deliveries'] else None
+    stats['pending_retries'] = WebhookRetry.objects.filter(webhook_id=webhook_id).count()
+    return stats
+
+
+def schedule_retries(deliveries: List[WebhookDelivery]) -> None:
+    """Persist failed deliveries into the retry queue."""
+    failed = [delivery for delivery in deliveries if delivery.failed]
+    if not failed or settings.WEBHOOK_RETRY_MAX_ATTEMPTS <= 1:
+        return
+    delay = get_retry_delay(1)
+    WebhookRetry.objects.bulk_create(
+        [
+            WebhookRetry(
+                webhook=delivery.webhook,
+                action=delivery.action,
+                data=delivery.data,
+                next_attempt_at=timezone.now() + timedelta(seconds=delay),
+                last_error=delivery.error,
+            )
+            for delivery in failed
+        ]
+    )
+    if redis_connected():
+        start_job_async_or_sync(retry_webhook_deliveries, queue_name='low', in_seconds=delay)
+
+
+def dispatch(deliveries: List[WebhookDelivery]) -> List[WebhookDelivery]:
+    """Send deliveries concurrently, record their stats and queue failures for retry."""
+    deliveries = send_many(deliveries)
+    record_stats(deliveries)
+    schedule_retries(deliveries)
+    return deliveries
+
+
+def get_retry_lease(count) -> int:
+    """Seconds a claimed batch of retries is hidden from other workers: the worst case of sending it"""
+    rounds = math.ceil(count / settings.WEBHOOK_MAX_WORKERS)
+    return math.ceil(rounds * settings.WEBHOOK_TIMEOUT) + settings.WEBHOOK_RETRY_BACKOFF
+
+
+def _retry_batch(batch_size) -> Tuple[int, int]:
+    # Claim due rows in a short transaction by moving next_attempt_at past the sending time,
+    # so requests to slow endpoints don't hold row locks and an open transaction.
+    # If the worker dies while sending, the rows become due again when the lease expires.
+    with transaction.atomic():
+        retries = list(
+            WebhookRetry.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(next_attempt_at__lte=timezone.now(), webhook__is_active=True)
+            .select_related('webhook')
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        WebhookRetry.objects.filter(id__in=[retry.id for retry in retries]).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=get_retry_lease(len(retries)))
+        )
+
+    deliveries = send_many(
+        [WebhookDelivery(webhook=retry.webhook, action=retry.action, data=retry.data) for retry in retries]
+    )
+    record_stats(deliveries)
+
+    done, pending = [], []
+    for retry, delivery in zip(retries, deliveries):
+        if not delivery.failed:
+            done.append(retry.id)
+            continue
+        retry.attempts += 1
+        retry.last_error = delivery.error
+        if retry.attempts >= settings.WEBHOOK_RETRY_MAX_ATTEMPTS:
+            logger.error(
+                f'Webhook {retry.webhook_id} delivery of {retry.action} failed {retry.attempts} times, '
+                f'giving up: {delivery.error}'
+            )
+            done.append(retry.id)
+            continue
+        retry.next_attempt_at = timezone.now() + timedelta(seconds=get_retry_delay(retry.attempts))
+        pending.append(retry)
+
+    with transaction.atomic():
+        WebhookRetry.objects.filter(id__in=done).delete()
+        WebhookRetry.objects.bulk_update(pending, ['attempts', 'last_error', 'next_attempt_at'])
+    return len(retries), len(done)
+
+
+def retry_webhook_deliveries(batch_size=None) -> int:
+    """Retry due deliveries from the queue. Returns the number of rows taken off the queue."""
+    batch_size = batch_size or settings.WEBHOOK_RETRY_BATCH_SIZE
+    finished = 0
+    while True:
+        taken, done = _retry_batch(batch_size)
+        finished += done
+        if taken < batch_size:
+            break
+
+    # Without Redis there is no delayed job, retries are picked up by the retry_webhooks command
+    next_attempt_at = (
+        WebhookRetry.objects.filter(webhook__is_active=True)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if next_attempt_at and redis_connected():
+        delay = max(int((next_attempt_at - timezone.now()).total_seconds()), 1)
+        start_job_async_or_sync(retry_webhook_deliveries, queue_name='low', in_seconds=delay)
+    return finished
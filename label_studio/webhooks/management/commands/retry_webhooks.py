@@ -0,0 +1,18 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from webhooks.dispatcher import retry_webhook_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Retry failed webhook deliveries that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='deliveries retried per batch')
+
+    def handle(self, *args, **options):
+        finished = retry_webhook_deliveries(batch_size=options['batch_size'])
+        logger.debug(f'Finished {finished} webhook retries.')
+        self.stdout.write(f'Finished {finished} webhook retries')
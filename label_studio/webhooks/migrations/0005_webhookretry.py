@@ -0,0 +1,88 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0004_auto_20221221_1101"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookRetry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        help_text="Action value",
+                        max_length=128,
+                        verbose_name="action of webhook",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        default=dict,
+                        help_text="JSON body sent to the webhook URL",
+                        verbose_name="request body",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=1,
+                        help_text="Number of failed deliveries",
+                        verbose_name="attempts",
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        help_text="Time of the next delivery attempt",
+                        verbose_name="next attempt at",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Last delivery error",
+                        verbose_name="last error",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Creation time",
+                        verbose_name="created at",
+                    ),
+                ),
+                (
+                    "webhook",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="retries",
+                        to="webhooks.webhook",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "webhook_retry",
+            },
+        ),
+    ]
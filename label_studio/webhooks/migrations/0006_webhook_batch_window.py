@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0005_webhookretry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhook",
+            name="batch_max_events",
+            field=models.PositiveIntegerField(
+                default=100,
+                help_text="Deliver the batch before the window ends once this many events are buffered",
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="batch max events",
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="batch_window",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Seconds to buffer events and deliver them as one batched payload. 0 sends every event immediately",
+                verbose_name="batch window",
+            ),
+        ),
+    ]
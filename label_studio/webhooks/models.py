@@ -2,6 +2,7 @@ from core.utils.common import load_func
 from core.validators import JSONSchemaValidator
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from labels_manager.models import LabelLink
@@ -62,6 +63,21 @@ class Webhook(models.Model):
         help_text=('If value is False the webhook is disabled'),
     )
 
+    batch_window = models.PositiveIntegerField(
+        _('batch window'),
+        default=0,
+        help_text=_(
+            'Seconds to buffer events and deliver them as one batched payload. 0 sends every event immediately'
+        ),
+    )
+
+    batch_max_events = models.PositiveIntegerField(
+        _('batch max events'),
+        default=100,
+        validators=[MinValueValidator(1)],
+        help_text=_('Deliver the batch before the window ends once this many events are buffered'),
+    )
+
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text=_('Creation time'), db_index=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text=_('Last update time'), db_index=True)
 
@@ -262,3 +278,31 @@ class WebhookAction(models.Model):
     class Meta:
         db_table = 'webhook_action'
         unique_together = [['webhook', 'action']]
+
+
+class WebhookRetry(models.Model):
+    """Failed webhook delivery waiting for another attempt.
+
+    Rows are created by webhooks.dispatcher when an endpoint times out, is
+    unreachable or answers with a retryable status, and are consumed by
+    retry_webhook_deliveries with exponential backoff.
+    """
+
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='retries')
+
+    action = models.CharField(_('action of webhook'), max_length=128, help_text=_('Action value'))
+
+    data = models.JSONField(_('request body'), default=dict, help_text=_('JSON body sent to the webhook URL'))
+
+    attempts = models.PositiveIntegerField(_('attempts'), default=1, help_text=_('Number of failed deliveries'))
+
+    next_attempt_at = models.DateTimeField(
+        _('next attempt at'), db_index=True, help_text=_('Time of the next delivery attempt')
+    )
+
+    last_error = models.TextField(_('last error'), blank=True, default='', help_text=_('Last delivery error'))
+
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text=_('Creation time'))
+
+    class Meta:
+        db_table = 'webhook_retry'
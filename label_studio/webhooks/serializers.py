@@ -20,6 +20,8 @@ class WebhookSerializer(serializers.ModelSerializer):
             'send_for_all_actions',
             'headers',
             'is_active',
+            'batch_window',
+            'batch_max_events',
             'actions',
             'created_at',
             'updated_at',
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from webhooks.cache import bump_webhooks_version
+from webhooks.models import Webhook, WebhookAction
+
+
+@receiver(post_save, sender=Webhook)
+@receiver(post_delete, sender=Webhook)
+@receiver(post_save, sender=WebhookAction)
+@receiver(post_delete, sender=WebhookAction)
+def invalidate_webhooks_cache(sender, instance, **kwargs):
+    """Bump the webhooks version so every process reloads its cached webhooks."""
+    bump_webhooks_version()
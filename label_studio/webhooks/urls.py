@@ -8,6 +8,7 @@ _api_urlpatterns = [
     # CRUD
     path('', api.WebhookListAPI.as_view(), name='webhook-list'),
     path('<int:pk>/', api.WebhookAPI.as_view(), name='webhook-detail'),
+    path('<int:pk>/stats/', api.WebhookDeliveryStatsAPI.as_view(), name='webhook-stats'),
     path('info/', api.WebhookInfoAPI.as_view(), name='webhook-info'),
 ]
 
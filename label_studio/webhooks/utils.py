@@ -1,14 +1,14 @@
-import logging
 from functools import wraps
 
-import requests
 from core.feature_flags import flag_set
 from core.redis import start_job_async_or_sync
 from core.utils.common import load_func
 from django.conf import settings
-from django.db.models import Q
 
-from .models import Webhook, WebhookAction
+from .batching import buffer_deliveries
+from .cache import get_organization_webhooks
+from .dispatcher import WebhookDelivery, dispatch
+from .models import WebhookAction
 
 
 def get_active_webhooks(organization, project, action):
@@ -17,47 +17,51 @@ def get_active_webhooks(organization, project, action):
     If project is None - function return only organization hooks
     else project is not None - function return project and organization hooks
     Organization hooks are global hooks.
+
+    Webhooks are resolved from the per-process cache (see webhooks.cache),
+    so the result is a list of shared instances.
     """
     action_meta = WebhookAction.ACTIONS[action]
     if project and action_meta.get('organization-only'):
         raise ValueError('There is no project webhooks for organization-only action')
 
-    return Webhook.objects.filter(
-        Q(organization=organization)
-        & (Q(project=project) | Q(project=None))
-        & Q(is_active=True)
-        & (
-            Q(send_for_all_actions=True)
-            | Q(
-                id__in=WebhookAction.objects.filter(webhook__organization=organization, action=action).values_list(
-                    'webhook_id', flat=True
-                )
-            )
-        )
-    ).distinct()
+    project_id = project.id if project else None
+    return [
+        webhook
+        for webhook in get_organization_webhooks(organization.id)
+        if webhook.project_id in (project_id, None)
+        and (webhook.send_for_all_actions or action in webhook.cached_actions)
+    ]
 
 
-def run_webhook_sync(webhook, action, payload=None):
-    """Run one webhook for action.
-
-    This function must not raise any exceptions.
-    """
+def get_webhook_data(webhook, action, payload=None):
     data = {
         'action': action,
     }
     if webhook.send_payload and payload:
         data.update(payload)
-    try:
-        logging.debug('Run webhook %s for action %s', webhook.id, action)
-        return requests.post(
-            webhook.url,
-            headers=webhook.headers,
-            json=data,
-            timeout=settings.WEBHOOK_TIMEOUT,
-        )
-    except requests.RequestException as exc:
-        logging.error(exc, exc_info=True)
-        return
+    return data
+
+
+def run_webhook_sync(webhook, action, payload=None):
+    """Run one webhook for action.
+
+    Failed deliveries are queued for retry (see webhooks.dispatcher).
+    This function must not raise any exceptions.
+    """
+    delivery = WebhookDelivery(webhook=webhook, action=action, data=get_webhook_data(webhook, action, payload))
+    [delivery] = dispatch([delivery])
+    return delivery.response
+
+
+def run_webhooks_sync(webhooks, action, payload=None):
+    """Run several webhooks for action concurrently."""
+    deliveries = [
+        WebhookDelivery(webhook=webhook, action=action, data=get_webhook_data(webhook, action, payload))
+        for webhook in webhooks
+    ]
+    # Webhooks with a batch window get their events buffered (see webhooks.batching)
+    dispatch(buffer_deliveries(deliveries))
 
 
 def emit_webhooks_sync(organization, project, action, payload):
@@ -65,10 +69,11 @@ def emit_webhooks_sync(organization, project, action, payload):
     Run all active webhooks for the action.
     """
     webhooks = get_active_webhooks(organization, project, action)
-    if project and payload and webhooks.filter(send_payload=True).exists():
+    if not webhooks:
+        return
+    if project and payload and any(webhook.send_payload for webhook in webhooks):
         payload['project'] = load_func(settings.WEBHOOK_SERIALIZERS['project'])(instance=project).data
-    for wh in webhooks:
-        run_webhook_sync(wh, action, payload)
+    run_webhooks_sync(webhooks, action, payload)
 
 
 def emit_webhooks_for_instance_sync(organization, project, action, instance=None):
@@ -77,13 +82,13 @@ def emit_webhooks_for_instance_sync(organization, project, action, instance=None
     Be sure WebhookAction.ACTIONS contains all required fields.
     """
     webhooks = get_active_webhooks(organization, project, action)
-    if not webhooks.exists():
+    if not webhooks:
         return
     payload = {}
     # if instances and there is a webhook that sends payload
     # get serialized payload
     action_meta = WebhookAction.ACTIONS[action]
-    if instance and webhooks.filter(send_payload=True).exists():
+    if instance and any(webhook.send_payload for webhook in webhooks):
         serializer_class = action_meta.get('serializer')
         if serializer_class:
             payload[action_meta['key']] = serializer_class(instance=instance, many=action_meta['many']).data
@@ -94,8 +99,7 @@ def emit_webhooks_for_instance_sync(organization, project, action, instance=None
                 payload[key] = value['serializer'](
                     instance=get_nested_field(instance, value['field']), many=value['many']
                 ).data
-    for wh in webhooks:
-        run_webhook_sync(wh, action, payload)
+    run_webhooks_sync(webhooks, action, payload)
 
 
 def run_webhook(webhook, action, payload=None):